@@ -1 +1,4 @@
 from .action_monitor import ActionMonitor
+from .profiles import CalibrationProfiles
+from .gradient_pupil import GradientPupil
+from .locators import ThresholdLocator, GradientLocator
@@ -1,8 +1,10 @@
-import math
-import cv2
+import numpy as np
 
-from .pupil import Pupil
+from face_features_detector.geometry import mouth_aspect_ratio
+from metrics import timings
+from .locators import ThresholdLocator
 from .calibration import Calibration
+from .profiles import face_signature
 
 
 class ActionMonitor(object):
@@ -11,31 +13,75 @@ class ActionMonitor(object):
     such as:
     - Sight direction
     - Yawn
+    Alerts on them are raised by the rules of MonitoringSession.
     """
-    def __init__(self, detector):
+
+    # Horizontal gaze ratios below / above which the driver looks right / left
+    GAZE_RATIOS = (0.4, 0.65)
+
+    # Frames a stored calibration is tried on (blinks, motion blur) before
+    # the driver is calibrated from scratch
+    PROFILE_ATTEMPTS = 5
+
+    def __init__(self, detector, profiles=None, history=None, pupil_locator=None):
+        """
+        Arguments:
+            detector (FaceFeaturesDetector): Detector of face features
+            profiles (CalibrationProfiles): Stored calibrations of known drivers,
+                None to always calibrate from scratch
+            history (FeatureHistory): Rolling history of frame features
+            pupil_locator: Locates the pupil in an eye frame (see locators),
+                ThresholdLocator if None
+        """
         self.detector = detector
+        self.pupil_locator = pupil_locator if pupil_locator is not None else ThresholdLocator()
+        self.history = history
         self.calibration = Calibration()
-        self.frame = None
+        self.profiles = profiles
+        self.signature = None
+        self._signatures = []
+        self._profile_attempts = 0
         self.left_pupil = None
         self.right_pupil = None
-        self.fps = 10
-
-        # Action / behavior flags
-        self.isDistracted = 0
-        self.Yawns = 0
-
-        # Action / behavior flag counters
-        self.isDistractedCounter = 0
-        self.YawnsCounter = 0
 
-    def update_fps(self, fps):
+    def _restore_calibration(self):
         """
-        Updates FPS for calculating flags
-
-        Arguments:
-            fps: Frames per second (based on full frame processing time)
+        Uses the stored calibration of a known driver when it still fits
+        one of the first PROFILE_ATTEMPTS frames of the face, and collects
+        face signatures while calibrating a new driver.
+        Calibration starts over when a different face is acquired.
         """
-        self.fps = fps
+        signature = face_signature(self.detector.landmarks)
+
+        if self.detector.reacquired and self.signature is not None \
+                and not self.profiles.same_face(signature, self.signature):
+            self.calibration = Calibration(self.calibration.thresholds)
+            self.signature = None
+            self._signatures = []
+            self._profile_attempts = 0
+
+        if self.calibration.is_complete():
+            return
+
+        if self._profile_attempts < self.PROFILE_ATTEMPTS:
+            self._profile_attempts += 1
+            thresholds = self.profiles.match(signature)
+            if thresholds is not None \
+                    and self.calibration.fits(self.detector.eye_left.frame, thresholds[0]) \
+                    and self.calibration.fits(self.detector.eye_right.frame, thresholds[1]):
+                self.calibration.load(*thresholds)
+                self.signature = signature
+                self._signatures = []
+                return
+
+        self._signatures.append(signature)
+
+    def _store_calibration(self):
+        """Stores the calibration of a new driver once it is complete"""
+        if self._signatures and self.calibration.is_complete():
+            self.signature = np.mean(self._signatures, axis=0)
+            self._signatures = []
+            self.profiles.save(self.signature, self.calibration.threshold(0), self.calibration.threshold(1))
 
     def track_pupils(self, side):
         """
@@ -44,18 +90,21 @@ class ActionMonitor(object):
         Arguments:
             side: Indicates whether it's the left eye (0) or the right eye (1)
         """
-        if side == 0:
+        eye = self.detector.eye_left if side == 0 else self.detector.eye_right
+        threshold = None
+        if self.pupil_locator.calibrated:
             if not self.calibration.is_complete():
-                self.calibration.evaluate(self.detector.eye_left.frame, side)
-
+                with timings.stage("calibration"):
+                    self.calibration.evaluate(eye.frame, side)
             threshold = self.calibration.threshold(side)
-            self.left_pupil = Pupil(self.detector.eye_left.frame, threshold)
-        elif side == 1:
-            if not self.calibration.is_complete():
-                self.calibration.evaluate(self.detector.eye_right.frame, side)
 
-            threshold = self.calibration.threshold(side)
-            self.right_pupil = Pupil(self.detector.eye_right.frame, threshold)
+        with timings.stage("pupil_processing"):
+            pupil = self.pupil_locator.locate(eye.frame, threshold)
+
+        if side == 0:
+            self.left_pupil = pupil
+        elif side == 1:
+            self.right_pupil = pupil
 
     @property
     def pupils_located(self):
@@ -107,12 +156,12 @@ class ActionMonitor(object):
     def is_right(self):
         """Returns true if the user is looking to the right"""
         if self.pupils_located:
-            return self.horizontal_ratio() <= 0.4
+            return self.horizontal_ratio() <= self.GAZE_RATIOS[0]
 
     def is_left(self):
         """Returns true if the user is looking to the left"""
         if self.pupils_located:
-            return self.horizontal_ratio() >= 0.65
+            return self.horizontal_ratio() >= self.GAZE_RATIOS[1]
 
     def is_center(self):
         """Returns true if the user is looking to the center"""
@@ -121,32 +170,22 @@ class ActionMonitor(object):
 
     def mouth_aspect_ratio(self):
         """Returns aspect ratio of detected mouth"""
-        left = self.detector.mouth.landmark_points[0]
-        right = self.detector.mouth.landmark_points[6]
-        top = self.detector.mouth.landmark_points[3]
-        bottom = self.detector.mouth.landmark_points[9]
-        mouth_width = math.hypot((left[0] - right[0]), (left[1] - right[1]))
-        mouth_height = math.hypot((top[0] - bottom[0]), (top[1] - bottom[1]))
-
-        try:
-            ratio = mouth_width / mouth_height
-        except ZeroDivisionError:
-            ratio = 5.0
+        return mouth_aspect_ratio(self.detector.landmarks)
 
-        return ratio
+    def yawn_rate(self):
+        """Returns yawns per minute over the history window"""
+        return self.history.yawn_rate()
 
-    def annotated_frame(self):
-        """Returns the main frame with pupils highlighted and text added"""
-        frame = self.frame.copy()
+    def annotate(self, overlay):
+        """Adds pupil highlighting and text to an overlay
 
+        Arguments:
+            overlay (Overlay): Draw commands of the frame
+        """
         if self.pupils_located:
             color = (0, 0, 255)
-            x_left, y_left = self.pupil_left_coords()
-            x_right, y_right = self.pupil_right_coords()
-            cv2.line(frame, (x_left - 5, y_left), (x_left + 5, y_left), color)
-            cv2.line(frame, (x_left, y_left - 5), (x_left, y_left + 5), color)
-            cv2.line(frame, (x_right - 5, y_right), (x_right + 5, y_right), color)
-            cv2.line(frame, (x_right, y_right - 5), (x_right, y_right + 5), color)
+            overlay.cross(self.pupil_left_coords(), color)
+            overlay.cross(self.pupil_right_coords(), color)
 
         if self.is_right():
             eye_text = "Взгляд вправо"
@@ -157,53 +196,30 @@ class ActionMonitor(object):
         else:
             eye_text = "Зрачки не обнаружены"
 
-        cv2.putText(frame, eye_text, (50, 50), cv2.FONT_HERSHEY_COMPLEX, 1.0, (150, 50, 25), 2)
+        overlay.text(eye_text, (50, 50), (150, 50, 25))
 
         if self.mouth_aspect_ratio() < 2:
             mouth_text = "Рот открыт"
         else:
             mouth_text = "Рот закрыт"
 
-        cv2.putText(frame, mouth_text, (50, 100), cv2.FONT_HERSHEY_COMPLEX, 1.0, (150, 50, 25), 2)
+        overlay.text(mouth_text, (50, 100), (150, 50, 25))
 
-        return frame
+    def extract(self):
+        """Tracks pupils and returns the features the alert rules are based on"""
+        calibrated = self.profiles is not None and self.pupil_locator.calibrated
+        if calibrated:
+            self._restore_calibration()
 
-    def _analyze(self):
-        """Tracks pupils and updates monitoring parameters"""
-        isDistractedCounter = 0
-        YawnsCounter = 0
         self.track_pupils(0)
         self.track_pupils(1)
 
-        # IsDistracted flag
-        if not self.is_center():
-            self.isDistractedCounter += 1.0 / self.fps
-            if self.isDistractedCounter > 2.0:
-                self.isDistracted = 1
-        else:
-            isDistractedCounter = self.isDistractedCounter
-            self.isDistractedCounter = 0
-            self.isDistracted = 0
+        if calibrated:
+            self._store_calibration()
 
-        # Yawns flag
-        if self.mouth_aspect_ratio() < 2:
-            self.YawnsCounter += 1.0 / self.fps
-            if self.YawnsCounter > 2.0:
-                self.Yawns = 1
-        else:
-            YawnsCounter = self.YawnsCounter
-            self.YawnsCounter = 0
-            self.Yawns = 0
-
-        return isDistractedCounter, YawnsCounter
-
-    def refresh(self, frame):
-        """
-        Refreshes the frame and analyzes it.
-
-        Arguments:
-            frame (numpy.ndarray): The frame to analyze
-        """
-        self.frame = frame
-        flags = self._analyze()
-        return flags
+        return {
+            "gaze_center": bool(self.is_center()),
+            "horizontal_ratio": self.horizontal_ratio(),
+            "vertical_ratio": self.vertical_ratio(),
+            "mouth_aspect_ratio": self.mouth_aspect_ratio(),
+        }
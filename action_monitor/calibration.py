@@ -1,4 +1,5 @@
 import cv2
+import numpy as np
 from .pupil import Pupil
 
 
@@ -8,8 +9,16 @@ class Calibration(object):
     best binarization threshold value for the person and the webcam.
     """
 
-    def __init__(self):
+    AVERAGE_IRIS_SIZE = 0.48
+
+    def __init__(self, thresholds=range(5, 100, 5)):
+        """
+        Arguments:
+            thresholds: Candidate binarization thresholds (0-255), finer
+                steps cost nothing extra
+        """
         self.nb_frames = 20
+        self.thresholds = thresholds
         self.thresholds_left = []
         self.thresholds_right = []
 
@@ -43,22 +52,39 @@ class Calibration(object):
         return nb_blacks / nb_pixels
 
     @staticmethod
-    def find_best_threshold(eye_frame):
+    def iris_sizes(eye_frame, thresholds):
+        """Returns the iris size (see iris_size) of the eye frame binarized
+        with each of the thresholds. The frame is filtered once and all
+        thresholds are scored from its cumulative histogram.
+
+        Arguments:
+            eye_frame (numpy.ndarray): Frame of the eye to be analyzed
+            thresholds (numpy.ndarray): Threshold values
+        """
+        frame = Pupil.filtering(eye_frame)[5:-5, 5:-5]
+        nb_pixels = frame.size
+        if nb_pixels == 0:
+            raise ZeroDivisionError("eye frame is too small to be calibrated")
+
+        # Pixels at or below a threshold turn black on binarization
+        histogram = np.bincount(frame.ravel(), minlength=256)
+        nb_blacks = np.cumsum(histogram)[np.clip(np.floor(thresholds).astype(int), 0, 255)]
+        return nb_blacks / nb_pixels
+
+    @staticmethod
+    def find_best_threshold(eye_frame, thresholds=range(5, 100, 5)):
         """Calculates the optimal threshold to binarize the
         frame for the given eye.
 
-        Argument:
+        Arguments:
             eye_frame (numpy.ndarray): Frame of the eye to be analyzed
+            thresholds: Candidate threshold values
         """
-        average_iris_size = 0.48
-        trials = {}
-
-        for threshold in range(5, 100, 5):
-            iris_frame = Pupil.image_processing(eye_frame, threshold)
-            trials[threshold] = Calibration.iris_size(iris_frame)
+        thresholds = np.asarray(thresholds)
 
-        best_threshold, iris_size = min(trials.items(), key=(lambda p: abs(p[1] - average_iris_size)))
-        return best_threshold
+        iris_sizes = Calibration.iris_sizes(eye_frame, thresholds)
+        best_threshold = thresholds[np.argmin(np.abs(iris_sizes - Calibration.AVERAGE_IRIS_SIZE))]
+        return int(best_threshold)
 
     def evaluate(self, eye_frame, side):
         """Improves calibration by taking into consideration the
@@ -68,9 +94,32 @@ class Calibration(object):
             eye_frame (numpy.ndarray): Frame of the eye
             side: Indicates whether it's the left eye (0) or the right eye (1)
         """
-        threshold = self.find_best_threshold(eye_frame)
+        threshold = self.find_best_threshold(eye_frame, self.thresholds)
 
         if side == 0:
             self.thresholds_left.append(threshold)
         elif side == 1:
-            self.thresholds_right.append(threshold)
\ No newline at end of file
+            self.thresholds_right.append(threshold)
+
+    @staticmethod
+    def fits(eye_frame, threshold, tolerance=0.1):
+        """Returns true if the threshold still binarizes the frame for the
+        given eye into an iris of about the average size.
+
+        Arguments:
+            eye_frame (numpy.ndarray): Frame of the eye
+            threshold (int): Threshold value to check
+            tolerance (float): Maximum difference from the average iris size
+        """
+        iris_size = Calibration.iris_sizes(eye_frame, np.array([threshold]))[0]
+        return abs(iris_size - Calibration.AVERAGE_IRIS_SIZE) <= tolerance
+
+    def load(self, left, right):
+        """Completes calibration with known thresholds.
+
+        Arguments:
+            left (int): Threshold of the left eye
+            right (int): Threshold of the right eye
+        """
+        self.thresholds_left = [left] * self.nb_frames
+        self.thresholds_right = [right] * self.nb_frames
@@ -0,0 +1,83 @@
+import numpy as np
+import cv2
+
+
+class GradientPupil(object):
+    """
+    This class estimates the position of the pupil as the eye center
+    of Timm & Barth (means of gradients): the point most image
+    gradients point away from, weighted by how dark it is. It needs no
+    binarization threshold, hence no calibration.
+
+    The eye frame is downscaled to a fixed width and every candidate
+    center (the darkest pixels) is scored against every strong
+    gradient at once.
+    """
+
+    def __init__(self, eye_frame, width=32, gradient_threshold=0.3, dark_share=0.2):
+        """
+        Arguments:
+            eye_frame (numpy.ndarray): Frame containing an eye and nothing else
+            width (int): Width the eye frame is downscaled to
+            gradient_threshold (float): Gradients weaker than their mean plus this
+                many standard deviations are ignored
+            dark_share (float): Share of the darkest pixels scored as candidate centers
+        """
+        self.width = width
+        self.gradient_threshold = gradient_threshold
+        self.dark_share = dark_share
+        self.x = None
+        self.y = None
+
+        self.detect_center(eye_frame)
+
+    def detect_center(self, eye_frame):
+        """Estimates the eye center of the frame
+
+        Arguments:
+            eye_frame (numpy.ndarray): Frame containing an eye and nothing else
+        """
+        height, width = eye_frame.shape[:2]
+        if height < 3 or width < 3:
+            return
+
+        scale = max(width / self.width, 1.0)
+        size = (max(int(round(width / scale)), 3), max(int(round(height / scale)), 3))
+        frame = cv2.resize(eye_frame, size, interpolation=cv2.INTER_AREA) if scale > 1.0 else eye_frame
+        frame = frame.astype(np.float32)
+
+        gx = cv2.Sobel(frame, cv2.CV_32F, 1, 0, ksize=3).ravel()
+        gy = cv2.Sobel(frame, cv2.CV_32F, 0, 1, ksize=3).ravel()
+        magnitude = cv2.magnitude(gx, gy).ravel()
+        mean, std = cv2.meanStdDev(magnitude)
+        strong = np.flatnonzero(magnitude > mean[0, 0] + self.gradient_threshold * std[0, 0])
+        if len(strong) == 0:
+            return
+
+        # Dark center prior: the pupil is the darkest part of the eye, so
+        # only the darkest pixels are scored, weighted by their darkness
+        weights = 255.0 - cv2.GaussianBlur(frame, (3, 3), 0).ravel()
+        count = max(int(len(weights) * self.dark_share), 1)
+        candidates = np.argpartition(weights, -count)[-count:]
+        candidates = candidates[weights[candidates] > 0]
+        if len(candidates) == 0:
+            return
+
+        # Squared dot products of normalized displacements (candidate to
+        # gradient) and gradients, for gradients pointing away only
+        ys, xs = np.divmod(np.arange(frame.size, dtype=np.float32), np.float32(frame.shape[1]))
+        dx = xs[strong] - xs[candidates, np.newaxis]
+        dy = ys[strong] - ys[candidates, np.newaxis]
+        squared_norms = dx * dx
+        squared_norms += dy * dy
+        squared_norms[squared_norms == 0] = np.inf
+        dots = dx * (gx[strong] / magnitude[strong])
+        dots += dy * (gy[strong] / magnitude[strong])
+        np.maximum(dots, 0.0, out=dots)
+        dots *= dots
+        dots /= squared_norms
+        center = int(candidates[np.argmax(dots.sum(axis=1) * weights[candidates])])
+
+        cy, cx = divmod(center, frame.shape[1])
+        self.x = int((cx + 0.5) * width / frame.shape[1])
+        self.y = int((cy + 0.5) * height / frame.shape[0])
@@ -0,0 +1,54 @@
+from .pupil import Pupil
+from .gradient_pupil import GradientPupil
+
+
+class ThresholdLocator(object):
+    """
+    Pupil locator binarizing the eye frame with the calibrated threshold
+    of the driver and taking the centroid of the iris contour (Pupil).
+
+    A pupil locator has:
+    - `calibrated`: whether it needs the binarization threshold of the
+      Calibration, ActionMonitor only calibrates for such locators
+    - `locate(eye_frame, threshold)`: returns an object with the pupil
+      position `x` and `y` in the eye frame, None if not found
+    """
+
+    calibrated = True
+
+    @staticmethod
+    def locate(eye_frame, threshold):
+        """
+        Arguments:
+            eye_frame (numpy.ndarray): Frame containing an eye and nothing else
+            threshold (int): Binarization threshold of the eye
+        """
+        return Pupil(eye_frame, threshold)
+
+
+class GradientLocator(object):
+    """
+    Pupil locator estimating the eye center from image gradients
+    (GradientPupil), without threshold nor calibration
+    """
+
+    calibrated = False
+
+    def __init__(self, width=32, gradient_threshold=0.3, dark_share=0.2):
+        """
+        Arguments: see GradientPupil
+        """
+        self.width = width
+        self.gradient_threshold = gradient_threshold
+        self.dark_share = dark_share
+
+    def locate(self, eye_frame, threshold=None):
+        """
+        Arguments:
+            eye_frame (numpy.ndarray): Frame containing an eye and nothing else
+            threshold: Ignored
+        """
+        return GradientPupil(eye_frame, self.width, self.gradient_threshold, self.dark_share)
+
+
+LOCATORS = {"threshold": ThresholdLocator, "gradient": GradientLocator}
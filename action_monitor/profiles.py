@@ -0,0 +1,104 @@
+import os
+import json
+import numpy as np
+
+from face_features_detector.geometry import inter_ocular_distance
+
+# Landmarks that barely move with expressions: jaw, nose and eye corners
+SIGNATURE_POINTS = [0, 8, 16, 27, 30, 33, 36, 39, 42, 45]
+
+
+def face_signature(landmarks):
+    """
+    Returns a cheap signature of a face: distances between rigid
+    landmarks normalized by the inter-ocular distance.
+
+    Arguments:
+        landmarks (numpy.ndarray): Facial landmarks (68, 2)
+    """
+    points = landmarks[SIGNATURE_POINTS].astype(np.float64)
+    diff = points[:, None, :] - points[None, :, :]
+    distances = np.hypot(diff[..., 0], diff[..., 1])[np.triu_indices(len(points), 1)]
+    return distances / inter_ocular_distance(landmarks)
+
+
+class CalibrationProfiles(object):
+    """
+    This class stores pupil calibration thresholds of known drivers
+    in a JSON file, keyed by their face signature.
+    """
+
+    def __init__(self, path, tolerance=0.05):
+        """
+        Arguments:
+            path (str): JSON file the profiles are stored in
+            tolerance (float): Maximum mean relative difference of two
+                signatures of the same face
+        """
+        self.path = path
+        self.tolerance = tolerance
+        self.profiles = []
+        self.load()
+
+    def load(self):
+        """Loads profiles from the file, if it exists"""
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, encoding="utf-8") as profiles_file:
+            self.profiles = json.load(profiles_file)["profiles"]
+
+    def _write(self):
+        """Writes profiles to the file"""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as profiles_file:
+            json.dump({"profiles": self.profiles}, profiles_file)
+        os.replace(temp_path, self.path)
+
+    def distance(self, signature, other):
+        """Returns mean relative difference of two face signatures"""
+        signature = np.asarray(signature)
+        return float(np.mean(np.abs(signature - np.asarray(other)) / signature))
+
+    def same_face(self, signature, other):
+        """Returns true if both signatures belong to the same face"""
+        return self.distance(signature, other) <= self.tolerance
+
+    def _closest(self, signature):
+        """Returns index of the closest profile within tolerance, or None"""
+        best_index, best_distance = None, self.tolerance
+        for index, profile in enumerate(self.profiles):
+            distance = self.distance(profile["signature"], signature)
+            if distance <= best_distance:
+                best_index, best_distance = index, distance
+        return best_index
+
+    def match(self, signature):
+        """
+        Returns the stored (left, right) thresholds of the face, or None
+        if the face is unknown
+
+        Arguments:
+            signature (numpy.ndarray): Face signature
+        """
+        index = self._closest(signature)
+        if index is None:
+            return None
+        return tuple(self.profiles[index]["thresholds"])
+
+    def save(self, signature, left, right):
+        """
+        Stores thresholds of a face, replacing the profile of the same face
+
+        Arguments:
+            signature (numpy.ndarray): Face signature
+            left (int): Threshold of the left eye
+            right (int): Threshold of the right eye
+        """
+        profile = {"signature": [float(value) for value in signature], "thresholds": [int(left), int(right)]}
+        index = self._closest(signature)
+        if index is None:
+            self.profiles.append(profile)
+        else:
+            self.profiles[index] = profile
+        self._write()
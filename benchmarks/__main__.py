@@ -0,0 +1,62 @@
+import sys
+import json
+import argparse
+
+import cv2
+
+from .corpus import RESOLUTIONS, synthetic_corpus, recorded_corpus
+from .suite import component_benchmarks, end_to_end_benchmarks, environment, compare
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Driver Monitoring System benchmarks")
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS),
+                        help="frame resolutions to benchmark")
+    parser.add_argument("--frames", type=int, default=60, help="number of synthetic frames")
+    parser.add_argument("--repeat", type=int, default=3, help="number of passes over the corpus")
+    parser.add_argument("--corpus", default=None, help="directory of recorded frames used instead of synthetic ones")
+    parser.add_argument("--threads", type=int, default=1, help="OpenCV threads, 1 for reproducible timings")
+    parser.add_argument("--output", default=None, help="JSON file the report is written to (stdout if omitted)")
+    parser.add_argument("--compare", default=None, help="baseline JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    cv2.setNumThreads(args.threads)
+
+    report = {"environment": environment(), "settings": vars(args), "results": {}}
+    for resolution in args.resolutions:
+        size = RESOLUTIONS[resolution]
+        if args.corpus is not None:
+            corpus = recorded_corpus(args.corpus, size)
+            results = {}
+        else:
+            corpus = synthetic_corpus(size, args.frames)
+            results = component_benchmarks(corpus, args.repeat)
+        results.update(end_to_end_benchmarks(corpus, args.repeat))
+        report["results"][resolution] = results
+
+    status = 0
+    if args.compare is not None:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            report["regressions"] = compare(report, json.load(baseline_file), args.tolerance)
+        status = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, indent=2)
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(text)
+    else:
+        print(text)
+
+    for regression in report.get("regressions", []):
+        print(f"REGRESSION {regression['resolution']} {regression['benchmark']}: "
+              f"{regression['baseline']:.3f} ms -> {regression['current']:.3f} ms "
+              f"(+{regression['change'] * 100:.1f}%)", file=sys.stderr)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import os
+import numpy as np
+import cv2
+
+RESOLUTIONS = {
+    "480p": (640, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+}
+
+
+def _ellipse_points(center, axes, start, end, count):
+    """Returns `count` points on an ellipse arc (angles in degrees)"""
+    angles = np.radians(np.linspace(start, end, count))
+    return np.stack([center[0] + axes[0] * np.cos(angles), center[1] + axes[1] * np.sin(angles)], axis=1)
+
+
+def face_template():
+    """
+    Returns a frontal 68 landmarks face template in unit coordinates
+    (face box from 0 to 1), following the Multi-PIE point order.
+    """
+    points = np.zeros((68, 2))
+    points[0:17] = _ellipse_points((0.5, 0.4), (0.48, 0.58), 180, 0, 17)
+    points[17:22] = _ellipse_points((0.3, 0.3), (0.15, 0.05), 180, 360, 5)
+    points[22:27] = _ellipse_points((0.7, 0.3), (0.15, 0.05), 180, 360, 5)
+    points[27:31] = np.stack([np.full(4, 0.5), np.linspace(0.38, 0.58, 4)], axis=1)
+    points[31:36] = np.stack([np.linspace(0.42, 0.58, 5), np.full(5, 0.64)], axis=1)
+    # Eyes: corner, two top points, corner, two bottom points
+    for start, center in ((36, (0.32, 0.42)), (42, (0.68, 0.42))):
+        points[start:start + 6] = _ellipse_points(center, (0.09, 0.035), 180, 540, 7)[:6]
+    points[48:60] = _ellipse_points((0.5, 0.8), (0.14, 0.05), 180, 540, 13)[:12]
+    points[60:68] = _ellipse_points((0.5, 0.8), (0.09, 0.02), 180, 540, 9)[:8]
+    return points
+
+
+def iris_centers(landmarks, gaze=0.0):
+    """
+    Returns the (2, 2) iris centers (left eye, right eye) synthetic_frame()
+    draws for its landmarks and gaze, the ground truth of pupil locators
+
+    Arguments:
+        landmarks (numpy.ndarray): (68, 2) landmarks of a synthetic frame
+        gaze (float): Horizontal pupil offset, -1.0 (right) to 1.0 (left)
+    """
+    centers = np.zeros((2, 2), np.int32)
+    for side, start in enumerate((36, 42)):
+        eye = landmarks[start:start + 6]
+        center = eye.mean(axis=0)
+        eye_width = eye[3, 0] - eye[0, 0]
+        centers[side] = (int(center[0] + gaze * eye_width * 0.25), int(center[1]))
+    return centers
+
+
+def synthetic_frame(size, seed=0, gaze=0.0, eye_opening=1.0, mouth_opening=1.0):
+    """
+    Draws a synthetic face and returns the BGR frame and its (68, 2) landmarks.
+
+    Arguments:
+        size (tuple): Frame (width, height)
+        seed (int): Seed of the background noise
+        gaze (float): Horizontal pupil offset, -1.0 (right) to 1.0 (left)
+        eye_opening (float): Eye height factor, 0.0 is closed
+        mouth_opening (float): Mouth height factor
+    """
+    width, height = size
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(60, 90, (height, width, 3), dtype=np.uint8)
+
+    face_size = int(min(width, height) * 0.6)
+    origin = np.array([(width - face_size) / 2, (height - face_size) / 2])
+    template = face_template()
+    for start in (36, 42):
+        center = template[start:start + 6].mean(axis=0)
+        template[start:start + 6, 1] = center[1] + (template[start:start + 6, 1] - center[1]) * eye_opening
+    mouth_center = template[48:68].mean(axis=0)
+    template[48:68, 1] = mouth_center[1] + (template[48:68, 1] - mouth_center[1]) * mouth_opening
+    landmarks = np.round(origin + template * face_size).astype(np.int32)
+
+    cv2.fillConvexPoly(frame, cv2.convexHull(landmarks), (150, 170, 200))
+    for start, iris in zip((36, 42), iris_centers(landmarks, gaze).tolist()):
+        eye = landmarks[start:start + 6]
+        cv2.fillPoly(frame, [eye], (235, 235, 235))
+        eye_width = eye[3, 0] - eye[0, 0]
+        cv2.circle(frame, tuple(iris), max(int(eye_width * 0.18), 1), (40, 30, 20), -1)
+    cv2.fillPoly(frame, [landmarks[48:60]], (60, 40, 120))
+    cv2.fillPoly(frame, [landmarks[60:68]], (20, 10, 30))
+
+    return frame, landmarks
+
+
+def synthetic_corpus(size, nb_frames=60, seed=0):
+    """
+    Returns a fixed list of (frame, landmarks) with the gaze, eyes and
+    mouth moving over time, so every stage sees some variety.
+
+    Arguments:
+        size (tuple): Frame (width, height)
+        nb_frames (int): Number of frames
+        seed (int): Seed of the corpus
+    """
+    corpus = []
+    for i in range(nb_frames):
+        phase = 2 * np.pi * i / nb_frames
+        corpus.append(synthetic_frame(
+            size,
+            seed=seed + i,
+            gaze=np.sin(phase),
+            eye_opening=0.15 if i % 20 == 0 else 1.0,
+            mouth_opening=1.0 + 3.0 * max(np.sin(phase * 2), 0.0),
+        ))
+    return corpus
+
+
+def recorded_corpus(directory, size=None):
+    """
+    Loads recorded frames (images sorted by name) from a directory.
+    Recorded frames have no ground truth landmarks (None).
+
+    Arguments:
+        directory (str): Directory with .png / .jpg frames
+        size (tuple): Frame (width, height) to resize to, None to keep
+    """
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith((".png", ".jpg", ".jpeg")):
+            continue
+        frame = cv2.imread(os.path.join(directory, name))
+        if size is not None:
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        corpus.append((frame, None))
+    return corpus
@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import tempfile
+
+import numpy as np
+
+from service import IngestService, IngestClient
+from .corpus import RESOLUTIONS, synthetic_corpus
+from .suite import summarize, detector_available
+from .multistream import CorpusDetector
+
+
+async def client_load(address, corpus, stream, frames, in_flight, encoding):
+    """
+    Pushes frames of the corpus as one stream, keeping up to `in_flight`
+    requests pending, and returns the round trip latency of each frame
+    """
+    latencies = []
+    errors = 0
+    client = await IngestClient.connect(path=address)
+    async with client:
+        pending = []
+        for index in range(frames):
+            frame = corpus[index % len(corpus)][0]
+            start = time.perf_counter()
+            future = await client.submit(frame, stream, time.time(), encoding)
+            pending.append((start, future))
+            if len(pending) >= in_flight:
+                start, future = pending.pop(0)
+                response = await future
+                errors += "error" in response
+                latencies.append(time.perf_counter() - start)
+        for start, future in pending:
+            response = await future
+            errors += "error" in response
+            latencies.append(time.perf_counter() - start)
+    return latencies, errors
+
+
+async def run(clients, frames, in_flight, encoding, size, workers, max_batch, batch_window):
+    """
+    Starts a service on a Unix socket, drives it with `clients`
+    concurrent streams and returns throughput, latency and batching
+    """
+    corpus = synthetic_corpus(size, 60)
+    detector_factory = None if detector_available() else (lambda: CorpusDetector(corpus))
+    service = IngestService(workers, max_batch, batch_window, detector_factory=detector_factory)
+
+    with tempfile.TemporaryDirectory() as directory:
+        address = os.path.join(directory, "ingest.sock")
+        await service.start(address)
+        try:
+            start = time.perf_counter()
+            results = await asyncio.gather(*(client_load(address, corpus, f"stream-{index}", frames, in_flight,
+                                                         encoding) for index in range(clients)))
+            elapsed = time.perf_counter() - start
+        finally:
+            await service.close()
+
+    latencies = np.array([latency for client_latencies, _ in results for latency in client_latencies])
+    result = {
+        "clients": clients,
+        "workers": service.workers,
+        "encoding": encoding,
+        "detector": "dlib" if detector_factory is None else "synthetic",
+        "frames_per_second": len(latencies) / elapsed,
+        "errors": sum(errors for _, errors in results),
+        "mean_batch": service.stats["requests"] / max(service.stats["batches"], 1),
+        "max_depth": service.stats["max_depth"],
+    }
+    # Round trips overlap, so throughput is measured over the run instead
+    result.update({name: value for name, value in summarize(latencies).items() if name != "throughput"})
+    return result
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load generator of the local ingest service")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 8], help="numbers of concurrent streams")
+    parser.add_argument("--frames", type=int, default=300, help="frames pushed by each client")
+    parser.add_argument("--in-flight", type=int, default=2, help="pending requests of each client")
+    parser.add_argument("--encoding", default="raw", choices=["raw", "jpeg"], help="frame encoding")
+    parser.add_argument("--resolution", default="480p", choices=list(RESOLUTIONS), help="frame resolution")
+    parser.add_argument("--workers", type=int, default=None, help="worker threads of the service")
+    parser.add_argument("--max-batch", type=int, default=8, help="maximum number of frames in a batch")
+    parser.add_argument("--batch-window", type=float, default=0.002, help="seconds a batch waits for more frames")
+    parser.add_argument("--output", default=None, help="JSON file the report is written to")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = []
+    for clients in args.clients:
+        result = asyncio.run(run(clients, args.frames, args.in_flight, args.encoding, RESOLUTIONS[args.resolution],
+                                 args.workers, args.max_batch, args.batch_window))
+        results.append(result)
+        print(json.dumps(result))
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump({"settings": vars(args), "results": results}, output_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import os
+import sys
+import time
+import json
+import argparse
+
+import numpy as np
+
+from runtime.multistream import MultiStreamServer
+from .corpus import RESOLUTIONS, synthetic_corpus
+from .suite import SyntheticDetector, detector_available
+
+
+class CorpusDetector(SyntheticDetector):
+    """
+    Synthetic detector for frames that went through shared memory or a
+    socket: the landmarks of a frame are those of the corpus frame with
+    the nearest subsampled pixels (background noise differs between
+    corpus frames), which also finds JPEG compressed frames
+    """
+
+    def __init__(self, corpus):
+        super().__init__()
+        self._signatures = np.stack([self._signature(frame) for frame, _ in corpus])
+        self._landmarks = [landmarks for _, landmarks in corpus]
+
+    @staticmethod
+    def _signature(frame):
+        return frame[::16, ::16].astype(np.float32).ravel()
+
+    def refresh(self, frame, timestamp=None):
+        distances = np.abs(self._signatures - self._signature(frame)).sum(axis=1)
+        self.next_landmarks = self._landmarks[int(np.argmin(distances))]
+        super().refresh(frame, timestamp)
+
+
+def synthetic_stream(corpus, fps, seconds, offset=0):
+    """
+    Returns a capture callable cycling through the corpus at `fps`
+    frames per second for `seconds`, like a camera would
+
+    Arguments:
+        corpus (list): (frame, landmarks) tuples
+        fps (float): Frame rate of the stream
+        seconds (float): Length of the stream
+        offset (int): First corpus frame, so streams differ
+    """
+    state = {"index": 0, "start": None}
+
+    def capture():
+        if state["start"] is None:
+            state["start"] = time.perf_counter()
+        index = state["index"]
+        due = state["start"] + index / fps
+        if due - state["start"] >= seconds:
+            return None
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        state["index"] += 1
+        return corpus[(offset + index) % len(corpus)][0]
+
+    return capture
+
+
+def run(streams, workers, fps, seconds, size, frames=60):
+    """
+    Drives `streams` synthetic streams through a MultiStreamServer and
+    returns its throughput
+
+    Arguments:
+        streams (int): Number of streams
+        workers (int): Number of worker processes
+        fps (float): Frame rate of each stream
+        seconds (float): Length of the run
+        size (tuple): Frame (width, height)
+        frames (int): Number of corpus frames
+    """
+    corpus = synthetic_corpus(size, frames)
+    captures = [synthetic_stream(corpus, fps, seconds, offset=index * 7) for index in range(streams)]
+    if detector_available():
+        detector_factory = None
+    else:
+        def detector_factory():
+            return CorpusDetector(corpus)
+
+    server = MultiStreamServer(captures, frame_shape=corpus[0][0].shape, workers=workers,
+                               detector_factory=detector_factory)
+    start = time.perf_counter()
+    stats = server.run()
+    elapsed = time.perf_counter() - start
+
+    captured = sum(stream["captured"] for stream in stats)
+    analyzed = sum(stream["analyzed"] for stream in stats)
+    return {
+        "streams": streams,
+        "workers": server.workers,
+        "detector": "dlib" if detector_factory is None else "synthetic",
+        "seconds": elapsed,
+        "captured_fps": captured / elapsed,
+        "analyzed_fps": analyzed / elapsed,
+        "analyzed_share": analyzed / captured if captured else 0.0,
+        "dropped": sum(stream["dropped"] for stream in stats),
+        "torn": sum(stream["torn"] for stream in stats),
+        "events": server.event_count,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Multi-stream throughput with synthetic camera streams")
+    parser.add_argument("--streams", type=int, default=8, help="number of synthetic streams")
+    parser.add_argument("--workers", type=int, nargs="+", default=None,
+                        help="numbers of worker processes to compare, 1 up to the number of CPUs by default")
+    parser.add_argument("--fps", type=float, default=30.0, help="frame rate of each stream")
+    parser.add_argument("--seconds", type=float, default=10.0, help="length of each run")
+    parser.add_argument("--resolution", default="480p", choices=list(RESOLUTIONS), help="frame resolution")
+    parser.add_argument("--output", default=None, help="JSON file the report is written to")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    cpus = os.cpu_count() or 1
+    workers = args.workers or sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+
+    results = []
+    for count in workers:
+        result = run(args.streams, count, args.fps, args.seconds, RESOLUTIONS[args.resolution])
+        result["speedup"] = result["analyzed_fps"] / results[0]["analyzed_fps"] if results else 1.0
+        results.append(result)
+        print(json.dumps(result))
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump({"settings": vars(args), "cpu_count": cpus, "results": results}, output_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
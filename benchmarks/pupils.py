@@ -0,0 +1,114 @@
+import sys
+import json
+import argparse
+from time import perf_counter
+
+import numpy as np
+import cv2
+
+from face_features_detector.eye import Eye
+from action_monitor.calibration import Calibration
+from action_monitor.locators import ThresholdLocator, GradientLocator
+from .corpus import RESOLUTIONS, synthetic_frame, iris_centers
+
+
+def eye_crops(size, count=41, noise=4.0, seed=0):
+    """
+    Returns (eye_frame, truth, side) crops of synthetic frames sweeping
+    the gaze from right to left, with sensor noise and blur, truth being
+    the iris center in eye frame coordinates
+
+    Arguments:
+        size (tuple): Frame (width, height)
+        count (int): Number of frames, two crops each
+        noise (float): Standard deviation of the sensor noise (gray levels)
+        seed (int): Seed of the noise
+    """
+    rng = np.random.default_rng(seed)
+    crops = []
+    for index, gaze in enumerate(np.linspace(-1.0, 1.0, count)):
+        frame, landmarks = synthetic_frame(size, seed=index, gaze=gaze)
+        frame = np.clip(frame + rng.normal(0.0, noise, frame.shape), 0, 255).astype(np.uint8)
+        gray = cv2.cvtColor(cv2.GaussianBlur(frame, (3, 3), 0), cv2.COLOR_BGR2GRAY)
+        truth = iris_centers(landmarks, gaze)
+        for side in (0, 1):
+            eye = Eye(gray, landmarks, side)
+            crops.append((eye.frame, truth[side] - np.array(eye.origin), side))
+    return crops
+
+
+def compare(locator, crops, thresholds, repeat=5):
+    """
+    Locates the pupil of every crop and returns the located rate, the
+    error to the ground truth (pixels) and the time per crop
+
+    Arguments:
+        locator: Pupil locator (see action_monitor.locators)
+        crops (list): (eye_frame, truth, side) tuples of eye_crops()
+        thresholds (tuple): Calibrated threshold of each eye
+        repeat (int): Number of timed passes over the crops
+    """
+    pupils = [locator.locate(eye_frame, thresholds[side]) for eye_frame, _, side in crops]
+    start = perf_counter()
+    for _ in range(repeat):
+        for eye_frame, _, side in crops:
+            locator.locate(eye_frame, thresholds[side])
+    elapsed = perf_counter() - start
+
+    errors = np.array([np.hypot(pupil.x - truth[0], pupil.y - truth[1])
+                       for pupil, (_, truth, _) in zip(pupils, crops) if pupil.x is not None])
+    return {
+        "located": len(errors) / len(crops),
+        "mean_error_px": float(errors.mean()) if len(errors) else None,
+        "p95_error_px": float(np.percentile(errors, 95)) if len(errors) else None,
+        "max_error_px": float(errors.max()) if len(errors) else None,
+        "us_per_crop": elapsed / (repeat * len(crops)) * 1e6,
+    }
+
+
+def run(size, count, noise, repeat):
+    """
+    Compares the pupil locators on the same eye crops, the threshold
+    locator being calibrated on the first crops as in a live session
+    """
+    crops = eye_crops(size, count, noise)
+    calibration = Calibration()
+    for eye_frame, _, side in crops:
+        if calibration.is_complete():
+            break
+        calibration.evaluate(eye_frame, side)
+    thresholds = (calibration.threshold(0), calibration.threshold(1))
+
+    return {"crops": len(crops),
+            "threshold": compare(ThresholdLocator(), crops, thresholds, repeat),
+            "gradient": compare(GradientLocator(), crops, thresholds, repeat)}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Accuracy and latency of the pupil locators on synthetic eyes")
+    parser.add_argument("--resolutions", nargs="+", default=["480p", "720p"], choices=list(RESOLUTIONS),
+                        help="frame resolutions")
+    parser.add_argument("--frames", type=int, default=41, help="number of synthetic frames, two eyes each")
+    parser.add_argument("--noise", type=float, default=4.0, help="sensor noise (gray levels)")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed passes over the crops")
+    parser.add_argument("--threads", type=int, default=1, help="OpenCV threads, 1 for reproducible timings")
+    parser.add_argument("--output", default=None, help="JSON file the report is written to")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    cv2.setNumThreads(args.threads)
+    results = {}
+    for resolution in args.resolutions:
+        results[resolution] = run(RESOLUTIONS[resolution], args.frames, args.noise, args.repeat)
+        print(json.dumps({"resolution": resolution, **results[resolution]}))
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump({"settings": vars(args), "results": results}, output_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
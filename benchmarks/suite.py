@@ -0,0 +1,282 @@
+import os
+import gc
+import platform
+from itertools import count
+from time import perf_counter
+
+import numpy as np
+import cv2
+
+from face_features_detector.eye import Eye
+from face_features_detector.mouth import Mouth
+from face_features_detector.geometry import landmark_features
+from face_features_detector.buffers import BufferPool
+from face_features_detector.landmark_tracker import LandmarkTracker, OneEuroFilter
+from face_features_detector.change_gate import ChangeGate
+from action_monitor import ActionMonitor
+from action_monitor.pupil import Pupil
+from action_monitor.gradient_pupil import GradientPupil
+from action_monitor.calibration import Calibration
+from condition_monitor import ConditionMonitor
+from runtime import MonitoringSession
+from rules import RuleEngine, DEFAULT_RULES
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "face_features_detector",
+                          "models", "shape_predictor_68_face_landmarks.dat")
+
+
+class SyntheticDetector(object):
+    """
+    Stand-in for FaceFeaturesDetector that takes landmarks from the
+    corpus instead of DLib, so the stages after detection can be
+    measured without the model. Set `next_landmarks` before refresh().
+    """
+
+    def __init__(self):
+        self.frame = None
+        self.face = None
+        self.landmarks = None
+        self.next_landmarks = None
+        self.reacquired = False
+        self.eye_left = None
+        self.eye_right = None
+        self.mouth = None
+        self.pool = BufferPool()
+
+    def refresh(self, frame, timestamp=None):
+        self.frame = frame
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.pool.get("gray", frame.shape[:2]))
+        self.landmarks = self.next_landmarks
+        self.eye_left = Eye(gray, self.landmarks, 0, self.pool)
+        self.eye_right = Eye(gray, self.landmarks, 1, self.pool)
+        self.mouth = Mouth(gray, self.landmarks, self.pool)
+
+    def annotate(self, overlay):
+        for region in (self.eye_left, self.eye_right, self.mouth):
+            overlay.hull(region.landmark_points, (0, 255, 0))
+
+
+def detector_available():
+    """Returns true if DLib and the landmark model can be loaded"""
+    try:
+        import dlib  # noqa: F401
+    except ImportError:
+        return False
+    return os.path.exists(MODEL_PATH)
+
+
+def measure(func, items, repeat=3, warmup=5, setup=None):
+    """
+    Calls func on every item `repeat` times and returns the latency
+    of each call in seconds.
+
+    Arguments:
+        func: Callable taking one item
+        items (list): Inputs
+        repeat (int): Number of passes over the items
+        warmup (int): Number of untimed calls before measuring
+        setup: Callable taking the item, called untimed before each call of func
+    """
+    for item in items[:warmup]:
+        if setup is not None:
+            setup(item)
+        func(item)
+
+    latencies = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for item in items:
+                if setup is not None:
+                    setup(item)
+                start = perf_counter()
+                func(item)
+                latencies.append(perf_counter() - start)
+    finally:
+        gc.enable()
+    return np.array(latencies)
+
+
+def summarize(latencies):
+    """Returns latency percentiles (milliseconds) and throughput (calls per second)"""
+    return {
+        "iterations": int(len(latencies)),
+        "mean_ms": float(latencies.mean() * 1000),
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "throughput": float(len(latencies) / latencies.sum()) if latencies.sum() > 0 else 0.0,
+    }
+
+
+def component_benchmarks(corpus, repeat=3):
+    """
+    Times each component in isolation on a corpus with landmarks.
+
+    Arguments:
+        corpus (list): (frame, landmarks) tuples
+        repeat (int): Number of passes over the corpus
+
+    Returns:
+        Dictionary of benchmark name to summary
+    """
+    frames = [frame for frame, _ in corpus]
+    grays = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames]
+    pairs = [(gray, landmarks) for gray, (_, landmarks) in zip(grays, corpus)]
+    eye_frames = [Eye(gray, landmarks, side).frame for gray, landmarks in pairs for side in (0, 1)]
+    thresholds = [Calibration.find_best_threshold(eye_frame) for eye_frame in eye_frames]
+    batch = np.stack([landmarks for _, landmarks in corpus])
+    tracker = LandmarkTracker()
+    smoothing = OneEuroFilter()
+    steps = [(previous, gray, landmarks) for previous, (gray, landmarks) in zip(grays, pairs[1:])]
+
+    def track(step):
+        tracker.reset(step[0], step[2])
+        tracker.track(step[1])
+
+    results = {
+        "grayscale": measure(lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), frames, repeat),
+        "isolation": measure(lambda pair: (Eye(pair[0], pair[1], 0), Eye(pair[0], pair[1], 1),
+                                           Mouth(pair[0], pair[1])), pairs, repeat),
+        "geometry": measure(landmark_features, list(batch), repeat),
+        "geometry_batch": measure(landmark_features, [batch], repeat * 10, warmup=1),
+        "pupil": measure(lambda item: Pupil(*item), list(zip(eye_frames, thresholds)), repeat),
+        "pupil_gradient": measure(GradientPupil, eye_frames, repeat),
+        "calibration": measure(Calibration.find_best_threshold, eye_frames, repeat),
+        "landmark_tracking": measure(track, steps, repeat),
+        "landmark_smoothing": measure(lambda landmarks: smoothing(landmarks, perf_counter()), list(batch), repeat),
+    }
+
+    detector = SyntheticDetector()
+    action_monitor = ActionMonitor(detector)
+    condition_monitor = ConditionMonitor(detector)
+
+    def refresh(item):
+        detector.next_landmarks = item[1]
+        detector.refresh(item[0])
+
+    # Monitors are timed alone, the synthetic refresh runs untimed before each frame
+    results["action_monitor"] = measure(lambda item: action_monitor.extract(), corpus, repeat, setup=refresh)
+    results["condition_monitor"] = measure(lambda item: condition_monitor.extract(), corpus, repeat, setup=refresh)
+
+    # Alert rules over the features of the corpus, 30 frames per second
+    features = []
+    for item in corpus:
+        refresh(item)
+        frame_features = action_monitor.extract()
+        frame_features.update(condition_monitor.extract())
+        features.append(frame_features)
+    engine = RuleEngine(DEFAULT_RULES)
+    clock = count(0.0, 1.0 / 30.0)
+    results["rules"] = measure(lambda frame_features: engine.update(frame_features, next(clock)), features, repeat)
+
+    return {name: summarize(latencies) for name, latencies in results.items()}
+
+
+def end_to_end_benchmarks(corpus, repeat=3):
+    """
+    Times the whole per frame loop (MonitoringSession.process and
+    render, or process alone in headless mode). Uses
+    FaceFeaturesDetector when the model is available, otherwise the
+    synthetic detector with corpus landmarks.
+
+    Arguments:
+        corpus (list): (frame, landmarks) tuples, landmarks may be None with the real detector
+        repeat (int): Number of passes over the corpus
+
+    Returns:
+        Dictionary of benchmark name to summary
+    """
+    results = {}
+
+    if all(landmarks is not None for _, landmarks in corpus):
+        detector = SyntheticDetector()
+        session = MonitoringSession(detector, ActionMonitor(detector), ConditionMonitor(detector), verbose=False)
+
+        def process(item):
+            detector.next_landmarks = item[1]
+            session.render(session.process(item[0]))
+
+        def process_headless(item):
+            detector.next_landmarks = item[1]
+            session.process(item[0])
+
+        results["end_to_end_synthetic"] = summarize(measure(process, corpus, repeat))
+
+        session.headless = True
+        results["end_to_end_synthetic_headless"] = summarize(measure(process_headless, corpus, repeat))
+
+        # Static scene: the first frame with sensor noise, mostly skipped by the change gate
+        rng = np.random.default_rng(0)
+        frame, landmarks = corpus[0]
+        static = [(cv2.add(frame, rng.integers(0, 4, frame.shape, dtype=np.uint8)), landmarks) for _ in corpus]
+        for name, gate in (("static", None), ("static_gated", ChangeGate())):
+            session = MonitoringSession(detector, ActionMonitor(detector), ConditionMonitor(detector),
+                                        verbose=False, headless=True, gate=gate)
+            summary = summarize(measure(process_headless, static, repeat))
+            if gate is not None:
+                summary["hit_rate"] = gate.stats["hit_rate"]
+            results[f"end_to_end_synthetic_{name}"] = summary
+
+    if detector_available():
+        from face_features_detector import FaceFeaturesDetector
+
+        for name, options in (("full", {}), ("tracking", {"tracking": True}),
+                              ("scale_0.5", {"detection_scale": 0.5})):
+            detector = FaceFeaturesDetector(**options)
+            session = MonitoringSession(detector, ActionMonitor(detector), ConditionMonitor(detector),
+                                        verbose=False)
+            faces = []
+
+            def process(item):
+                session.render(session.process(item[0]))
+                faces.append(detector.face is not None)
+
+            summary = summarize(measure(process, corpus, repeat))
+            summary["face_rate"] = float(np.mean(faces))
+            results[f"end_to_end_{name}"] = summary
+
+    return results
+
+
+def environment():
+    """Returns description of the machine and library versions"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "opencv_threads": cv2.getNumThreads(),
+    }
+
+
+def compare(results, baseline, tolerance=0.15, metric="p50_ms"):
+    """
+    Returns regressions of results against a baseline: benchmarks whose
+    latency grew by more than `tolerance` (relative).
+
+    Arguments:
+        results (dict): Benchmark report
+        baseline (dict): Saved benchmark report
+        tolerance (float): Allowed relative slowdown
+        metric (str): Latency metric to compare
+    """
+    regressions = []
+    for resolution, benchmarks in results["results"].items():
+        for name, summary in benchmarks.items():
+            base = baseline.get("results", {}).get(resolution, {}).get(name)
+            if base is None or base[metric] <= 0:
+                continue
+            change = summary[metric] / base[metric] - 1.0
+            if change > tolerance:
+                regressions.append({
+                    "resolution": resolution,
+                    "benchmark": name,
+                    "baseline": base[metric],
+                    "current": summary[metric],
+                    "change": change,
+                })
+    return regressions
@@ -1 +1,5 @@
-from .face_features_detector import FaceFeaturesDetector
+from .face_features_detector import FaceFeaturesDetector, load_models
+from .buffers import BufferPool
+from .overlay import Overlay, TextSprites
+from .landmark_tracker import LandmarkTracker, OneEuroFilter, EYE_MOUTH_POINTS
+from .change_gate import ChangeGate
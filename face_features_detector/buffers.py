@@ -0,0 +1,102 @@
+import numpy as np
+
+
+class BufferPool(object):
+    """
+    This class hands out reusable destination arrays for the per
+    frame path, so steady state processing allocates (almost) nothing:
+    - get(): a buffer of a fixed shape, e.g. the grayscale frame
+    - view(): an array backed by a buffer that only ever grows, for
+      crops, masks and windows whose size changes from frame to frame
+    - next(): rotates through a ring of buffers, for outputs handed
+      to another thread (e.g. the annotated frame shown by display)
+    """
+
+    def __init__(self, ring_size=3):
+        """
+        Arguments:
+            ring_size (int): Number of buffers next() rotates through
+        """
+        self.ring_size = ring_size
+        self.allocations = 0
+        self._buffers = {}
+        self._rings = {}
+
+    def _allocate(self, shape, dtype):
+        self.allocations += 1
+        return np.empty(shape, dtype)
+
+    def reserve(self, frame_shape):
+        """
+        Allocates the buffers of a frame size up front
+
+        Arguments:
+            frame_shape (tuple): Shape of the BGR camera frame
+        """
+        height, width = frame_shape[:2]
+        self.get("gray", (height, width))
+        for _ in range(self.ring_size):
+            self.next("annotated", frame_shape)
+        # Eye and mouth crops are a small part of the frame
+        for name in ("eye_left", "eye_right", "mouth"):
+            self.view(name, (height // 4, width // 4))
+            self.view(name + "_mask", (height // 4, width // 4))
+
+    def get(self, name, shape, dtype=np.uint8):
+        """
+        Returns the buffer of the given name, reallocated only when
+        shape or type change
+
+        Arguments:
+            name (str): Buffer name
+            shape (tuple): Buffer shape
+            dtype: Buffer type
+        """
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+            buffer = self._allocate(shape, dtype)
+            self._buffers[name] = buffer
+        return buffer
+
+    def view(self, name, shape, dtype=np.uint8):
+        """
+        Returns a C-contiguous array of the given shape backed by a flat
+        buffer, which grows (with some headroom) when it is too small
+
+        Arguments:
+            name (str): Buffer name
+            shape (tuple): Shape of the array
+            dtype: Buffer type
+        """
+        size = int(np.prod(shape))
+        backing = self._buffers.get(name)
+        if backing is None or backing.dtype != dtype or backing.size < size:
+            capacity = max(size, backing.size if backing is not None else 0)
+            backing = self._allocate(int(capacity * 1.25) + 1, dtype)
+            self._buffers[name] = backing
+        return backing[:size].reshape(shape)
+
+    def next(self, name, shape, dtype=np.uint8):
+        """
+        Returns the next buffer of a ring, reallocated only when shape
+        or type change
+
+        Arguments:
+            name (str): Ring name
+            shape (tuple): Buffer shape
+            dtype: Buffer type
+        """
+        ring = self._rings.get(name)
+        if ring is None:
+            ring = self._rings[name] = [[], 0]
+        buffers, index = ring
+
+        if len(buffers) < self.ring_size:
+            buffer = self._allocate(shape, dtype)
+            buffers.append(buffer)
+        else:
+            buffer = buffers[index]
+            if buffer.shape != tuple(shape) or buffer.dtype != dtype:
+                buffer = buffers[index] = self._allocate(shape, dtype)
+        ring[1] = (index + 1) % self.ring_size
+        return buffer
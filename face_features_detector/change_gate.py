@@ -0,0 +1,101 @@
+import numpy as np
+import cv2
+
+
+class ChangeGate(object):
+    """
+    This class tells whether a frame is nearly identical to the last
+    analyzed frame, e.g. in a parked vehicle, so the previous landmarks
+    and pupils can be reused instead of analyzing it again.
+
+    Frames are compared on a small grayscale thumbnail of the face
+    region (the whole frame while there is no face). Area downscaling
+    averages sensor noise away, the largest thumbnail pixel difference
+    catches local changes like a blink. Frames are compared with the
+    last analyzed frame rather than the previous one, so slow changes
+    add up, and analysis is forced after `max_reuse` reused frames.
+    """
+
+    def __init__(self, threshold=8, size=(32, 32), margin=0.2, max_reuse=15):
+        """
+        Arguments:
+            threshold (int): Largest thumbnail difference (gray levels) of a reusable frame
+            size (tuple): Thumbnail (width, height)
+            margin (float): Margin around the face box, relative to its size
+            max_reuse (int): Number of frames after which a frame is analyzed anyway
+        """
+        self.threshold = threshold
+        self.size = tuple(size)
+        self.margin = margin
+        self.max_reuse = max_reuse
+        self.stats = {"hits": 0, "misses": 0, "hit_rate": 0.0}
+        self._region = None
+        self._reused = 0
+        self._thumbnail = np.empty(self.size[::-1] + (3,), np.uint8)
+        self._gray = np.empty(self.size[::-1], np.uint8)
+        self._reference = np.empty(self.size[::-1], np.uint8)
+        self._diff = np.empty(self.size[::-1], np.uint8)
+
+    def _face_region(self, shape, face):
+        """
+        Returns (left, top, right, bottom, step) of the compared region,
+        sized so that every `step` row of it area downscales to the
+        thumbnail by integer factors (fast path). Skipping rows doesn't
+        copy the frame, skipping columns would.
+
+        Arguments:
+            shape (tuple): Frame shape
+            face (tuple): Face box (left, top, right, bottom), None for the whole frame
+        """
+        height, width = shape[:2]
+        left, top, right, bottom = 0, 0, width, height
+        if face is not None:
+            dx = int((face[2] - face[0]) * self.margin)
+            dy = int((face[3] - face[1]) * self.margin)
+            left, top = max(face[0] - dx, 0), max(face[1] - dy, 0)
+            right, bottom = min(face[2] + dx, width), min(face[3] + dy, height)
+            if right - left < self.size[0] or bottom - top < self.size[1]:
+                left, top, right, bottom = 0, 0, width, height
+
+        step = max((bottom - top) // (4 * self.size[1]), 1)
+        extra_x = (right - left) % self.size[0]
+        extra_y = (bottom - top) % (self.size[1] * step)
+        left, top = left + extra_x // 2, top + extra_y // 2
+        return left, top, right - extra_x + extra_x // 2, bottom - extra_y + extra_y // 2, step
+
+    def check(self, frame, face=None):
+        """
+        Returns true if the results of the last analyzed frame can be
+        reused for this frame. Otherwise the frame becomes the reference
+        and should be analyzed.
+
+        Arguments:
+            frame (numpy.ndarray): BGR frame
+            face (tuple): Face box (left, top, right, bottom) of the last
+                analyzed frame, None if there was no face
+        """
+        region = self._face_region(frame.shape, face)
+        left, top, right, bottom, step = region
+        cv2.resize(frame[top:bottom:step, left:right], self.size, dst=self._thumbnail, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._thumbnail, cv2.COLOR_BGR2GRAY, dst=self._gray)
+
+        if region == self._region and self._reused < self.max_reuse:
+            cv2.absdiff(self._gray, self._reference, dst=self._diff)
+            if self._diff.max() <= self.threshold:
+                self._reused += 1
+                self._count("hits")
+                return True
+
+        self._region = region
+        self._reused = 0
+        self._reference, self._gray = self._gray, self._reference
+        self._count("misses")
+        return False
+
+    def _count(self, name):
+        self.stats[name] += 1
+        self.stats["hit_rate"] = self.stats["hits"] / (self.stats["hits"] + self.stats["misses"])
+
+    def reset(self):
+        """Forgets the reference frame, the next frame is analyzed"""
+        self._region = None
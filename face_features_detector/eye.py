@@ -1,6 +1,4 @@
-import dlib
-import numpy as np
-import cv2
+from .region import isolate_region
 
 
 class Eye(object):
@@ -11,7 +9,8 @@ class Eye(object):
     LEFT_EYE_POINTS = [36, 37, 38, 39, 40, 41]
     RIGHT_EYE_POINTS = [42, 43, 44, 45, 46, 47]
 
-    def __init__(self, original_frame, landmarks, side):
+    def __init__(self, original_frame, landmarks, side, pool=None):
+        self.pool = pool
         self.frame = None
         self.origin = None
         self.center = None
@@ -23,29 +22,14 @@ class Eye(object):
 
         Arguments:
             frame (numpy.ndarray): Frame containing the face
-            landmarks (dlib.full_object_detection): Facial landmarks for the face region
+            landmarks (numpy.ndarray): Facial landmarks (68, 2) for the face region
             points (list): Points of an eye (from the 68 Multi-PIE landmarks)
         """
-        region = np.array([(landmarks.part(point).x, landmarks.part(point).y) for point in points])
-        region = region.astype(np.int32)
+        region = landmarks[points]
         self.landmark_points = region
 
-        # Applying a mask to get only the eye
-        height, width = frame.shape[:2]
-        black_frame = np.zeros((height, width), np.uint8)
-        mask = np.full((height, width), 255, np.uint8)
-        cv2.fillPoly(mask, [region], (0, 0, 0))
-        eye = cv2.bitwise_not(black_frame, frame.copy(), mask=mask)
-
-        # Cropping on the eye
-        margin = 5
-        min_x = np.min(region[:, 0]) - margin
-        max_x = np.max(region[:, 0]) + margin
-        min_y = np.min(region[:, 1]) - margin
-        max_y = np.max(region[:, 1]) + margin
-
-        self.frame = eye[min_y:max_y, min_x:max_x]
-        self.origin = (min_x, min_y)
+        name = "eye_left" if points is self.LEFT_EYE_POINTS else "eye_right"
+        self.frame, self.origin = isolate_region(frame, region, pool=self.pool, name=name)
 
         height, width = self.frame.shape[:2]
         self.center = (width / 2, height / 2)
@@ -55,7 +39,7 @@ class Eye(object):
 
         Arguments:
             original_frame (numpy.ndarray): Frame from camera / video
-            landmarks (dlib.full_object_detection): Facial landmarks for the face region
+            landmarks (numpy.ndarray): Facial landmarks (68, 2) for the face region
             side: Indicates whether it's the left eye (0) or the right eye (1)
         """
         if side == 0:
@@ -1,9 +1,50 @@
 import os
+import time
+import threading
 import cv2
-import dlib
+import numpy as np
 
 from .eye import Eye
 from .mouth import Mouth
+from .geometry import shape_to_array
+from .buffers import BufferPool
+from .overlay import Overlay
+from .landmark_tracker import LandmarkTracker, OneEuroFilter
+from metrics import timings
+
+
+_models = None
+_models_lock = threading.Lock()
+
+
+def load_models(shared=True):
+    """
+    Returns the face detector and the face landmark detector (DLib).
+    They are loaded once per process and shared by all detectors,
+    processes forked afterwards share the loaded model as well.
+    Can be called from a thread to load the models in the background,
+    other callers wait for it.
+
+    Arguments:
+        shared (bool): Return the process wide models, else load a private
+            copy, e.g. for a thread analyzing concurrently with others
+            (DLib models aren't documented as thread safe)
+    """
+    global _models
+    if not shared:
+        return _load_models()
+    with _models_lock:
+        if _models is None:
+            _models = _load_models()
+    return _models
+
+
+def _load_models():
+    # Importing DLib is slow, it is only imported with the models
+    import dlib
+    cwd = os.path.abspath(os.path.dirname(__file__))
+    model_path = os.path.abspath(os.path.join(cwd, "models/shape_predictor_68_face_landmarks.dat"))
+    return dlib.get_frontal_face_detector(), dlib.shape_predictor(model_path)
 
 
 class FaceFeaturesDetector(object):
@@ -13,55 +54,248 @@ class FaceFeaturesDetector(object):
     from DLib is used.
     """
 
-    def __init__(self):
+    def __init__(self, tracking=False, redetect_interval=10, search_margin=0.5, detection_scale=1.0,
+                 landmark_tracking=False, predict_interval=5, smoothing=False, models=None):
+        """
+        Arguments:
+            tracking (bool): Search for the face around the last known face box
+                instead of running the detector over the whole frame every time
+            redetect_interval (int): Number of frames after which a full frame
+                detection is forced, even if the face is still tracked
+            search_margin (float): How much the search window grows around the
+                last face box on each side, relative to the box size
+            detection_scale (float): Scale of the image the face detector runs on
+                (e.g. 0.5 or 0.25). Face boxes are mapped back to full resolution,
+                landmarks are always predicted on the full resolution frame.
+                Keep in mind that the detector doesn't find faces smaller
+                than about 80x80 pixels at the detection scale.
+            landmark_tracking (bool): Follow landmarks with optical flow between
+                shape predictor runs. Face detection is skipped while they're tracked.
+            predict_interval (int): Number of frames after which the shape predictor
+                runs again, even if landmarks are still tracked
+            smoothing (bool): Smooth landmarks over time with a One-Euro filter,
+                against jitter of eye and mouth aspect ratios
+            models (tuple): Face detector and face landmark detector (see
+                load_models), the process wide models if None
+        """
         self.frame = None
+        self.face = None
+        self.landmarks = None
+        self.pool = BufferPool()
         self.eye_left = None
         self.eye_right = None
         self.mouth = None
 
-        # Face detector (DLib)
-        self._face_detector = dlib.get_frontal_face_detector()
+        # Face tracking
+        self.tracking = tracking
+        self.redetect_interval = redetect_interval
+        self.search_margin = search_margin
+        self.detection_scale = detection_scale
+        self.reacquired = False
+        self.tracking_stats = {
+            "full_detections": 0,
+            "window_detections": 0,
+            "window_misses": 0,
+            "reacquisitions": 0,
+            "losses": 0,
+            "landmark_predictions": 0,
+            "landmark_tracked": 0,
+            "landmark_tracking_failures": 0,
+        }
+        self._frames_since_detection = 0
+
+        # Landmark tracking and smoothing
+        self.landmark_tracker = LandmarkTracker() if landmark_tracking else None
+        self.predict_interval = predict_interval
+        self.landmark_filter = OneEuroFilter() if smoothing else None
+        self._raw_landmarks = None
+        self._frames_since_prediction = 0
+
+        # Face detector and face landmark detector (DLib), shared by all detectors by default
+        self._face_detector, self._predictor = models if models is not None else load_models()
+
+    def _run_detector(self, frame):
+        """Runs the face detector on a downscaled copy of the frame and
+        maps the face boxes back to the frame resolution.
+
+        Arguments:
+            frame (numpy.ndarray): Grayscale frame (or a window of it)
+
+        Returns:
+            List of dlib.rectangle in frame coordinates
+        """
+        scale = self.detection_scale
+        if scale == 1.0:
+            return list(self._face_detector(frame))
+
+        height, width = frame.shape[:2]
+        size = (max(int(round(width * scale)), 1), max(int(round(height * scale)), 1))
+        small = cv2.resize(frame, size, dst=self.pool.view("detection", size[::-1]), interpolation=cv2.INTER_AREA)
+        faces = self._face_detector(small)
+        # Boxes keep the rectangle type of the detector (dlib.rectangle)
+        return [type(rect)(int(round(rect.left() / scale)), int(round(rect.top() / scale)),
+                           int(round(rect.right() / scale)), int(round(rect.bottom() / scale)))
+                for rect in faces]
+
+    def _search_window(self, frame, face):
+        """Looks for the face in a window around the last known face box.
+
+        Arguments:
+            frame (numpy.ndarray): Grayscale frame
+            face (dlib.rectangle): Last known face box
+
+        Returns:
+            dlib.rectangle of the face in frame coordinates or None
+        """
+        height, width = frame.shape[:2]
+        margin_x = int(face.width() * self.search_margin)
+        margin_y = int(face.height() * self.search_margin)
+        left = max(face.left() - margin_x, 0)
+        top = max(face.top() - margin_y, 0)
+        right = min(face.right() + margin_x, width)
+        bottom = min(face.bottom() + margin_y, height)
+        if right <= left or bottom <= top:
+            return None
+
+        window = self.pool.view("window", (bottom - top, right - left))
+        np.copyto(window, frame[top:bottom, left:right])
+        faces = self._run_detector(window)
+        if len(faces) == 0:
+            return None
+
+        found = max(faces, key=lambda rect: rect.area())
+        return type(found)(found.left() + left, found.top() + top,
+                           found.right() + left, found.bottom() + top)
+
+    def _detect_face(self, frame):
+        """Returns the face box for the frame, or None if there is no face.
+
+        Without tracking the detector runs over the whole frame. With
+        tracking a full detection only runs every `redetect_interval`
+        frames or after the face has been lost, otherwise a window around
+        the last face box is searched.
+
+        Arguments:
+            frame (numpy.ndarray): Grayscale frame
+        """
+        self.reacquired = False
+
+        if not self.tracking:
+            faces = self._run_detector(frame)
+            face = faces[0] if len(faces) else None
+            self.reacquired = face is not None and self.face is None
+            return face
+
+        if self.face is not None and self._frames_since_detection < self.redetect_interval:
+            face = self._search_window(frame, self.face)
+            if face is not None:
+                self._frames_since_detection += 1
+                self.tracking_stats["window_detections"] += 1
+                return face
+            self.tracking_stats["window_misses"] += 1
+
+        faces = self._run_detector(frame)
+        self._frames_since_detection = 0
+        self.tracking_stats["full_detections"] += 1
+        face = faces[0] if len(faces) else None
+
+        if face is None and self.face is not None:
+            self.tracking_stats["losses"] += 1
+        elif face is not None and self.face is None:
+            self.reacquired = True
+            self.tracking_stats["reacquisitions"] += 1
 
-        # Face landmark detector (DLib)
-        cwd = os.path.abspath(os.path.dirname(__file__))
-        model_path = os.path.abspath(os.path.join(cwd, "models/shape_predictor_68_face_landmarks.dat"))
-        self._predictor = dlib.shape_predictor(model_path)
+        return face
 
-    def _analyze(self):
+    def _track_landmarks(self, frame):
+        """Returns the landmarks followed from the last frame, or None if
+        they aren't tracked or the shape predictor is due
+
+        Arguments:
+            frame (numpy.ndarray): Grayscale frame
+        """
+        if self.landmark_tracker is None or self._raw_landmarks is None \
+                or self._frames_since_prediction >= self.predict_interval:
+            return None
+
+        with timings.stage("landmark_tracking"):
+            landmarks = self.landmark_tracker.track(frame)
+        if landmarks is None:
+            self.tracking_stats["landmark_tracking_failures"] += 1
+            return None
+
+        # The face box moves with the landmarks
+        dx, dy = np.rint(landmarks.mean(axis=0) - self._raw_landmarks.mean(axis=0)).astype(int)
+        self.face = type(self.face)(self.face.left() + int(dx), self.face.top() + int(dy),
+                                    self.face.right() + int(dx), self.face.bottom() + int(dy))
+        self.reacquired = False
+        self._frames_since_prediction += 1
+        self.tracking_stats["landmark_tracked"] += 1
+        return landmarks
+
+    def _analyze(self, timestamp):
         """Detects the face and initialize Eye objects"""
-        frame = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
-        faces = self._face_detector(frame)
+        with timings.stage("grayscale"):
+            frame = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY, dst=self.pool.get("gray", self.frame.shape[:2]))
 
-        try:
-            landmarks = self._predictor(frame, faces[0])
-            self.eye_left = Eye(frame, landmarks, 0)
-            self.eye_right = Eye(frame, landmarks, 1)
-            self.mouth = Mouth(frame, landmarks)
+        landmarks = self._track_landmarks(frame)
+        if landmarks is None:
+            with timings.stage("face_detection"):
+                self.face = self._detect_face(frame)
 
-        except IndexError:
-            self.eye_left = None
-            self.eye_right = None
-            self.mouth = None
+            if self.face is None:
+                self.landmarks = None
+                self.eye_left = None
+                self.eye_right = None
+                self.mouth = None
+                self._raw_landmarks = None
+                if self.landmark_tracker is not None:
+                    self.landmark_tracker.reset()
+                if self.landmark_filter is not None:
+                    self.landmark_filter.reset()
+                return
 
-    def refresh(self, frame):
+            with timings.stage("landmark_prediction"):
+                landmarks = shape_to_array(self._predictor(frame, self.face))
+            self._frames_since_prediction = 0
+            self.tracking_stats["landmark_predictions"] += 1
+            if self.landmark_tracker is not None:
+                self.landmark_tracker.reset(frame, landmarks)
+
+        self._raw_landmarks = landmarks
+        if self.landmark_filter is not None:
+            landmarks = self.landmark_filter(landmarks, timestamp)
+        self.landmarks = landmarks if landmarks.dtype == np.int32 else np.rint(landmarks).astype(np.int32)
+
+        with timings.stage("isolation"):
+            self.eye_left = Eye(frame, self.landmarks, 0, self.pool)
+            self.eye_right = Eye(frame, self.landmarks, 1, self.pool)
+            self.mouth = Mouth(frame, self.landmarks, self.pool)
+
+    def refresh(self, frame, timestamp=None):
         """Refreshes the frame and analyzes it.
 
         Arguments:
             frame (numpy.ndarray): The frame to analyze
+            timestamp (float): Capture time of the frame in seconds, the
+                current time if None. Only used by landmark smoothing.
         """
         self.frame = frame
-        self._analyze()
+        self._analyze(time.time() if timestamp is None else timestamp)
 
     def annotated_frame(self):
         """Returns the main frame with eyes and mouth highlighted"""
-        frame = self.frame.copy()
+        overlay = Overlay()
+        self.annotate(overlay)
+        return overlay.render(self.frame.copy())
 
+    def annotate(self, overlay):
+        """Adds the highlighting of eyes and mouth to an overlay
+
+        Arguments:
+            overlay (Overlay): Draw commands of the frame
+        """
         color = (0, 255, 0)
-        left_eye_hull = cv2.convexHull(self.eye_left.landmark_points)
-        cv2.drawContours(frame, [left_eye_hull], -1, color)
-        right_eye_hull = cv2.convexHull(self.eye_right.landmark_points)
-        cv2.drawContours(frame, [right_eye_hull], -1, color)
-        mouth_hull = cv2.convexHull(self.mouth.landmark_points)
-        cv2.drawContours(frame, [mouth_hull], -1, color)
-
-        return frame
+        overlay.hull(self.eye_left.landmark_points, color)
+        overlay.hull(self.eye_right.landmark_points, color)
+        overlay.hull(self.mouth.landmark_points, color)
@@ -0,0 +1,110 @@
+import numpy as np
+
+LEFT_EYE_POINTS = [36, 37, 38, 39, 40, 41]
+RIGHT_EYE_POINTS = [42, 43, 44, 45, 46, 47]
+MOUTH_POINTS = [48, 49, 50, 51, 52, 53, 54, 55, 56, 57, 58, 59]
+
+
+def shape_to_array(shape, dtype=np.int32):
+    """
+    Converts DLib facial landmarks to a (68, 2) array of (x, y) points.
+
+    Arguments:
+        shape (dlib.full_object_detection): Facial landmarks for the face region
+        dtype: Data type of the array
+    """
+    return np.array([(point.x, point.y) for point in shape.parts()], dtype=dtype)
+
+
+def _distance(landmarks, a, b):
+    """
+    Returns euclidean distance between two landmarks.
+
+    Arguments:
+        landmarks (numpy.ndarray): Landmarks of shape (..., 68, 2)
+        a (int): Index of the first landmark
+        b (int): Index of the second landmark
+    """
+    diff = landmarks[..., a, :].astype(np.float64) - landmarks[..., b, :]
+    return np.hypot(diff[..., 0], diff[..., 1])
+
+
+def _ratio(width, height, default):
+    """Returns width / height, `default` where the height is zero"""
+    ratio = np.divide(width, height, out=np.full(np.shape(width), default, np.float64), where=height != 0)
+    return ratio if ratio.ndim else float(ratio)
+
+
+def eye_aspect_ratio(landmarks, points):
+    """
+    Returns aspect ratio (width / height) of an eye, 10.0 if the
+    eye height is zero.
+
+    Arguments:
+        landmarks (numpy.ndarray): Landmarks of shape (68, 2) or (T, 68, 2)
+        points (list): Points of an eye (from the 68 Multi-PIE landmarks)
+    """
+    width = _distance(landmarks, points[0], points[3])
+    height = _distance(landmarks, points[1], points[5])
+    return _ratio(width, height, 10.0)
+
+
+def mean_eye_aspect_ratio(landmarks):
+    """
+    Returns mean aspect ratio of both eyes.
+
+    Arguments:
+        landmarks (numpy.ndarray): Landmarks of shape (68, 2) or (T, 68, 2)
+    """
+    left = eye_aspect_ratio(landmarks, LEFT_EYE_POINTS)
+    right = eye_aspect_ratio(landmarks, RIGHT_EYE_POINTS)
+    return (left + right) / 2
+
+
+def mouth_aspect_ratio(landmarks):
+    """
+    Returns aspect ratio (width / height) of the mouth, 5.0 if the
+    mouth height is zero.
+
+    Arguments:
+        landmarks (numpy.ndarray): Landmarks of shape (68, 2) or (T, 68, 2)
+    """
+    width = _distance(landmarks, MOUTH_POINTS[0], MOUTH_POINTS[6])
+    height = _distance(landmarks, MOUTH_POINTS[3], MOUTH_POINTS[9])
+    return _ratio(width, height, 5.0)
+
+
+def inter_ocular_distance(landmarks):
+    """
+    Returns distance between the centers of the eyes.
+
+    Arguments:
+        landmarks (numpy.ndarray): Landmarks of shape (68, 2) or (T, 68, 2)
+    """
+    left = landmarks[..., LEFT_EYE_POINTS, :].mean(axis=-2)
+    right = landmarks[..., RIGHT_EYE_POINTS, :].mean(axis=-2)
+    diff = left - right
+    distance = np.hypot(diff[..., 0], diff[..., 1])
+    return distance if distance.ndim else float(distance)
+
+
+def landmark_features(landmarks):
+    """
+    Computes all geometric features of one frame (68, 2) or of
+    a batch of frames (T, 68, 2) at once.
+
+    Arguments:
+        landmarks (numpy.ndarray): Landmarks of shape (68, 2) or (T, 68, 2)
+
+    Returns:
+        Dictionary of features, floats for one frame or arrays of shape (T,)
+    """
+    left = eye_aspect_ratio(landmarks, LEFT_EYE_POINTS)
+    right = eye_aspect_ratio(landmarks, RIGHT_EYE_POINTS)
+    return {
+        "left_eye_aspect_ratio": left,
+        "right_eye_aspect_ratio": right,
+        "eye_aspect_ratio": (left + right) / 2,
+        "mouth_aspect_ratio": mouth_aspect_ratio(landmarks),
+        "inter_ocular_distance": inter_ocular_distance(landmarks),
+    }
@@ -0,0 +1,168 @@
+import math
+import numpy as np
+import cv2
+
+from .geometry import LEFT_EYE_POINTS, RIGHT_EYE_POINTS, MOUTH_POINTS
+
+EYE_MOUTH_POINTS = LEFT_EYE_POINTS + RIGHT_EYE_POINTS + MOUTH_POINTS
+
+
+class OneEuroFilter(object):
+    """
+    One-Euro filter (Casiez et al.) over an array of points. A low pass
+    filter whose cutoff frequency rises with the speed of the points:
+    still landmarks are smoothed strongly (no jitter), fast ones like
+    closing eyelids follow with little lag.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.05, d_cutoff=1.0):
+        """
+        Arguments:
+            min_cutoff (float): Cutoff frequency (Hz) of still points, lower is smoother
+            beta (float): Cutoff increase per pixel / second of speed, higher is less lag
+            d_cutoff (float): Cutoff frequency (Hz) of the speed estimate
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        """Forgets the filter state, e.g. after the face was lost"""
+        self._value = None
+        self._speed = None
+        self._timestamp = None
+
+    @staticmethod
+    def _alpha(cutoff, elapsed):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / elapsed)
+
+    def __call__(self, points, timestamp):
+        """
+        Returns filtered points
+
+        Arguments:
+            points (numpy.ndarray): (N, 2) points
+            timestamp (float): Time of the points in seconds
+        """
+        points = np.asarray(points, np.float64)
+        if self._value is None or timestamp <= self._timestamp:
+            self._value = points.copy()
+            self._speed = np.zeros(len(points))
+            self._timestamp = timestamp
+            return self._value
+
+        elapsed = timestamp - self._timestamp
+        self._timestamp = timestamp
+
+        speed = np.hypot(*(points - self._value).T) / elapsed
+        self._speed += self._alpha(self.d_cutoff, elapsed) * (speed - self._speed)
+
+        tau = 1.0 / (2 * math.pi * (self.min_cutoff + self.beta * self._speed))
+        alpha = 1.0 / (1.0 + tau / elapsed)
+        self._value += alpha[:, np.newaxis] * (points - self._value)
+        return self._value
+
+
+class LandmarkTracker(object):
+    """
+    This class follows facial landmarks from frame to frame with
+    pyramidal Lucas-Kanade optical flow, so the shape predictor only
+    has to run every few frames. Each point is tracked forwards and
+    backwards, the forward-backward error tells when tracking has
+    drifted and the predictor has to run again.
+    """
+
+    def __init__(self, points=None, win_size=(15, 15), max_level=2, max_error=1.0, max_lost=0.2):
+        """
+        Arguments:
+            points (list): Indices of the landmarks to track (e.g. EYE_MOUTH_POINTS),
+                all 68 if None. Other landmarks move with the tracked ones.
+            win_size (tuple): Size of the search window on each pyramid level
+            max_level (int): Number of pyramid levels above the frame
+            max_error (float): Median forward-backward error (pixels) above
+                which tracking fails
+            max_lost (float): Fraction of points that may be lost before tracking fails
+        """
+        self.points = points
+        self.win_size = win_size
+        self.max_level = max_level
+        self.max_error = max_error
+        self.max_lost = max_lost
+        self.criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+        self.error = None
+        self._previous = None
+        self._landmarks = None
+
+    def reset(self, gray=None, landmarks=None):
+        """
+        Restarts tracking from predicted landmarks, or stops it
+
+        Arguments:
+            gray (numpy.ndarray): Grayscale frame of the landmarks
+            landmarks (numpy.ndarray): (68, 2) landmarks, None to stop tracking
+        """
+        if landmarks is None:
+            self._landmarks = None
+            return
+
+        self._remember(gray)
+        self._landmarks = landmarks.astype(np.float32)
+
+    def _remember(self, gray):
+        """Keeps a copy of the frame, the caller reuses its buffer"""
+        if self._previous is None or self._previous.shape != gray.shape:
+            self._previous = np.empty_like(gray)
+        np.copyto(self._previous, gray)
+
+    def track(self, gray):
+        """
+        Returns the (68, 2) float landmarks in a new frame, or None when
+        tracking failed and the predictor has to run
+
+        Arguments:
+            gray (numpy.ndarray): Grayscale frame following the last one
+        """
+        if self._landmarks is None:
+            return None
+
+        subset = self._landmarks if self.points is None else self._landmarks[self.points]
+
+        # Optical flow only needs the face and the distance it can move,
+        # which is a window size on the top pyramid level
+        margin = max(self.win_size) << self.max_level
+        height, width = gray.shape[:2]
+        left, top = np.maximum(np.floor(subset.min(axis=0)).astype(int) - margin, 0)
+        right, bottom = np.minimum(np.ceil(subset.max(axis=0)).astype(int) + margin, (width, height))
+        previous = self._previous[top:bottom, left:right]
+        current = gray[top:bottom, left:right]
+        offset = np.float32([left, top])
+
+        start = (subset - offset).reshape(-1, 1, 2)
+        forward, status, _ = cv2.calcOpticalFlowPyrLK(previous, current, start, None, winSize=self.win_size,
+                                                      maxLevel=self.max_level, criteria=self.criteria)
+        backward, back_status, _ = cv2.calcOpticalFlowPyrLK(current, previous, forward, None, winSize=self.win_size,
+                                                            maxLevel=self.max_level, criteria=self.criteria)
+        forward = forward + offset
+
+        error = np.hypot(*(backward - start).reshape(-1, 2).T)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (error <= 2 * self.max_error)
+        self.error = float(np.median(error))
+        self._remember(gray)
+        if np.count_nonzero(~good) > self.max_lost * len(good) or self.error > self.max_error:
+            self._landmarks = None
+            return None
+
+        # Lost points (and points not tracked) move like the face
+        displacement = forward.reshape(-1, 2) - subset
+        shift = np.median(displacement[good], axis=0)
+        moved = self._landmarks + shift
+        if self.points is None:
+            moved[good] = forward.reshape(-1, 2)[good]
+        else:
+            indices = np.asarray(self.points)[good]
+            moved[indices] = forward.reshape(-1, 2)[good]
+
+        self._landmarks = moved
+        return moved
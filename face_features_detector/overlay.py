@@ -0,0 +1,139 @@
+import numpy as np
+import cv2
+
+
+class TextSprites(object):
+    """
+    This class caches rendered text. The labels shown on screen come from
+    a small fixed set, so each one is drawn with putText once and later
+    frames only copy its pixels.
+    """
+
+    def __init__(self, max_size=256):
+        """
+        Arguments:
+            max_size (int): Number of sprites kept before the cache is cleared
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._sprites = {}
+
+    def get(self, text, font, scale, color, thickness):
+        """
+        Returns the sprite of a text: (pixels, mask, offset of the sprite's
+        top left corner from the putText origin), or None when the text
+        is antialiased and can't be copied as a sprite
+        """
+        key = (text, font, scale, color, thickness)
+        if key in self._sprites:
+            self.hits += 1
+            return self._sprites[key]
+
+        self.misses += 1
+        if len(self._sprites) >= self.max_size:
+            self._sprites.clear()
+
+        (width, height), baseline = cv2.getTextSize(text, font, scale, thickness)
+        pad = thickness + 1
+        alpha = np.zeros((height + baseline + 2 * pad, width + 2 * pad), np.uint8)
+        cv2.putText(alpha, text, (pad, height + pad), font, scale, 255, thickness)
+
+        # Some OpenCV builds antialias Hershey text, blending it in numpy is
+        # slower than drawing it again
+        if np.count_nonzero((alpha > 0) & (alpha < 255)):
+            self._sprites[key] = None
+            return None
+
+        pixels = np.empty(alpha.shape + (3,), np.uint8)
+        pixels[:] = color
+        sprite = self._sprites[key] = (pixels, alpha, (-pad, -height - pad))
+        return sprite
+
+
+_sprites = TextSprites()
+
+
+class Overlay(object):
+    """
+    This class collects the annotations of a frame as draw commands,
+    so analysis only describes what to show and all of it is rendered
+    in one pass onto the displayed frame
+    """
+
+    def __init__(self, sprites=None):
+        """
+        Arguments:
+            sprites (TextSprites): Text cache, shared module wide by default
+        """
+        self.sprites = sprites if sprites is not None else _sprites
+        self.commands = []
+
+    def hull(self, points, color):
+        """
+        Outlines the convex hull of points
+
+        Arguments:
+            points (numpy.ndarray): (N, 2) points
+            color (tuple): BGR color
+        """
+        self.commands.append(("hull", points, color))
+
+    def cross(self, center, color, size=5):
+        """
+        Marks a point with a cross
+
+        Arguments:
+            center (tuple): (x, y) of the point
+            color (tuple): BGR color
+            size (int): Half length of the cross' lines
+        """
+        self.commands.append(("cross", center, color, size))
+
+    def text(self, text, origin, color, scale=1.0, thickness=2, font=cv2.FONT_HERSHEY_COMPLEX):
+        """
+        Adds text, drawn like cv2.putText with the same arguments
+
+        Arguments:
+            text (str): Text to show
+            origin (tuple): Bottom left corner of the text
+            color (tuple): BGR color
+        """
+        self.commands.append(("text", text, origin, color, scale, thickness, font))
+
+    def render(self, frame):
+        """
+        Draws all commands in place
+
+        Arguments:
+            frame (numpy.ndarray): BGR frame to draw on
+        """
+        for command in self.commands:
+            kind = command[0]
+            if kind == "hull":
+                cv2.drawContours(frame, [cv2.convexHull(command[1])], -1, command[2])
+            elif kind == "cross":
+                (x, y), color, size = command[1:]
+                cv2.line(frame, (x - size, y), (x + size, y), color)
+                cv2.line(frame, (x, y - size), (x, y + size), color)
+            else:
+                self._blit(frame, *command[1:])
+        return frame
+
+    def _blit(self, frame, text, origin, color, scale, thickness, font):
+        sprite = self.sprites.get(text, font, scale, color, thickness)
+        if sprite is None:
+            cv2.putText(frame, text, origin, font, scale, color, thickness)
+            return
+
+        pixels, mask, (dx, dy) = sprite
+        left, top = origin[0] + dx, origin[1] + dy
+        height, width = mask.shape
+
+        # Clip the sprite to the frame
+        x0, y0 = max(left, 0), max(top, 0)
+        x1, y1 = min(left + width, frame.shape[1]), min(top + height, frame.shape[0])
+        if x0 >= x1 or y0 >= y1:
+            return
+        rows, columns = slice(y0 - top, y1 - top), slice(x0 - left, x1 - left)
+        cv2.copyTo(pixels[rows, columns], mask[rows, columns], frame[y0:y1, x0:x1])
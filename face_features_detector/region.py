@@ -0,0 +1,59 @@
+import numpy as np
+import cv2
+
+
+def isolate_region(frame, region, margin=5, pool=None, name="region"):
+    """Isolates a polygon region of a frame, to have a frame with that
+    region only. Pixels outside of the polygon are painted white.
+
+    Only the bounding box of the region (plus margin) is touched, the
+    polygon mask is rasterized in the coordinates of that box. Where the
+    polygon reaches beyond the box, the mask is rasterized on the part
+    of the frame covering both, the frame border being the only place
+    the polygon is clipped, like with a full frame mask.
+
+    Arguments:
+        frame (numpy.ndarray): Grayscale frame containing the face
+        region (numpy.ndarray): Polygon points (N x 2, int32) in frame coordinates
+        margin (int): Margin added around the bounding box of the region
+        pool (BufferPool): Pool providing the crop and mask buffers, None to allocate them
+        name (str): Name of the pool buffers, the crop stays valid until the
+            next call with the same name
+
+    Returns:
+        Tuple of the isolated crop and its origin (x, y) in the frame
+    """
+    min_x = np.min(region[:, 0]) - margin
+    max_x = np.max(region[:, 0]) + margin
+    min_y = np.min(region[:, 1]) - margin
+    max_y = np.max(region[:, 1]) + margin
+
+    crop = frame[min_y:max_y, min_x:max_x]
+    if crop.size == 0:
+        return crop.copy(), (min_x, min_y)
+
+    # Slice semantics decide where the crop really starts (clipping, negative indices)
+    height, width = frame.shape[:2]
+    start_x, end_x, _ = slice(min_x, max_x).indices(width)
+    start_y, end_y, _ = slice(min_y, max_y).indices(height)
+
+    # Mask area: the crop, grown to the polygon within the frame
+    left = min(start_x, max(min_x + margin, 0))
+    top = min(start_y, max(min_y + margin, 0))
+    right = max(end_x, min(max_x - margin + 1, width))
+    bottom = max(end_y, min(max_y - margin + 1, height))
+
+    if pool is None:
+        mask = np.full((bottom - top, right - left), 255, np.uint8)
+        isolated = None
+    else:
+        mask = pool.view(name + "_mask", (bottom - top, right - left))
+        mask.fill(255)
+        isolated = pool.view(name, crop.shape[:2])
+
+    roi_region = (region - (left, top)).astype(np.int32)
+    cv2.fillPoly(mask, [roi_region], (0, 0, 0))
+    mask = mask[start_y - top:end_y - top, start_x - left:end_x - left]
+    isolated = cv2.max(crop, mask, dst=isolated)
+
+    return isolated, (min_x, min_y)
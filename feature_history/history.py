@@ -0,0 +1,208 @@
+import numpy as np
+
+
+class FeatureHistory(object):
+    """
+    This class keeps per frame features in a preallocated ring buffer
+    and maintains windowed sums incrementally, so rolling fatigue
+    metrics cost constant time per frame and memory stays fixed:
+    - PERCLOS: share of time the eyes were closed
+    - Blink rate: blinks (short eye closures) per minute
+    - Yawn rate: yawns per minute
+    - Mean eye and mouth aspect ratio
+    """
+
+    COLUMNS = {
+        "timestamp": np.float64,
+        "elapsed": np.float64,
+        "eye_aspect_ratio": np.float32,
+        "mouth_aspect_ratio": np.float32,
+        "horizontal_ratio": np.float32,
+        "vertical_ratio": np.float32,
+        "face_present": np.bool_,
+        "eyes_closed": np.bool_,
+        "blink": np.bool_,
+        "yawn": np.bool_,
+    }
+
+    def __init__(self, window=60.0, max_fps=30, eye_threshold=5.0, mouth_threshold=2.0,
+                 max_blink_duration=0.5, min_yawn_duration=1.0):
+        """
+        Arguments:
+            window (float): Length of the rolling window in seconds
+            max_fps (float): Highest expected frame rate, sizes the buffer
+            eye_threshold (float): Eyes are closed above this eye aspect ratio
+            mouth_threshold (float): Mouth is open below this mouth aspect ratio
+            max_blink_duration (float): Longest eye closure counted as a blink
+            min_yawn_duration (float): Shortest mouth opening counted as a yawn
+        """
+        self.window = window
+        self.eye_threshold = eye_threshold
+        self.mouth_threshold = mouth_threshold
+        self.max_blink_duration = max_blink_duration
+        self.min_yawn_duration = min_yawn_duration
+
+        self.capacity = int(np.ceil(window * max_fps)) + 1
+        self.columns = {name: np.zeros(self.capacity, dtype) for name, dtype in self.COLUMNS.items()}
+        self._head = 0
+        self._size = 0
+        self._pushes = 0
+        self._timestamp = None
+        self._closed_since = None
+        self._open_since = None
+
+        # Windowed sums
+        self._time = 0.0
+        self._face_time = 0.0
+        self._closed_time = 0.0
+        self._blinks = 0
+        self._yawns = 0
+        self._faces = 0
+        self._eye_sum = 0.0
+        self._mouth_sum = 0.0
+
+    def __len__(self):
+        return self._size
+
+    def _add(self, index, sign):
+        """Adds (sign 1) or removes (sign -1) a buffer entry from the windowed sums"""
+        columns = self.columns
+        elapsed = sign * float(columns["elapsed"][index])
+        self._time += elapsed
+        if columns["face_present"][index]:
+            self._faces += sign
+            self._face_time += elapsed
+            self._eye_sum += sign * float(columns["eye_aspect_ratio"][index])
+            self._mouth_sum += sign * float(columns["mouth_aspect_ratio"][index])
+            if columns["eyes_closed"][index]:
+                self._closed_time += elapsed
+        if columns["blink"][index]:
+            self._blinks += sign
+        if columns["yawn"][index]:
+            self._yawns += sign
+
+    def _evict(self, timestamp):
+        """Drops entries that left the window or don't fit in the buffer"""
+        timestamps = self.columns["timestamp"]
+        while self._size:
+            tail = (self._head - self._size) % self.capacity
+            if self._size < self.capacity and timestamps[tail] >= timestamp - self.window:
+                break
+            self._add(tail, -1)
+            self._size -= 1
+
+    def _recompute(self):
+        """Recomputes windowed sums from the buffer against rounding drift"""
+        records = self.records()
+        face = records["face_present"]
+        elapsed = records["elapsed"]
+        self._time = float(elapsed.sum())
+        self._faces = int(face.sum())
+        self._face_time = float(elapsed[face].sum())
+        self._closed_time = float(elapsed[face & records["eyes_closed"]].sum())
+        self._eye_sum = float(records["eye_aspect_ratio"][face].astype(np.float64).sum())
+        self._mouth_sum = float(records["mouth_aspect_ratio"][face].astype(np.float64).sum())
+        self._blinks = int(records["blink"].sum())
+        self._yawns = int(records["yawn"].sum())
+
+    def push(self, timestamp, features):
+        """
+        Adds the features of a frame.
+
+        Arguments:
+            timestamp (float): Time of the frame in seconds
+            features (dict): Frame features, None if there was no face
+        """
+        elapsed = timestamp - self._timestamp if self._timestamp is not None and timestamp > self._timestamp else 0.0
+        self._timestamp = timestamp
+        self._evict(timestamp)
+
+        blink = False
+        yawn = False
+        if features is None:
+            face_present = False
+            eyes_closed = False
+            eye_aspect_ratio = mouth_aspect_ratio = horizontal_ratio = vertical_ratio = np.nan
+        else:
+            face_present = True
+            eye_aspect_ratio = features["eye_aspect_ratio"]
+            mouth_aspect_ratio = features["mouth_aspect_ratio"]
+            horizontal_ratio = features.get("horizontal_ratio")
+            vertical_ratio = features.get("vertical_ratio")
+            eyes_closed = eye_aspect_ratio > self.eye_threshold
+            mouth_open = mouth_aspect_ratio < self.mouth_threshold
+
+            # Blinks and yawns are counted on the frame that ends them
+            if eyes_closed and self._closed_since is None:
+                self._closed_since = timestamp
+            elif not eyes_closed and self._closed_since is not None:
+                blink = timestamp - self._closed_since <= self.max_blink_duration
+                self._closed_since = None
+
+            if mouth_open and self._open_since is None:
+                self._open_since = timestamp
+            elif not mouth_open and self._open_since is not None:
+                yawn = timestamp - self._open_since >= self.min_yawn_duration
+                self._open_since = None
+
+        index = self._head
+        columns = self.columns
+        columns["timestamp"][index] = timestamp
+        columns["elapsed"][index] = elapsed
+        columns["eye_aspect_ratio"][index] = eye_aspect_ratio
+        columns["mouth_aspect_ratio"][index] = mouth_aspect_ratio
+        columns["horizontal_ratio"][index] = horizontal_ratio if horizontal_ratio is not None else np.nan
+        columns["vertical_ratio"][index] = vertical_ratio if vertical_ratio is not None else np.nan
+        columns["face_present"][index] = face_present
+        columns["eyes_closed"][index] = eyes_closed
+        columns["blink"][index] = blink
+        columns["yawn"][index] = yawn
+
+        self._add(index, 1)
+        self._head = (index + 1) % self.capacity
+        self._size += 1
+
+        self._pushes += 1
+        if self._pushes % self.capacity == 0:
+            self._recompute()
+
+    def records(self):
+        """Returns columns of the entries in the window, oldest first (copies)"""
+        start = (self._head - self._size) % self.capacity
+        indices = (start + np.arange(self._size)) % self.capacity
+        return {name: column[indices] for name, column in self.columns.items()}
+
+    def perclos(self):
+        """Returns share (0.0 - 1.0) of face time the eyes were closed in the window"""
+        return self._closed_time / self._face_time if self._face_time > 0 else 0.0
+
+    def blink_rate(self):
+        """Returns blinks per minute in the window"""
+        return self._blinks * 60.0 / self._time if self._time > 0 else 0.0
+
+    def yawn_rate(self):
+        """Returns yawns per minute in the window"""
+        return self._yawns * 60.0 / self._time if self._time > 0 else 0.0
+
+    def mean_eye_aspect_ratio(self):
+        """Returns mean eye aspect ratio of frames with a face in the window"""
+        return self._eye_sum / self._faces if self._faces else float("nan")
+
+    def mean_mouth_aspect_ratio(self):
+        """Returns mean mouth aspect ratio of frames with a face in the window"""
+        return self._mouth_sum / self._faces if self._faces else float("nan")
+
+    def face_presence(self):
+        """Returns share (0.0 - 1.0) of time a face was present in the window"""
+        return self._face_time / self._time if self._time > 0 else 0.0
+
+    def metrics(self):
+        """Returns all rolling metrics"""
+        return {
+            "perclos": self.perclos(),
+            "blink_rate": self.blink_rate(),
+            "yawn_rate": self.yawn_rate(),
+            "mean_eye_aspect_ratio": self.mean_eye_aspect_ratio(),
+            "mean_mouth_aspect_ratio": self.mean_mouth_aspect_ratio(),
+            "face_presence": self.face_presence(),
+        }
@@ -1,153 +1,205 @@
-import cv2
-from timeit import default_timer as timer
+from time import perf_counter
+STARTED = perf_counter()
+
+import os
+import argparse
+import logging
 from datetime import datetime
-import requests
+from concurrent.futures import ThreadPoolExecutor
+import cv2
 
-from face_features_detector import FaceFeaturesDetector
-from action_monitor import ActionMonitor
+from face_features_detector import FaceFeaturesDetector, ChangeGate, load_models
+from action_monitor import ActionMonitor, CalibrationProfiles
+from action_monitor.locators import LOCATORS
 from condition_monitor import ConditionMonitor
+from telemetry import TelemetryUploader
+from runtime import MonitoringSession, Pipeline, AdaptiveScheduler, analyze_videos, replay_recordings, serve_streams
+from runtime import WarmWorker, load_sensor_token, start_phase
+from recording import SessionRecorder
+from metrics import MetricsReporter, StartupReport, timings
+from rules import DEFAULT_RULES, load_rules
 
-if __name__ == '__main__':
-    sensor_token = input("Enter sensor token: ")
-    print(f"Your sensor token is {sensor_token}")
-    detector = FaceFeaturesDetector()
-    action_monitor = ActionMonitor(detector)
-    condition_monitor = ConditionMonitor(detector)
-    cap = cv2.VideoCapture(0)
-
-    # Handling flags
-    isDistracted = 0
-    Yawns = 0
-    EyesClosed = 0
-    IsSleeping = 0
-    NoBlinking = 0
-    IsUnconscious = 0
-
-    while True:
-        start = timer()
+RECORDS_URL = "https://draconws.pythonanywhere.com/records"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Driver Monitoring System")
+    parser.add_argument("--offline", nargs="+", metavar="VIDEO",
+                        help="analyze video files headless instead of the camera")
+    parser.add_argument("--replay", nargs="+", metavar="RECORDING",
+                        help="re-score recordings with the current rules, without image processing")
+    parser.add_argument("--streams", nargs="+", metavar="SOURCE",
+                        help="analyze several cameras (indices or URLs) headless with shared models")
+    parser.add_argument("--record", default=None, metavar="DIR",
+                        help="directory landmark / pupil recordings of the session are written to")
+    parser.add_argument("--output", default="events.jsonl",
+                        help="JSON lines file for events of the offline analysis, replay or streams")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes of the offline analysis or streams")
+    parser.add_argument("--chunk-seconds", type=float, default=300.0,
+                        help="length of video chunks processed by one worker")
+    parser.add_argument("--min-rate", type=float, default=None,
+                        help="analyze as few as this many frames per second while the driver "
+                             "state is far from every alert threshold (adaptive rate)")
+    parser.add_argument("--change-threshold", type=int, default=None,
+                        help="reuse the results of the last analyzed frame while the face region "
+                             "changes less than this many gray levels (static scenes)")
+    parser.add_argument("--pupil-locator", choices=sorted(LOCATORS), default="threshold",
+                        help="pupil locator: calibrated threshold, or image gradients (no calibration)")
+    parser.add_argument("--face-tracking", action="store_true",
+                        help="search for the face around its last box instead of the whole frame")
+    parser.add_argument("--detection-scale", type=float, default=1.0,
+                        help="scale the face detector runs at, e.g. 0.5 (faces under ~80 px at that scale are missed)")
+    parser.add_argument("--landmark-tracking", action="store_true",
+                        help="follow landmarks with optical flow between shape predictor runs")
+    parser.add_argument("--smoothing", action="store_true",
+                        help="smooth landmarks over time against flickering thresholds")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without annotation and window, for units without a screen")
+    parser.add_argument("--rules", default=None,
+                        help="JSON file with additional alert rules")
+    parser.add_argument("--config", default="dms_config.json",
+                        help="JSON configuration file with the sensor_token, "
+                             "the DMS_SENSOR_TOKEN environment variable takes precedence")
+    parser.add_argument("--warm-worker", action="store_true",
+                        help="load models once and run the camera in a pre-forked worker "
+                             "process that is respawned without reloading them if it crashes")
+    parser.add_argument("--startup-report", default=None,
+                        help="JSON file the cold start phase report is written to")
+    parser.add_argument("--metrics-interval", type=float, default=30.0,
+                        help="seconds between stage latency reports")
+    parser.add_argument("--metrics-file", default=None,
+                        help="JSON file the stage latency report is written to")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="local port serving the stage latency report")
+    return parser.parse_args()
+
+
+def load_all_rules(args):
+    return DEFAULT_RULES + load_rules(args.rules) if args.rules else DEFAULT_RULES
+
+
+def detector_options(args):
+    return {"tracking": args.face_tracking, "detection_scale": args.detection_scale,
+            "landmark_tracking": args.landmark_tracking, "smoothing": args.smoothing}
+
+
+def run_camera(args, report, sensor_token=None):
+    # Model loading and camera opening overlap with the token retrieval
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="startup")
+    camera = start_phase(executor, report, "camera_open", cv2.VideoCapture, 0)
+    models = start_phase(executor, report, "model_load", load_models)
+    if sensor_token is None:
+        with report.phase("token"):
+            sensor_token = load_sensor_token(args.config)
+    uploader = TelemetryUploader(RECORDS_URL, sensor_token, spool_path="records_spool.jsonl")
+    uploader.start()
+
+    with report.phase("session_setup"):
+        models.result()
+        detector = FaceFeaturesDetector(**detector_options(args))
+        action_monitor = ActionMonitor(detector, profiles=CalibrationProfiles("calibration_profiles.json"),
+                                       pupil_locator=LOCATORS[args.pupil_locator]())
+        condition_monitor = ConditionMonitor(detector)
+        scheduler = AdaptiveScheduler(min_rate=args.min_rate) if args.min_rate else None
+        gate = ChangeGate(args.change_threshold) if args.change_threshold is not None else None
+        recorder = None
+        if args.record:
+            recorder = SessionRecorder(os.path.join(args.record,
+                                                    datetime.now().strftime("%Y%m%d-%H%M%S") + ".rec"))
+        session = MonitoringSession(detector, action_monitor, condition_monitor, on_event=uploader.submit,
+                                    scheduler=scheduler, rules=load_all_rules(args), headless=args.headless,
+                                    recorder=recorder, gate=gate)
+        cap = camera.result()
+    executor.shutdown()
+
+    def capture():
         _, frame = cap.read()
-        detector.refresh(frame)
-
-        try:
-            frame = detector.annotated_frame()
-
-            # Action monitor
-            action_flags = action_monitor.refresh(frame)
-            isDistractedCounter = action_flags[0]
-            YawnsCounter = action_flags[1]
-
-            frame = action_monitor.annotated_frame()
-            # IsDistracted flag
-            if action_monitor.isDistracted:
-                isDistracted = 1
-                cv2.putText(frame, "Водитель отвлечен!", (50, 200), cv2.FONT_HERSHEY_COMPLEX, 1.0, (50, 25, 150), 2)
-            else:
-                if isDistracted == 1:
-                    print(f"{datetime.now()} Driver distracted for {round(isDistractedCounter, 2)} seconds")
-                    requests.post("https://draconws.pythonanywhere.com/records",
-                                  headers={"Authorization": f"Bearer {sensor_token}"},
-                                  json=[{
-                                      "type": "IsDistracted",
-                                      "text": "Водитель отвлечен от дороги",
-                                      "datetime": f"{datetime.now()}",
-                                      "duration": isDistractedCounter
-                                  }])
-                    isDistracted = 0
-            # Yawns flag
-            if action_monitor.Yawns:
-                Yawns = 1
-                cv2.putText(frame, "Водитель зевает!", (50, 250), cv2.FONT_HERSHEY_COMPLEX, 1.0, (50, 25, 150), 2)
-            else:
-                if Yawns == 1:
-                    print(f"{datetime.now()} Driver yawns for {round(YawnsCounter, 2)} seconds")
-                    requests.post("https://draconws.pythonanywhere.com/records",
-                                  headers={"Authorization": f"Bearer {sensor_token}"},
-                                  json=[{
-                                      "type": "Yawns",
-                                      "text": "Водитель зевает",
-                                      "datetime": f"{datetime.now()}",
-                                      "duration": YawnsCounter
-                                  }])
-                    Yawns = 0
-
-            # Condition monitor
-            condition_flags = condition_monitor.refresh(frame)
-            EyesClosedCounter = condition_flags[0]
-            NoBlinkingCounter = condition_flags[1]
-
-            frame = condition_monitor.annotated_frame()
-
-            # EyesClosed & IsSleeping flag
-            if condition_monitor.EyesClosed:
-                EyesClosed = 1
-                cv2.putText(frame, "Водитель засыпает!", (50, 300), cv2.FONT_HERSHEY_COMPLEX, 1.0, (50, 25, 150), 2)
-                if condition_monitor.EyesClosedCounter > 5.0:
-                    if not IsSleeping:
-                        IsSleeping = 1
-                        print(f"{datetime.now()} Driver is sleeping!")
-                        requests.post("https://draconws.pythonanywhere.com/records",
-                                      headers={"Authorization": f"Bearer {sensor_token}"},
-                                      json=[{
-                                          "type": "IsSleeping",
-                                          "text": "Водитель уснул",
-                                          "datetime": f"{datetime.now()}",
-                                          "duration": None
-                                      }])
-            else:
-                if EyesClosed == 1:
-                    print(f"{datetime.now()} Driver's eyes closed for {round(EyesClosedCounter, 2)} seconds")
-                    requests.post("https://draconws.pythonanywhere.com/records",
-                                  headers={"Authorization": f"Bearer {sensor_token}"},
-                                  json=[{
-                                      "type": "EyesClosed",
-                                      "text": "Водитель закрыл глаза",
-                                      "datetime": f"{datetime.now()}",
-                                      "duration": EyesClosedCounter
-                                  }])
-                    EyesClosed = 0
-                    IsSleeping = 0
-
-            # NoBlinking & IsUnconscious flag
-            if condition_monitor.NoBlinking:
-                NoBlinking = 1
-                cv2.putText(frame, "Водитель слишком долго не моргает!", (50, 350), cv2.FONT_HERSHEY_COMPLEX, 1.0, (50, 25, 150), 2)
-                if condition_monitor.NoBlinkingCounter > 40.0:
-                    if not IsUnconscious:
-                        IsUnconscious = 1
-                        print(f"{datetime.now()} Driver is unconscious!")
-                        requests.post("https://draconws.pythonanywhere.com/records",
-                                      headers={"Authorization": f"Bearer {sensor_token}"},
-                                      json=[{
-                                          "type": "IsUnconscious",
-                                          "text": "Водитель потерял сознание",
-                                          "datetime": f"{datetime.now()}",
-                                          "duration": None
-                                      }])
-            else:
-                if NoBlinking == 1:
-                    print(f"{datetime.now()} Driver doesn't blink for {round(NoBlinkingCounter, 2)} seconds")
-                    requests.post("https://draconws.pythonanywhere.com/records",
-                                  headers={"Authorization": f"Bearer {sensor_token}"},
-                                  json=[{
-                                      "type": "NoBlinking",
-                                      "text": "Водитель не моргает",
-                                      "datetime": f"{datetime.now()}",
-                                      "duration": NoBlinkingCounter
-                                  }])
-                    NoBlinking = 0
-                    IsUnconscious = 0
-
-        except:
-            pass
-
-        cv2.imshow("Driver Monitoring System", frame)
-        end = timer()
-        fps = 1.0 / (end - start)
-        action_monitor.update_fps(fps)
-        condition_monitor.update_fps(fps)
-
-        if cv2.waitKey(1) == 27:
-            break
+        if "first_frame" not in report.marks:
+            report.mark("first_frame")
+        return frame
+
+    def analyze(frame, timestamp):
+        result = session.process(frame, timestamp)
+        if "first_analysis" not in report.marks:
+            report.mark("first_analysis")
+            logging.info(report.log_line())
+            if args.startup_report:
+                report.write(args.startup_report)
+        return result
+
+    def display(result):
+        frame = session.render(result)
+        with timings.stage("display"):
+            cv2.imshow("Driver Monitoring System", frame)
+            return cv2.waitKey(1) != 27
+
+    pipeline = Pipeline(capture, analyze, None if args.headless else display)
+    try:
+        pipeline.run()
+    except KeyboardInterrupt:
+        pass
+    print(f"Pipeline stats: {pipeline.stats()}")
+    if args.startup_report:
+        report.write(args.startup_report)
+    if scheduler is not None:
+        print(f"Scheduler stats: {scheduler.stats}")
+    if gate is not None:
+        print(f"Change gate stats: {gate.stats}")
 
     cap.release()
-    cv2.destroyAllWindows()
+    if not args.headless:
+        cv2.destroyAllWindows()
+    uploader.stop()
+    if recorder is not None:
+        recorder.close()
+
+
+def run_warm_worker(args, report):
+    with report.phase("model_load"):
+        load_models()
+    with report.phase("token"):
+        sensor_token = load_sensor_token(args.config)
+    logging.info(report.log_line())
+
+    def worker():
+        # Each (re)spawned worker reports its own start, from activation
+        worker_report = StartupReport()
+        reporter = MetricsReporter(interval=args.metrics_interval, path=args.metrics_file, port=args.metrics_port,
+                                   startup=worker_report)
+        reporter.start()
+        run_camera(args, worker_report, sensor_token)
+        reporter.stop()
+
+    return WarmWorker(worker).run()
+
+
+if __name__ == '__main__':
+    report = StartupReport(STARTED)
+    report.record("imports", STARTED, perf_counter())
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    if args.warm_worker and not (args.replay or args.streams or args.offline):
+        # No threads in this process, the worker is forked from it
+        raise SystemExit(run_warm_worker(args, report))
+
+    reporter = MetricsReporter(interval=args.metrics_interval, path=args.metrics_file, port=args.metrics_port,
+                               startup=report)
+    # Stream and offline workers are forked, no reporter threads may run
+    # meanwhile (the parent doesn't analyze frames, it has no timings)
+    if not (args.streams or args.offline):
+        reporter.start()
+    if args.replay:
+        count = replay_recordings(args.replay, args.output, load_all_rules(args))
+        print(f"{count} events written to {args.output}")
+    elif args.streams:
+        streams = serve_streams(args.streams, args.output, args.workers, rules=load_all_rules(args))
+        for source, stats in zip(args.streams, streams):
+            print(f"{source}: {stats['analyzed']} of {stats['captured']} frames analyzed")
+    elif args.offline:
+        count = analyze_videos(args.offline, args.output, args.workers, args.chunk_seconds, args.record,
+                               load_all_rules(args), detector_options(args), args.pupil_locator)
+        print(f"{count} events written to {args.output}")
+    else:
+        run_camera(args, report)
+    reporter.stop()
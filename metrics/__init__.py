@@ -0,0 +1,4 @@
+from .histogram import LatencyHistogram
+from .timings import StageTimings, timings
+from .reporter import MetricsReporter
+from .startup import StartupReport
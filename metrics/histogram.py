@@ -0,0 +1,85 @@
+import threading
+from bisect import bisect_left
+
+import numpy as np
+
+
+class LatencyHistogram(object):
+    """
+    This class counts latencies in fixed, logarithmically spaced
+    buckets, so memory stays constant however many values are
+    recorded. Percentiles are accurate to the bucket width
+    (about 12% with the default settings). Latencies may be recorded
+    from several threads.
+    """
+
+    def __init__(self, min_value=1e-6, max_value=10.0, nb_buckets=128):
+        """
+        Arguments:
+            min_value (float): Upper bound of the first bucket, in seconds
+            max_value (float): Upper bound of the last regular bucket, in seconds
+            nb_buckets (int): Number of buckets between min_value and max_value
+        """
+        self.bounds = np.geomspace(min_value, max_value, nb_buckets)
+        self._bounds = self.bounds.tolist()
+        # Last bucket counts values above max_value
+        self.counts = np.zeros(nb_buckets + 1, np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, value):
+        """
+        Records a latency
+
+        Arguments:
+            value (float): Latency in seconds
+        """
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, q):
+        """
+        Returns the upper bound of the bucket holding the q-th percentile
+
+        Arguments:
+            q (float): Percentile between 0 and 100
+        """
+        if self.count == 0:
+            return 0.0
+
+        rank = int(np.ceil(q / 100.0 * self.count))
+        index = int(np.searchsorted(np.cumsum(self.counts), max(rank, 1)))
+        if index >= len(self.bounds):
+            return self.max
+        return min(float(self.bounds[index]), self.max)
+
+    def mean(self):
+        """Returns mean of recorded latencies"""
+        return self.total / self.count if self.count else 0.0
+
+    def reset(self):
+        """Forgets all recorded latencies"""
+        with self._lock:
+            self.counts[:] = 0
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+    def summary(self):
+        """Returns count, mean, p50, p95, p99 and max latency (seconds)"""
+        with self._lock:
+            return {
+                "count": self.count,
+                "mean": self.mean(),
+                "p50": self.percentile(50),
+                "p95": self.percentile(95),
+                "p99": self.percentile(99),
+                "max": self.max,
+            }
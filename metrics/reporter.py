@@ -0,0 +1,99 @@
+import os
+import json
+import logging
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from .timings import timings as default_timings
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsReporter(object):
+    """
+    This class periodically exposes stage timings:
+    - as a log line
+    - as a JSON file (written atomically)
+    - through a local HTTP endpoint returning the same JSON
+    """
+
+    def __init__(self, timings=None, interval=30.0, path=None, port=None, host="127.0.0.1", startup=None):
+        """
+        Arguments:
+            timings (StageTimings): Timings to report, the default registry if None
+            interval (float): Seconds between reports
+            path (str): JSON file to write, None to skip
+            port (int): Port of the HTTP endpoint, None to skip
+            host (str): Address the HTTP endpoint listens on
+            startup (StartupReport): Cold start report added to the report, None to skip
+        """
+        self.timings = timings if timings is not None else default_timings
+        self.interval = interval
+        self.path = path
+        self.port = port
+        self.host = host
+        self.startup = startup
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._server = None
+
+    def report(self):
+        """Returns the current report as a JSON serializable dictionary"""
+        report = {"stages": self.timings.snapshot()}
+        if self.startup is not None:
+            report["startup"] = self.startup.report()
+        return report
+
+    def _write(self):
+        """Writes the report to the JSON file"""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as report_file:
+            json.dump(self.report(), report_file, indent=2)
+        os.replace(temp_path, self.path)
+
+    def _serve(self):
+        """Starts the HTTP endpoint"""
+        reporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(reporter.report()).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = HTTPServer((self.host, self.port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+
+    def _run(self):
+        """Reporting loop"""
+        while not self._stop_event.wait(self.interval):
+            logger.info(self.timings.log_line())
+            if self.path is not None:
+                self._write()
+
+    def start(self):
+        """Starts periodic reporting and the HTTP endpoint"""
+        if self.port is not None:
+            self._serve()
+        self._thread = threading.Thread(target=self._run, name="metrics-reporter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops reporting, writes the final report"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self.path is not None:
+            self._write()
+        logger.info(self.timings.log_line())
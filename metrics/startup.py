@@ -0,0 +1,98 @@
+import json
+import threading
+from time import perf_counter
+
+
+class _Phase(object):
+    """Context manager recording start and end of a startup phase"""
+
+    def __init__(self, report, name):
+        self._report = report
+        self._name = name
+
+    def __enter__(self):
+        self._report.begin(self._name)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._report.end(self._name)
+        return False
+
+
+class StartupReport(object):
+    """
+    This class measures cold start, from process start to the first
+    analyzed frame, broken down by phase. Phases may run concurrently
+    (e.g. model loading in a thread while the camera opens), so each
+    phase has its own start and end relative to the process start.
+    """
+
+    def __init__(self, origin=None):
+        """
+        Arguments:
+            origin (float): perf_counter() value of the process start, now if None
+        """
+        self.origin = perf_counter() if origin is None else origin
+        self.phases = {}
+        self.marks = {}
+        self._lock = threading.Lock()
+
+    def phase(self, name):
+        """
+        Returns a context manager timing a phase, e.g.:
+            with report.phase("camera_open"):
+                ...
+
+        Arguments:
+            name (str): Phase name
+        """
+        return _Phase(self, name)
+
+    def begin(self, name):
+        """Records the start of a phase"""
+        self.record(name, perf_counter())
+
+    def end(self, name):
+        """Records the end of a phase"""
+        with self._lock:
+            self.phases[name][1] = perf_counter() - self.origin
+
+    def record(self, name, start, end=None):
+        """
+        Records a phase measured elsewhere, e.g. imports before the report existed
+
+        Arguments:
+            name (str): Phase name
+            start (float): perf_counter() value of the phase start
+            end (float): perf_counter() value of the phase end, None if running
+        """
+        with self._lock:
+            self.phases[name] = [start - self.origin, end - self.origin if end is not None else None]
+
+    def mark(self, name):
+        """Records a point in time, e.g. the first analyzed frame, once"""
+        with self._lock:
+            self.marks.setdefault(name, perf_counter() - self.origin)
+
+    def report(self):
+        """Returns the report as a JSON serializable dictionary, times in milliseconds"""
+        with self._lock:
+            phases = {name: {"start_ms": start * 1000,
+                             "end_ms": end * 1000 if end is not None else None,
+                             "duration_ms": (end - start) * 1000 if end is not None else None}
+                      for name, (start, end) in self.phases.items()}
+            marks = {name: offset * 1000 for name, offset in self.marks.items()}
+        return {"phases": phases, "marks": marks}
+
+    def log_line(self):
+        """Returns one line with the duration of each phase and the time of each mark"""
+        report = self.report()
+        parts = [f"{name} {phase['duration_ms']:.0f}" for name, phase in report["phases"].items()
+                 if phase["duration_ms"] is not None]
+        parts += [f"{name} at {offset:.0f}" for name, offset in report["marks"].items()]
+        return "startup ms: " + "; ".join(parts)
+
+    def write(self, path):
+        """Writes the report to a JSON file"""
+        with open(path, "w", encoding="utf-8") as report_file:
+            json.dump(self.report(), report_file, indent=2)
@@ -0,0 +1,106 @@
+import threading
+from time import perf_counter
+
+from .histogram import LatencyHistogram
+
+
+class _StageTimer(object):
+    """Context manager recording the time spent in its block"""
+
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._histogram.record(perf_counter() - self._start)
+        return False
+
+
+class StageTimings(object):
+    """
+    This class keeps a latency histogram per processing stage.
+    Stages may be timed from several threads at a time.
+    """
+
+    def __init__(self, enabled=True):
+        """
+        Arguments:
+            enabled (bool): Record timings, disabled timers cost next to nothing
+        """
+        self.enabled = enabled
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        """Returns the histogram of a stage, creating it if needed"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def stage(self, name):
+        """
+        Returns a context manager timing a stage, e.g.:
+            with timings.stage("face_detection"):
+                ...
+
+        Arguments:
+            name (str): Stage name
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self.histogram(name))
+
+    def record(self, name, seconds):
+        """
+        Records the duration of a stage measured elsewhere
+
+        Arguments:
+            name (str): Stage name
+            seconds (float): Duration
+        """
+        if self.enabled:
+            self.histogram(name).record(seconds)
+
+    def snapshot(self):
+        """Returns summary of every stage, latencies in seconds"""
+        with self._lock:
+            histograms = list(self.histograms.items())
+        return {name: histogram.summary() for name, histogram in histograms}
+
+    def reset(self):
+        """Forgets all recorded timings"""
+        with self._lock:
+            for histogram in self.histograms.values():
+                histogram.reset()
+
+    def log_line(self):
+        """Returns one line of p50/p95/p99 (milliseconds) per stage"""
+        parts = []
+        for name, summary in sorted(self.snapshot().items()):
+            parts.append(f"{name} n={summary['count']} p50={summary['p50'] * 1000:.2f} "
+                         f"p95={summary['p95'] * 1000:.2f} p99={summary['p99'] * 1000:.2f}")
+        return "stage latency ms: " + "; ".join(parts)
+
+
+class _NullTimer(object):
+    """Context manager doing nothing, used when timings are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+# Default registry shared by all components
+timings = StageTimings()
@@ -0,0 +1,3 @@
+from .format import Recording
+from .recorder import SessionRecorder, frame_record
+from .replay import recorded_features, replay
@@ -0,0 +1,86 @@
+import os
+import json
+import numpy as np
+
+VERSION = 1
+
+# Column name: (type, shape of one frame)
+COLUMNS = {
+    "timestamp": (np.float64, ()),
+    "face": (np.bool_, ()),
+    "landmarks": (np.int16, (68, 2)),
+    "pupils": (np.float32, (2, 2)),
+    "eye_sizes": (np.int16, (2, 2)),
+    "thresholds": (np.int16, (2,)),
+}
+
+
+def column_path(path, name):
+    """Returns the raw file of a column of a recording"""
+    return os.path.join(path, name + ".bin")
+
+
+def write_meta(path, count):
+    """
+    Writes the description of a recording atomically
+
+    Arguments:
+        path (str): Recording directory
+        count (int): Number of frames, None while the recording is open
+    """
+    meta = {
+        "version": VERSION,
+        "count": count,
+        "columns": {name: {"dtype": np.dtype(dtype).str, "shape": list(shape)}
+                    for name, (dtype, shape) in COLUMNS.items()},
+    }
+    temp_path = os.path.join(path, "meta.json.tmp")
+    with open(temp_path, "w", encoding="utf-8") as meta_file:
+        json.dump(meta, meta_file, indent=2)
+    os.replace(temp_path, os.path.join(path, "meta.json"))
+
+
+class Recording(object):
+    """
+    This class opens a recording written by SessionRecorder. Columns
+    are memory mapped, so opening is instant whatever the length and
+    only the pages that are read are loaded:
+    - timestamp: capture time of each frame in seconds
+    - face: whether a face (and its features) was found
+    - landmarks: (68, 2) landmarks as int16
+    - pupils: (x, y) of the left and right pupil in eye frame
+      coordinates, NaN where pupils weren't located
+    - eye_sizes: (width, height) of the left and right eye frame
+    - thresholds: pupil thresholds of the left and right eye
+    """
+
+    def __init__(self, path):
+        """
+        Arguments:
+            path (str): Recording directory
+        """
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as meta_file:
+            self.meta = json.load(meta_file)
+        if self.meta["version"] > VERSION:
+            raise ValueError(f"Unsupported recording version {self.meta['version']}")
+
+        columns = self.meta["columns"]
+        count = self.meta["count"]
+        if count is None:
+            # Not closed (e.g. the process was killed), keep the complete frames
+            count = min(os.path.getsize(column_path(path, name)) //
+                        (np.dtype(column["dtype"]).itemsize * int(np.prod(column["shape"])))
+                        for name, column in columns.items())
+        self.count = count
+
+        for name, column in columns.items():
+            shape = (count,) + tuple(column["shape"])
+            if count == 0:
+                data = np.empty(shape, column["dtype"])
+            else:
+                data = np.memmap(column_path(path, name), dtype=column["dtype"], mode="r", shape=shape)
+            setattr(self, name, data)
+
+    def __len__(self):
+        return self.count
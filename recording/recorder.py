@@ -0,0 +1,105 @@
+import os
+import numpy as np
+
+from .format import COLUMNS, column_path, write_meta
+
+
+def frame_record(detector, action_monitor):
+    """
+    Returns what a recording keeps of an analyzed frame, read from the
+    detector and the action monitor after MonitoringSession.extract()
+
+    Arguments:
+        detector (FaceFeaturesDetector): Detector of the session
+        action_monitor (ActionMonitor): Action monitor of the session
+    """
+    pupils = np.full((2, 2), np.nan, np.float32)
+    eye_sizes = np.zeros((2, 2), np.int16)
+    thresholds = np.full(2, -1, np.int16)
+    for side, (eye, pupil) in enumerate(((detector.eye_left, action_monitor.left_pupil),
+                                         (detector.eye_right, action_monitor.right_pupil))):
+        height, width = eye.frame.shape[:2]
+        eye_sizes[side] = (width, height)
+        if pupil is not None and pupil.x is not None and pupil.y is not None:
+            pupils[side] = (pupil.x, pupil.y)
+        try:
+            thresholds[side] = action_monitor.calibration.threshold(side)
+        except ZeroDivisionError:
+            pass
+
+    return detector.landmarks, pupils, eye_sizes, thresholds
+
+
+class SessionRecorder(object):
+    """
+    This class writes a compact columnar recording of a session: one
+    raw file per column and a meta.json describing them, so thresholds
+    and rules can be tuned by replaying it without any image processing.
+    Frames are buffered and appended in blocks, so recording costs a
+    copy of a few hundred bytes per frame.
+    """
+
+    def __init__(self, path, block_frames=256):
+        """
+        Arguments:
+            path (str): Recording directory, created if needed
+            block_frames (int): Number of frames buffered before they are written
+        """
+        self.path = path
+        self.block_frames = block_frames
+        self.count = 0
+        os.makedirs(path, exist_ok=True)
+        self._files = {name: open(column_path(path, name), "wb") for name in COLUMNS}
+        self._block = {name: np.zeros((block_frames,) + shape, dtype) for name, (dtype, shape) in COLUMNS.items()}
+        self._size = 0
+        write_meta(path, None)
+
+    def append(self, timestamp, record):
+        """
+        Adds a frame
+
+        Arguments:
+            timestamp (float): Capture time of the frame in seconds
+            record (tuple): frame_record() of the frame, None if no face was found
+        """
+        block = self._block
+        index = self._size
+        block["timestamp"][index] = timestamp
+        if record is None:
+            block["face"][index] = False
+            block["landmarks"][index] = 0
+            block["pupils"][index] = np.nan
+            block["eye_sizes"][index] = 0
+            block["thresholds"][index] = -1
+        else:
+            block["face"][index] = True
+            block["landmarks"][index], block["pupils"][index], \
+                block["eye_sizes"][index], block["thresholds"][index] = record
+
+        self._size += 1
+        if self._size == self.block_frames:
+            self.flush()
+
+    def flush(self):
+        """Writes buffered frames"""
+        for name, column_file in self._files.items():
+            self._block[name][:self._size].tofile(column_file)
+            column_file.flush()
+        self.count += self._size
+        self._size = 0
+
+    def close(self):
+        """Writes remaining frames and the final frame count"""
+        if self._files is None:
+            return
+        self.flush()
+        for column_file in self._files.values():
+            column_file.close()
+        self._files = None
+        write_meta(self.path, self.count)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,84 @@
+import numpy as np
+
+from face_features_detector.geometry import landmark_features
+from action_monitor import ActionMonitor
+
+
+def recorded_features(recording):
+    """
+    Computes the per frame features the monitors extract, for a whole
+    recording at once
+
+    Arguments:
+        recording (Recording): Recording to compute features of
+
+    Returns:
+        Dictionary of feature name to array (one value per frame) and
+        "valid", false where the frame has no features (no face)
+    """
+    features = landmark_features(np.asarray(recording.landmarks))
+    pupils = np.asarray(recording.pupils, np.float64)
+    sizes = np.asarray(recording.eye_sizes, np.float64)
+
+    # Same as ActionMonitor.horizontal_ratio() / vertical_ratio(), the
+    # eye frame center times two is its size
+    located = ~np.isnan(pupils).any(axis=(1, 2))
+    spans = sizes - 10
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = (pupils / spans).mean(axis=1)
+    horizontal, vertical = ratios[:, 0], ratios[:, 1]
+    right, left = ActionMonitor.GAZE_RATIOS
+    gaze_center = located & (horizontal > right) & (horizontal < left)
+
+    # The live session drops features of frames whose ratios can't be computed
+    valid = np.asarray(recording.face) & ~(located & (spans == 0).any(axis=(1, 2)))
+
+    features.update({
+        "valid": valid,
+        "located": located,
+        "gaze_center": gaze_center,
+        "horizontal_ratio": horizontal,
+        "vertical_ratio": vertical,
+    })
+    return features
+
+
+def replay(recording, session, start=0, end=None):
+    """
+    Feeds a recording to a session, as if its frames were analyzed
+    again, and returns the emitted events. No image is processed, so
+    rules and thresholds can be tuned on a whole shift in seconds.
+
+    Arguments:
+        recording (Recording): Recording to replay
+        session (MonitoringSession): Session whose rules are evaluated,
+            its detector may be None
+        start (int): First frame
+        end (int): Frame after the last frame, None for the end
+
+    Returns:
+        List of events
+    """
+    features = recorded_features(recording)
+    timestamps = np.asarray(recording.timestamp)
+    end = len(recording) if end is None else end
+    names = ("eye_aspect_ratio", "left_eye_aspect_ratio", "right_eye_aspect_ratio",
+             "inter_ocular_distance", "mouth_aspect_ratio")
+
+    events = []
+    for index in range(start, end):
+        if not features["valid"][index]:
+            frame_features = None
+        else:
+            located = bool(features["located"][index])
+            frame_features = {
+                "gaze_center": bool(features["gaze_center"][index]),
+                "horizontal_ratio": float(features["horizontal_ratio"][index]) if located else None,
+                "vertical_ratio": float(features["vertical_ratio"][index]) if located else None,
+            }
+            for name in names:
+                frame_features[name] = float(features[name][index])
+
+        events.extend(session.step(frame_features, float(timestamps[index])))
+
+    return events
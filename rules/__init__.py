@@ -0,0 +1,3 @@
+from .rule import Rule, Escalation
+from .engine import RuleEngine, Alert, load_rules
+from .defaults import DEFAULT_RULES
@@ -0,0 +1,15 @@
+from .rule import Rule, Escalation
+
+# Flags the Driver Monitoring System raised before rules were declarative
+DEFAULT_RULES = [
+    Rule("IsDistracted", "gaze_center", "==", 0, 2.0,
+         "Водитель отвлечен от дороги", alert_text="Водитель отвлечен!"),
+    Rule("Yawns", "mouth_aspect_ratio", "<", 2.0, 2.0,
+         "Водитель зевает", alert_text="Водитель зевает!"),
+    Rule("EyesClosed", "eye_aspect_ratio", ">", 5.0, 2.0,
+         "Водитель закрыл глаза", alert_text="Водитель засыпает!",
+         escalation=Escalation("IsSleeping", 5.0, "Водитель уснул")),
+    Rule("NoBlinking", "eye_aspect_ratio", "<=", 5.0, 20.0,
+         "Водитель не моргает", alert_text="Водитель слишком долго не моргает!",
+         escalation=Escalation("IsUnconscious", 40.0, "Водитель потерял сознание")),
+]
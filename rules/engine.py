@@ -0,0 +1,115 @@
+import json
+from collections import namedtuple
+
+import numpy as np
+
+from .rule import Rule
+
+# Structured alert: event type and text, time it was raised, begin and end
+# of the driver state (end is None while it lasts) and duration in seconds
+Alert = namedtuple("Alert", ["type", "text", "timestamp", "start", "end", "duration"])
+
+
+def load_rules(path):
+    """
+    Loads rules from a JSON file holding a list of rule dictionaries
+
+    Arguments:
+        path (str): JSON file
+    """
+    with open(path, encoding="utf-8") as rules_file:
+        return [Rule.from_dict(data) for data in json.load(rules_file)]
+
+
+class RuleEngine(object):
+    """
+    This class evaluates all rules over the per frame feature vector in
+    one vectorized pass. State (condition durations, active and
+    escalated rules) is kept in arrays and updated incrementally, so the
+    cost per frame barely depends on the number of rules.
+    """
+
+    def __init__(self, rules):
+        """
+        Arguments:
+            rules (list): Rule objects
+        """
+        self.rules = list(rules)
+        self.feature_names = sorted({rule.feature for rule in self.rules})
+        feature_index = {name: i for i, name in enumerate(self.feature_names)}
+
+        self._feature_index = np.array([feature_index[rule.feature] for rule in self.rules], np.intp)
+        self._thresholds = np.array([rule.threshold for rule in self.rules], np.float64)
+        self._min_durations = np.array([rule.min_duration for rule in self.rules], np.float64)
+        self._escalations = np.array([rule.escalation.duration if rule.escalation is not None else np.inf
+                                      for rule in self.rules], np.float64)
+        ops = np.array([rule.op for rule in self.rules])
+        self._ops = {op: ops == op for op in Rule.OPERATORS}
+
+        self.counters = np.zeros(len(self.rules))
+        self.active = np.zeros(len(self.rules), bool)
+        self.escalated = np.zeros(len(self.rules), bool)
+        self.timestamp = None
+
+    def _conditions(self, features):
+        """Returns whether each rule condition holds for the features"""
+        values = np.fromiter((features[name] for name in self.feature_names), np.float64,
+                             len(self.feature_names))
+        diff = values[self._feature_index] - self._thresholds
+        ops = self._ops
+        return ((ops["<"] & (diff < 0)) | (ops["<="] & (diff <= 0)) |
+                (ops[">"] & (diff > 0)) | (ops[">="] & (diff >= 0)) |
+                (ops["=="] & (diff == 0)) | (ops["!="] & (diff != 0)))
+
+    def update(self, features, timestamp):
+        """
+        Evaluates all rules on a frame.
+
+        Arguments:
+            features (dict): Per frame features, None if the frame couldn't
+                be analyzed (state is kept, only the clock advances)
+            timestamp (float): Time of the frame in seconds
+
+        Returns:
+            List of Alert raised on this frame
+        """
+        previous = self.timestamp if self.timestamp is not None else timestamp
+        elapsed = max(timestamp - previous, 0.0)
+        self.timestamp = timestamp
+        if features is None:
+            return []
+
+        holds = self._conditions(features)
+        counters = np.where(holds, self.counters + elapsed, 0.0)
+        active = holds & (counters > self._min_durations)
+        ended = self.active & ~holds
+        escalating = active & ~self.escalated & (counters > self._escalations)
+
+        alerts = []
+        for i in np.flatnonzero(ended):
+            rule = self.rules[i]
+            duration = float(self.counters[i])
+            alerts.append(Alert(rule.name, rule.text, timestamp, previous - duration, previous, duration))
+        for i in np.flatnonzero(escalating):
+            escalation = self.rules[i].escalation
+            alerts.append(Alert(escalation.name, escalation.text, timestamp, timestamp - float(counters[i]), None, None))
+
+        self.counters = counters
+        self.active = active
+        self.escalated = (self.escalated | escalating) & holds
+        return alerts
+
+    def is_active(self, name):
+        """Returns true if the rule with the given name is active"""
+        for i, rule in enumerate(self.rules):
+            if rule.name == name:
+                return bool(self.active[i])
+        return False
+
+    def active_rules(self):
+        """Returns currently active rules"""
+        return [self.rules[i] for i in np.flatnonzero(self.active)]
+
+    def counter_values(self):
+        """Returns condition durations (seconds) by rule name"""
+        return {rule.name: float(counter) for rule, counter in zip(self.rules, self.counters)}
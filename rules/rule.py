@@ -0,0 +1,78 @@
+class Escalation(object):
+    """
+    Instant alert raised once while a rule stays active for longer
+    than `duration` seconds (e.g. closed eyes turning into sleep).
+    """
+
+    def __init__(self, name, duration, text):
+        """
+        Arguments:
+            name (str): Event type
+            duration (float): Seconds the rule condition has to hold
+            text (str): Event description
+        """
+        self.name = name
+        self.duration = duration
+        self.text = text
+
+    def to_dict(self):
+        return {"name": self.name, "duration": self.duration, "text": self.text}
+
+
+class Rule(object):
+    """
+    Declarative alert rule: `feature <op> threshold` has to hold for
+    more than `min_duration` seconds to activate the rule. When the
+    condition stops holding, an event with the total duration is raised.
+    """
+
+    OPERATORS = ("<", "<=", ">", ">=", "==", "!=")
+
+    def __init__(self, name, feature, op, threshold, min_duration, text, alert_text=None, escalation=None):
+        """
+        Arguments:
+            name (str): Event type
+            feature (str): Name of the per frame feature
+            op (str): Comparison operator, one of OPERATORS
+            threshold (float): Value the feature is compared to
+            min_duration (float): Seconds the condition has to hold
+            text (str): Event description
+            alert_text (str): Text shown on screen while the rule is active
+            escalation (Escalation): Follow-up alert while the rule stays active
+        """
+        if op not in self.OPERATORS:
+            raise ValueError(f"Unknown operator {op!r} in rule {name}")
+
+        self.name = name
+        self.feature = feature
+        self.op = op
+        self.threshold = threshold
+        self.min_duration = min_duration
+        self.text = text
+        self.alert_text = alert_text
+        self.escalation = escalation
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates a rule from its dictionary (JSON) form
+
+        Arguments:
+            data (dict): Rule fields, escalation as a nested dictionary
+        """
+        data = dict(data)
+        if data.get("escalation") is not None:
+            data["escalation"] = Escalation(**data["escalation"])
+        return cls(**data)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "feature": self.feature,
+            "op": self.op,
+            "threshold": self.threshold,
+            "min_duration": self.min_duration,
+            "text": self.text,
+            "alert_text": self.alert_text,
+            "escalation": self.escalation.to_dict() if self.escalation is not None else None,
+        }
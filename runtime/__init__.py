@@ -0,0 +1,6 @@
+from .pipeline import Pipeline, LatestFrameQueue
+from .session import MonitoringSession
+from .offline import analyze_videos, replay_recordings
+from .scheduler import AdaptiveScheduler
+from .multistream import MultiStreamServer, SharedFrameRing, serve_streams
+from .startup import WarmWorker, load_sensor_token, start_phase
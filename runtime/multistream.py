@@ -0,0 +1,396 @@
+import os
+import json
+import time
+import threading
+import multiprocessing
+from functools import partial
+from multiprocessing import shared_memory
+
+import numpy as np
+import cv2
+
+
+class SharedFrameRing(object):
+    """
+    This class is a ring of frame slots in shared memory, written by
+    one decoder and read by one worker process with a latest-frame-wins
+    policy. The header holds the sequence number of the latest frame,
+    the sequence number and capture time of each slot and the stream's
+    counters. Readers copy a slot out and check that its sequence number
+    didn't change meanwhile, so a frame overwritten while being copied
+    is never analyzed.
+    """
+
+    # Header fields (int64) before the per slot sequence numbers
+    LATEST, CAPTURED, ANALYZED, DROPPED, TORN = range(5)
+    FIELDS = 5
+
+    def __init__(self, shape, slots=3, dtype=np.uint8):
+        """
+        Arguments:
+            shape (tuple): Shape of a frame
+            slots (int): Number of slots, at least 2
+            dtype: Frame type
+        """
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        frame_bytes = int(np.prod(shape)) * self.dtype.itemsize
+        header_bytes = (self.FIELDS + 2 * slots) * 8
+        self._memory = shared_memory.SharedMemory(create=True, size=header_bytes + slots * frame_bytes)
+
+        buffer = self._memory.buf
+        self.header = np.ndarray(self.FIELDS, np.int64, buffer)
+        self.sequences = np.ndarray(slots, np.int64, buffer, offset=self.FIELDS * 8)
+        self.timestamps = np.ndarray(slots, np.float64, buffer, offset=(self.FIELDS + slots) * 8)
+        self.frames = np.ndarray((slots,) + self.shape, self.dtype, buffer, offset=header_bytes)
+        self.header[:] = 0
+        self.sequences[:] = -1
+
+    def write(self, frame, timestamp):
+        """
+        Writes a frame into the next slot, resized if its size differs
+
+        Arguments:
+            frame (numpy.ndarray): Decoded frame
+            timestamp (float): Capture time in seconds since the epoch
+        """
+        sequence = int(self.header[self.LATEST]) + 1
+        slot = sequence % self.slots
+        self.sequences[slot] = -1
+        if frame.shape == self.shape:
+            np.copyto(self.frames[slot], frame)
+        else:
+            cv2.resize(frame, (self.shape[1], self.shape[0]), dst=self.frames[slot])
+        self.timestamps[slot] = timestamp
+        self.sequences[slot] = sequence
+        self.header[self.LATEST] = sequence
+        self.header[self.CAPTURED] += 1
+
+    def read(self, out, last):
+        """
+        Copies the latest frame if it is newer than `last`
+
+        Arguments:
+            out (numpy.ndarray): Destination of the frame
+            last (int): Sequence number of the last frame read
+
+        Returns:
+            (sequence, timestamp), (None, None) if there is no newer frame
+        """
+        sequence = int(self.header[self.LATEST])
+        if sequence <= last:
+            return None, None
+
+        slot = sequence % self.slots
+        timestamp = float(self.timestamps[slot])
+        np.copyto(out, self.frames[slot])
+        if self.sequences[slot] != sequence:
+            # Overwritten while copying, the next read gets a newer frame
+            self.header[self.TORN] += 1
+            return None, None
+
+        self.header[self.DROPPED] += sequence - last - 1
+        self.header[self.ANALYZED] += 1
+        return sequence, timestamp
+
+    def stats(self):
+        """Returns the stream's frame counters"""
+        return {
+            "captured": int(self.header[self.CAPTURED]),
+            "analyzed": int(self.header[self.ANALYZED]),
+            "dropped": int(self.header[self.DROPPED]),
+            "torn": int(self.header[self.TORN]),
+        }
+
+    def close(self):
+        """Releases the shared memory"""
+        self.header = self.sequences = self.timestamps = self.frames = None
+        self._memory.close()
+        self._memory.unlink()
+
+
+def default_session(detector, on_event, rules=None):
+    """
+    Returns the headless monitoring session of a stream
+
+    Arguments:
+        detector: Detector of the stream
+        on_event: Callable receiving the stream's events
+        rules (list): Alert rules, the default ones if None
+    """
+    from action_monitor import ActionMonitor
+    from condition_monitor import ConditionMonitor
+    from .session import MonitoringSession
+
+    return MonitoringSession(detector, ActionMonitor(detector), ConditionMonitor(detector), on_event=on_event,
+                             verbose=False, rules=rules, headless=True)
+
+
+def default_detector(models=None):
+    """
+    Returns a FaceFeaturesDetector
+
+    Arguments:
+        models (tuple): Models of the detector (see load_models), the process wide models if None
+    """
+    from face_features_detector import FaceFeaturesDetector
+    return FaceFeaturesDetector(models=models)
+
+
+def _preload():
+    from face_features_detector import load_models
+    load_models()
+
+
+def _worker_main(streams, rings, wake, stop, events, detector_factory, session_factory):
+    """
+    Worker process: analyzes the latest frame of each of its streams
+    with one session (and detector) per stream
+
+    Arguments:
+        streams (list): Indices of the streams of the worker
+        rings (list): SharedFrameRing of every stream, inherited through fork
+        wake (multiprocessing.Event): Set by decoders after writing a frame
+        stop (multiprocessing.Event): Set once all decoders ended
+        events (multiprocessing.Queue): Receives (stream index, event) tuples
+    """
+    # Parallelism comes from processes, OpenCV threads would compete for cores
+    cv2.setNumThreads(1)
+
+    sessions = {}
+    frames = {}
+    last = {}
+    for index in streams:
+        sessions[index] = session_factory(detector_factory(), lambda event, index=index: events.put((index, event)))
+        frames[index] = np.empty(rings[index].shape, rings[index].dtype)
+        last[index] = 0
+
+    while True:
+        stopping = stop.is_set()
+        wake.wait(0.1)
+        wake.clear()
+
+        idle = True
+        for index in streams:
+            sequence, timestamp = rings[index].read(frames[index], last[index])
+            if sequence is None:
+                continue
+            last[index] = sequence
+            idle = False
+            sessions[index].process(frames[index], timestamp)
+
+        if stopping and idle:
+            break
+
+
+class MultiStreamServer(object):
+    """
+    This class analyzes many camera streams on one machine:
+    - A decoder thread per stream writes frames into the stream's
+      shared memory ring (decoding releases the GIL)
+    - Worker processes, forked after the model has been loaded so they
+      all share its memory, analyze the latest frame of their streams
+    - Each stream keeps its own detector and monitor state, streams are
+      sharded over workers so a stream is always analyzed in order
+    Events are collected from all workers in the parent process.
+    Needs the fork start method (Linux).
+    """
+
+    def __init__(self, captures, frame_shape=(480, 640, 3), workers=None, slots=3, on_event=None,
+                 detector_factory=None, session_factory=None):
+        """
+        Arguments:
+            captures (list): Callables returning the next frame of each stream,
+                or None when the stream ended
+            frame_shape: Shape frames are stored in, other sizes are resized.
+                One shape (tuple) for all streams or a list of a shape per stream.
+            workers (int): Number of worker processes, the number of CPUs
+                (at most the number of streams) by default
+            slots (int): Frame slots of each stream's ring
+            on_event: Callable receiving (stream index, event) in the parent process
+            detector_factory: Callable returning the detector of a stream,
+                a FaceFeaturesDetector by default (models loaded before forking)
+            session_factory: Callable taking a detector and an event callback and
+                returning the stream's session, a headless MonitoringSession by default
+        """
+        self.captures = list(captures)
+        if isinstance(frame_shape[0], int):
+            self.frame_shapes = [tuple(frame_shape)] * len(self.captures)
+        else:
+            self.frame_shapes = [tuple(shape) for shape in frame_shape]
+            if len(self.frame_shapes) != len(self.captures):
+                raise ValueError("frame_shape needs one shape per stream")
+        self.workers = min(workers or os.cpu_count() or 1, len(self.captures))
+        self.slots = slots
+        self.on_event = on_event
+        self.detector_factory = detector_factory or default_detector
+        self.session_factory = session_factory or default_session
+        self._preload = _preload if detector_factory is None else None
+        self.rings = []
+        self.event_count = 0
+
+    def shards(self):
+        """Returns the stream indices of each worker"""
+        return [list(range(worker, len(self.captures), self.workers)) for worker in range(self.workers)]
+
+    def _decode(self, index, wake, stop_event):
+        """Decoder stage of a stream"""
+        capture = self.captures[index]
+        ring = self.rings[index]
+        while not stop_event.is_set():
+            frame = capture()
+            if frame is None:
+                break
+            ring.write(frame, time.time())
+            wake.set()
+
+    def _collect(self, events):
+        """Hands events from the workers to on_event"""
+        while True:
+            item = events.get()
+            if item is None:
+                break
+            self.event_count += 1
+            if self.on_event is not None:
+                self.on_event(*item)
+
+    def run(self, duration=None):
+        """
+        Runs until all streams ended, `duration` seconds passed or
+        KeyboardInterrupt
+
+        Arguments:
+            duration (float): Seconds to run, None to run until the streams end
+
+        Returns:
+            Per stream frame counters (see SharedFrameRing.stats)
+        """
+        context = multiprocessing.get_context("fork")
+        if self._preload is not None:
+            self._preload()
+
+        self.rings = [SharedFrameRing(shape, self.slots) for shape in self.frame_shapes]
+        stop = context.Event()
+        events = context.Queue()
+        wakes = [context.Event() for _ in range(self.workers)]
+        processes = []
+        decoders = []
+        stop_decoders = threading.Event()
+        collector = threading.Thread(target=self._collect, args=(events,), name="events", daemon=True)
+        try:
+            # Fork before any thread of this object runs
+            for worker, streams in enumerate(self.shards()):
+                process = context.Process(target=_worker_main, name=f"stream-worker-{worker}", daemon=True,
+                                          args=(streams, self.rings, wakes[worker], stop, events,
+                                                self.detector_factory, self.session_factory))
+                process.start()
+                processes.append(process)
+
+            collector.start()
+            for index in range(len(self.captures)):
+                wake = wakes[index % self.workers]
+                decoder = threading.Thread(target=self._decode, args=(index, wake, stop_decoders),
+                                           name=f"decoder-{index}", daemon=True)
+                decoder.start()
+                decoders.append(decoder)
+
+            deadline = time.time() + duration if duration is not None else None
+            try:
+                for decoder in decoders:
+                    decoder.join(None if deadline is None else max(deadline - time.time(), 0))
+            except KeyboardInterrupt:
+                pass
+        finally:
+            stop_decoders.set()
+            for decoder in decoders:
+                decoder.join()
+            stop.set()
+            for wake in wakes:
+                wake.set()
+            for process in processes:
+                process.join()
+            events.put(None)
+            if collector.is_alive():
+                collector.join()
+
+            stats = [ring.stats() for ring in self.rings]
+            for ring in self.rings:
+                ring.close()
+            self.rings = []
+        return stats
+
+
+def _open_video(source):
+    return cv2.VideoCapture(int(source) if source.isdigit() else source)
+
+
+def stream_shape(source):
+    """
+    Returns the shape of the frames of a camera index or video URL /
+    file, read from its first frame. The capture is released, so no
+    capture thread outlives the call (e.g. before forking workers).
+
+    Arguments:
+        source (str): Camera index or video URL / file
+
+    Raises:
+        RuntimeError if no frame could be read
+    """
+    video = _open_video(source)
+    ok, frame = video.read()
+    video.release()
+    if not ok:
+        raise RuntimeError(f"Can't read a frame from {source}")
+    return frame.shape
+
+
+def video_capture(source):
+    """
+    Returns a capture callable of a camera index or video URL / file,
+    opened on the first call (in the stream's decoder thread)
+
+    Arguments:
+        source (str): Camera index or video URL / file
+    """
+    state = {}
+
+    def capture():
+        if "video" not in state:
+            state["video"] = _open_video(source)
+        ok, frame = state["video"].read()
+        if not ok:
+            state["video"].release()
+            return None
+        return frame
+
+    return capture
+
+
+def serve_streams(sources, output, workers=None, duration=None, rules=None):
+    """
+    Analyzes camera streams with a MultiStreamServer and writes their
+    events as JSON lines. Each stream is analyzed at the resolution of
+    its first frame.
+
+    Arguments:
+        sources (list): Camera indices or video URLs / files
+        output (str): JSON lines file the events are written to
+        workers (int): Number of worker processes, number of CPUs by default
+        duration (float): Seconds to run, None to run until the streams end
+        rules (list): Alert rules, the default ones if None
+
+    Returns:
+        Per stream frame counters
+    """
+    with open(output, "w", encoding="utf-8") as events_file:
+        def on_event(index, event):
+            event["stream"] = sources[index]
+            events_file.write(json.dumps(event, ensure_ascii=False) + "\n")
+            events_file.flush()
+
+        shapes = [stream_shape(source) for source in sources]
+        server = MultiStreamServer([video_capture(source) for source in sources], frame_shape=shapes,
+                                   workers=workers, on_event=on_event,
+                                   session_factory=partial(default_session, rules=rules))
+        return server.run(duration)
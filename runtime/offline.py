@@ -0,0 +1,266 @@
+import os
+import json
+import cv2
+from concurrent.futures import ProcessPoolExecutor
+
+from face_features_detector import FaceFeaturesDetector, load_models
+from action_monitor import ActionMonitor
+from action_monitor.locators import LOCATORS
+from condition_monitor import ConditionMonitor
+from recording import Recording, SessionRecorder, frame_record, replay
+
+from .session import MonitoringSession
+
+# Detector options and pupil locator of the sessions of a worker process
+_worker_options = {"detector_options": {}, "pupil_locator": "threshold"}
+
+
+def _create_session(detector, rules=None, pupil_locator="threshold"):
+    """
+    Returns a headless monitoring session
+
+    Arguments:
+        detector (FaceFeaturesDetector): Detector, None for a session
+            that only steps over already extracted features
+        rules (list): Alert rules, the default ones if None
+        pupil_locator (str): Name of the pupil locator (see LOCATORS)
+    """
+    return MonitoringSession(detector, ActionMonitor(detector, pupil_locator=LOCATORS[pupil_locator]()),
+                             ConditionMonitor(detector), verbose=False, rules=rules, headless=True)
+
+
+def _init_worker(detector_options=None, pupil_locator="threshold"):
+    """Sets the session options of a worker process and loads the models once per process"""
+    _worker_options.update(detector_options=detector_options or {}, pupil_locator=pupil_locator)
+    load_models()
+
+
+def _chunk_session():
+    """
+    Returns a new session of the worker process, so tracking and
+    smoothing state doesn't carry over from another chunk
+    """
+    return _create_session(FaceFeaturesDetector(**_worker_options["detector_options"]),
+                           pupil_locator=_worker_options["pupil_locator"])
+
+
+def video_chunks(path, chunk_seconds):
+    """
+    Splits a video into chunks of frames.
+
+    Arguments:
+        path (str): Video file
+        chunk_seconds (float): Chunk length in seconds of video
+
+    Returns:
+        List of (start_frame, end_frame) tuples
+    """
+    cap = cv2.VideoCapture(path)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+
+    if frame_count <= 0:
+        return [(0, None)]
+
+    chunk_frames = max(int(chunk_seconds * fps), 1)
+    return [(start, min(start + chunk_frames, frame_count)) for start in range(0, frame_count, chunk_frames)]
+
+
+def calibrate_video(path, end_frame=None):
+    """
+    Calibrates pupil detection on the first frames of a video, like a
+    serial run does before its calibration is complete
+
+    Arguments:
+        path (str): Video file
+        end_frame (int): Frame calibration has to complete before, None for the end of the video
+
+    Returns:
+        (left, right) thresholds and the frame calibration completed on,
+        (None, None) if it didn't complete before `end_frame`
+    """
+    session = _chunk_session()
+    calibration = session.action_monitor.calibration
+    cap = cv2.VideoCapture(path)
+    index = 0
+    while not calibration.is_complete() and (end_frame is None or index < end_frame):
+        ok, frame = cap.read()
+        if not ok:
+            break
+        session.extract(frame, cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+        index += 1
+    cap.release()
+
+    if not calibration.is_complete():
+        return None, None
+    return (calibration.threshold(0), calibration.threshold(1)), index - 1
+
+
+def extract_chunk(path, start_frame, end_frame, preroll=None, record=False, thresholds=None):
+    """
+    Extracts per frame features of a chunk of a video. Pupil detection
+    uses the thresholds of the video (see calibrate_video) when given,
+    which is what a serial run uses once calibrated. Otherwise the
+    calibration runs on `preroll` frames before the chunk start, the
+    thresholds of the chunk may then differ from a serial run.
+    The preroll also warms up face / landmark tracking and smoothing.
+
+    Arguments:
+        path (str): Video file
+        start_frame (int): First frame of the chunk
+        end_frame (int): Frame after the last frame of the chunk, None for the end of the video
+        preroll (int): Number of frames before the chunk analyzed for calibration and
+            tracking only, the number of calibration frames by default
+        record (bool): Also return what a recording keeps of each frame
+        thresholds (tuple): (left, right) calibrated thresholds of the video, None to
+            calibrate on the preroll
+
+    Returns:
+        List of (timestamp, features) tuples, timestamp in seconds from the video start.
+        (timestamp, features, frame_record) tuples if `record` is set.
+    """
+    session = _chunk_session()
+    if thresholds is not None:
+        session.action_monitor.calibration.load(*thresholds)
+    if preroll is None:
+        preroll = session.action_monitor.calibration.nb_frames
+
+    first_frame = max(start_frame - preroll, 0)
+    cap = cv2.VideoCapture(path)
+    if first_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame)
+
+    records = []
+    index = first_frame
+    while end_frame is None or index < end_frame:
+        ok, frame = cap.read()
+        if not ok:
+            break
+
+        timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        features = session.extract(frame, timestamp)
+        if index >= start_frame:
+            if record:
+                raw = frame_record(session.detector, session.action_monitor) if features is not None else None
+                records.append((timestamp, features, raw))
+            else:
+                records.append((timestamp, features))
+        index += 1
+
+    cap.release()
+    return records
+
+
+def _extract_chunk(args):
+    """extract_chunk() taking a single tuple of arguments for Executor.map"""
+    return extract_chunk(*args)
+
+
+def video_start_time(path):
+    """
+    Returns the recording start of a video as seconds since the epoch,
+    estimated from the file modification time (end of recording)
+    minus the video duration
+
+    Arguments:
+        path (str): Video file
+    """
+    cap = cv2.VideoCapture(path)
+    frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+
+    duration = frame_count / fps if fps else 0.0
+    return os.path.getmtime(path) - duration
+
+
+def analyze_videos(paths, output, workers=None, chunk_seconds=300.0, record_dir=None, rules=None,
+                   detector_options=None, pupil_locator="threshold"):
+    """
+    Analyzes video files headless and writes events as JSON lines.
+    Chunks of frames are processed in a process pool, features are
+    then fed to one session per video in frame order, so flags
+    spanning chunk boundaries are handled like in a serial run.
+    Pupil detection is calibrated once per video on its first frames
+    with a face, and chunks after the calibration use its thresholds,
+    so features match a serial run. The first chunk calibrates itself
+    like a serial run. Only if calibration doesn't complete within the
+    first chunk (few frames with a face), later chunks are calibrated
+    on their own preroll and may differ from a serial run.
+
+    Arguments:
+        paths (list): Video files
+        output (str): JSON lines file the events are written to
+        workers (int): Number of worker processes, number of CPUs by default
+        chunk_seconds (float): Chunk length in seconds of video
+        record_dir (str): Directory a recording of each video is written to
+            (<video name>.rec), None to skip recording
+        rules (list): Alert rules, the default ones if None
+        detector_options (dict): Keyword arguments of the FaceFeaturesDetector
+            of the workers (tracking, detection_scale, landmark_tracking, smoothing...)
+        pupil_locator (str): Name of the pupil locator (see LOCATORS)
+
+    Returns:
+        Number of written events
+    """
+    count = 0
+    with open(output, "w", encoding="utf-8") as events_file, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(detector_options, pupil_locator)) as executor:
+        chunks = {path: video_chunks(path, chunk_seconds) for path in paths}
+        # A single chunk calibrates itself like a serial run, and locators
+        # without threshold aren't calibrated at all
+        calibrate = LOCATORS[pupil_locator].calibrated
+        calibrations = {path: executor.submit(calibrate_video, path, chunks[path][0][1])
+                        for path in paths if calibrate and len(chunks[path]) > 1}
+        for path in paths:
+            start_time = video_start_time(path)
+            session = _create_session(None, rules)
+            record = record_dir is not None
+            thresholds, calibrated_frame = calibrations[path].result() if path in calibrations else (None, None)
+            tasks = [(path, start, end, None, record,
+                      thresholds if thresholds is not None and start > calibrated_frame else None)
+                     for start, end in chunks[path]]
+            recorder = None
+            if record:
+                recorder = SessionRecorder(os.path.join(record_dir, os.path.basename(path) + ".rec"))
+
+            for records in executor.map(_extract_chunk, tasks):
+                for timestamp, features, *raw in records:
+                    if recorder is not None:
+                        recorder.append(start_time + timestamp, raw[0])
+                    for event in session.step(features, start_time + timestamp):
+                        event["video"] = path
+                        event["timestamp"] = timestamp
+                        events_file.write(json.dumps(event, ensure_ascii=False) + "\n")
+                        count += 1
+
+            if recorder is not None:
+                recorder.close()
+
+    return count
+
+
+def replay_recordings(paths, output, rules=None):
+    """
+    Re-scores recordings (see SessionRecorder) and writes events as
+    JSON lines, without any image processing
+
+    Arguments:
+        paths (list): Recording directories
+        output (str): JSON lines file the events are written to
+        rules (list): Alert rules, the default ones if None
+
+    Returns:
+        Number of written events
+    """
+    count = 0
+    with open(output, "w", encoding="utf-8") as events_file:
+        for path in paths:
+            for event in replay(Recording(path), _create_session(None, rules)):
+                event["recording"] = path
+                events_file.write(json.dumps(event, ensure_ascii=False) + "\n")
+                count += 1
+
+    return count
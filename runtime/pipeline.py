@@ -0,0 +1,179 @@
+import time
+import queue
+import threading
+from collections import deque
+
+
+class LatestFrameQueue(object):
+    """
+    Bounded queue between pipeline stages with a latest-frame-wins
+    policy: putting into a full queue drops the oldest item instead
+    of blocking the producer.
+    """
+
+    def __init__(self, maxsize=1):
+        """
+        Arguments:
+            maxsize (int): Maximum number of items held by the queue
+        """
+        self.maxsize = maxsize
+        self.drops = 0
+        self._items = deque()
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def put(self, item):
+        """
+        Puts an item into the queue, dropping the oldest one if full
+
+        Arguments:
+            item: Item to put
+        """
+        with self._condition:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.drops += 1
+            self._items.append(item)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """
+        Returns the oldest item, waiting for one if the queue is empty.
+        Returns None once the queue is closed and empty.
+
+        Arguments:
+            timeout (float): Seconds to wait, raises queue.Empty when exceeded
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._items or self._closed, timeout):
+                raise queue.Empty
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def close(self):
+        """Wakes up consumers, no more items will be put"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def depth(self):
+        """Returns number of items waiting in the queue"""
+        with self._condition:
+            return len(self._items)
+
+
+class Pipeline(object):
+    """
+    This class runs capture, analysis and display as separate stages:
+    - Capture stage (thread) reads and timestamps frames from the source
+    - Analysis stage (thread) analyzes the freshest captured frame
+    - Display stage (caller's thread) shows the freshest analyzed frame
+    Stages are joined by bounded latest-frame-wins queues, so a slow
+    stage makes the previous one drop frames instead of adding latency.
+    Without a display (headless), analysis runs on the caller's thread.
+    """
+
+    def __init__(self, capture, analyze, display, queue_size=1):
+        """
+        Arguments:
+            capture: Callable returning the next frame, or None when the source ended
+            analyze: Callable taking a frame and its capture time (seconds since
+                the epoch) and returning the frame to display
+            display: Callable taking an analyzed frame, returns False to stop.
+                None to run headless, results of analyze are dropped
+            queue_size (int): Size of the queues between stages
+        """
+        self._capture = capture
+        self._analyze = analyze
+        self._display = display
+        self._stop_event = threading.Event()
+
+        self.frames = LatestFrameQueue(queue_size)
+        self.results = LatestFrameQueue(queue_size)
+        self.counts = {"capture": 0, "analysis": 0, "display": 0}
+
+    def stats(self):
+        """
+        Returns per stage number of processed frames, depth of the
+        stage's output queue and number of frames dropped from it
+        """
+        return {
+            "capture": {
+                "frames": self.counts["capture"],
+                "queue_depth": self.frames.depth(),
+                "drops": self.frames.drops,
+            },
+            "analysis": {
+                "frames": self.counts["analysis"],
+                "queue_depth": self.results.depth(),
+                "drops": self.results.drops,
+            },
+            "display": {
+                "frames": self.counts["display"],
+                "queue_depth": 0,
+                "drops": 0,
+            },
+        }
+
+    def _capture_loop(self):
+        """Capture stage"""
+        try:
+            while not self._stop_event.is_set():
+                frame = self._capture()
+                if frame is None:
+                    break
+                self.counts["capture"] += 1
+                self.frames.put((frame, time.time()))
+        finally:
+            self.frames.close()
+
+    def _analysis_loop(self):
+        """Analysis stage"""
+        try:
+            while not self._stop_event.is_set():
+                item = self.frames.get()
+                if item is None:
+                    break
+                result = self._analyze(*item)
+                self.counts["analysis"] += 1
+                if self._display is not None:
+                    self.results.put(result)
+        finally:
+            self.results.close()
+
+    def stop(self):
+        """Asks all stages to stop"""
+        self._stop_event.set()
+        self.frames.close()
+        self.results.close()
+
+    def run(self):
+        """Starts capture and analysis threads and runs the display stage
+        until the source ends or display asks to stop"""
+        threads = [threading.Thread(target=self._capture_loop, name="capture", daemon=True)]
+        if self._display is None:
+            threads[0].start()
+            try:
+                self._analysis_loop()
+            finally:
+                self.stop()
+                threads[0].join()
+            return
+
+        threads.append(threading.Thread(target=self._analysis_loop, name="analysis", daemon=True))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while not self._stop_event.is_set():
+                result = self.results.get()
+                if result is None:
+                    break
+                self.counts["display"] += 1
+                if self._display(result) is False:
+                    break
+        finally:
+            self.stop()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,117 @@
+import numpy as np
+
+from action_monitor import ActionMonitor
+from rules import DEFAULT_RULES
+
+
+class AdaptiveScheduler(object):
+    """
+    This class decides which frames get analyzed. The analysis rate
+    drops towards `min_rate` while every feature is far from its alert
+    threshold and ramps back to `max_rate` as EAR, MAR or the gaze
+    ratio approach a threshold or a rule counter starts running.
+    Thresholds come from the alert rules (set_rules), rules on other
+    features ramp the rate up once their counter runs. Rules are
+    timestamp driven, so skipped frames don't distort durations; an
+    alert is raised at most 1 / min_rate seconds late.
+    """
+
+    # Rules whose counter runs most of the time and only matters close to
+    # the rule duration; any other running counter means full rate
+    RAMP_RULES = ("NoBlinking",)
+
+    def __init__(self, min_rate=5.0, max_rate=30.0, eye_margin=1.5, mouth_margin=2.0, gaze_margin=0.1, rules=None):
+        """
+        Arguments:
+            min_rate (float): Analysis rate (frames per second) when the driver
+                state is far from every threshold, bounds the alert latency
+            max_rate (float): Analysis rate near a threshold, the camera rate
+                to analyze every frame
+            eye_margin (float): Distance of EAR from its threshold below which the rate ramps up
+            mouth_margin (float): Same for MAR
+            gaze_margin (float): Same for the horizontal gaze ratio
+            rules (list): Alert rules the thresholds come from, DEFAULT_RULES if None,
+                MonitoringSession sets its own
+        """
+        if min_rate <= 0:
+            raise ValueError("min_rate must be positive")
+
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.eye_margin = eye_margin
+        self.mouth_margin = mouth_margin
+        self.gaze_margin = gaze_margin
+        self.margins = {"eye_aspect_ratio": eye_margin, "mouth_aspect_ratio": mouth_margin,
+                        "horizontal_ratio": gaze_margin}
+        self.rate = max_rate
+        self.urgency = 1.0
+        self.stats = {"processed": 0, "skipped": 0}
+        self.thresholds = []
+        self.ramp_durations = {}
+        self._next_timestamp = None
+        self.set_rules(rules if rules is not None else DEFAULT_RULES)
+
+    def set_rules(self, rules):
+        """
+        Takes the thresholds features are compared to from alert rules.
+        Rules on gaze_center depend on the horizontal gaze ratio crossing
+        the gaze ratios of ActionMonitor.
+
+        Arguments:
+            rules (list): Rule objects
+        """
+        self.thresholds = []
+        self.ramp_durations = {}
+        for rule in rules:
+            if rule.feature == "gaze_center":
+                self.thresholds += [("horizontal_ratio", ratio) for ratio in ActionMonitor.GAZE_RATIOS]
+            elif rule.feature in self.margins:
+                self.thresholds.append((rule.feature, rule.threshold))
+            if rule.name in self.RAMP_RULES:
+                self.ramp_durations[rule.name] = rule.min_duration
+
+    @staticmethod
+    def _closeness(distance, margin):
+        """Returns 1.0 at the threshold, falling to 0.0 at `margin` from it"""
+        return float(np.clip(1.0 - abs(distance) / margin, 0.0, 1.0))
+
+    def should_process(self, timestamp):
+        """
+        Returns true if the frame should be analyzed
+
+        Arguments:
+            timestamp (float): Time of the frame in seconds
+        """
+        if self._next_timestamp is None or timestamp >= self._next_timestamp:
+            self.stats["processed"] += 1
+            return True
+
+        self.stats["skipped"] += 1
+        return False
+
+    def update(self, features, counters, timestamp):
+        """
+        Sets the time of the next analyzed frame from the current state
+
+        Arguments:
+            features (dict): Features of the analyzed frame, None if there was no face
+            counters (dict): Seconds each rule condition has been holding, by rule name
+            timestamp (float): Time of the analyzed frame in seconds
+        """
+        if features is None or features.get("horizontal_ratio") is None:
+            # Face or pupils lost: stay at full rate to reacquire them
+            urgency = 1.0
+        else:
+            urgency = max(
+                [self._closeness(features[feature] - threshold, self.margins[feature])
+                 for feature, threshold in self.thresholds] +
+                [float(np.clip(counter / self.ramp_durations[name], 0.0, 1.0)) ** 2
+                 if name in self.ramp_durations else float(counter > 0)
+                 for name, counter in counters.items()],
+                default=0.0,
+            )
+
+        self.urgency = urgency
+        self.rate = self.min_rate + (self.max_rate - self.min_rate) * urgency
+        # Slack for capture jitter, so full rate doesn't skip every other frame
+        self._next_timestamp = timestamp + 0.9 / self.rate
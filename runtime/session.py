@@ -0,0 +1,235 @@
+import time
+import numpy as np
+from datetime import datetime
+
+from face_features_detector.buffers import BufferPool
+from face_features_detector.overlay import Overlay
+from metrics import timings
+from rules import RuleEngine, DEFAULT_RULES
+from feature_history import FeatureHistory
+from recording import frame_record
+
+
+class MonitoringSession(object):
+    """
+    This class runs the detector and both monitors on a frame,
+    evaluates alert rules over the extracted features and emits an
+    event (record) for each raised alert.
+
+    Processing is split in two steps, so features can be extracted
+    from frames in parallel and fed to the rules in order later:
+    - extract(): image processing, returns per frame features
+    - step(): evaluates rules on features and a timestamp
+    """
+
+    def __init__(self, detector, action_monitor, condition_monitor, on_event=None, verbose=True, scheduler=None,
+                 rules=None, history=None, headless=False, recorder=None, gate=None):
+        """
+        Arguments:
+            detector (FaceFeaturesDetector): Detector shared with the monitors
+            action_monitor (ActionMonitor): Action / behavior monitor
+            condition_monitor (ConditionMonitor): Condition monitor
+            on_event: Callable receiving each event (dict), e.g. TelemetryUploader.submit
+            verbose (bool): Print events as they happen
+            scheduler (AdaptiveScheduler): Decides which frames process() analyzes,
+                None to analyze every frame
+            rules (list): Alert rules, DEFAULT_RULES if None
+            history (FeatureHistory): Rolling feature history attached to both
+                monitors, a 60 s one if None. Its metrics (perclos, blink_rate,
+                yawn_rate, ...) are added to the features the rules see.
+            headless (bool): Skip annotation, for units without a screen
+            recorder (SessionRecorder): Records landmarks and pupils of analyzed
+                frames for replay, None to skip recording
+            gate (ChangeGate): Reuses landmarks, pupils and features of the last
+                analyzed frame for nearly identical frames, None to analyze every frame
+        """
+        self.detector = detector
+        self.action_monitor = action_monitor
+        self.condition_monitor = condition_monitor
+        self.on_event = on_event
+        self.verbose = verbose
+        self.scheduler = scheduler
+        self.rules = RuleEngine(rules if rules is not None else DEFAULT_RULES)
+        if scheduler is not None:
+            scheduler.set_rules(self.rules.rules)
+        self.history = history if history is not None else FeatureHistory()
+        self.action_monitor.history = self.history
+        self.condition_monitor.history = self.history
+        self.timestamp = None
+        self.headless = headless
+        self.recorder = recorder
+        self.gate = gate
+        self._gated_features = None
+        # Frames skipped before the first analyzed one are shown without annotation
+        self._overlay = Overlay()
+        self.pool = BufferPool()
+
+    @staticmethod
+    def _record(alert):
+        """
+        Returns the record (dict) of an alert
+
+        Arguments:
+            alert (Alert): Alert raised by the rule engine
+        """
+        return {
+            "type": alert.type,
+            "text": alert.text,
+            "datetime": f"{datetime.fromtimestamp(alert.timestamp)}",
+            "duration": alert.duration,
+            "start": f"{datetime.fromtimestamp(alert.start)}",
+            "end": f"{datetime.fromtimestamp(alert.end)}" if alert.end is not None else None
+        }
+
+    def extract(self, frame, timestamp=None):
+        """
+        Detects face features in a frame and extracts monitor features.
+        With a change gate, nearly identical frames get the features of
+        the last analyzed frame without being analyzed.
+
+        Arguments:
+            frame (numpy.ndarray): Frame from camera / video
+            timestamp (float): Time the frame was captured in seconds
+
+        Returns:
+            Dictionary of features, None if no face was found
+        """
+        if self.gate is not None:
+            face = self.detector.face
+            with timings.stage("change_gate"):
+                unchanged = self.gate.check(frame, None if face is None else
+                                            (face.left(), face.top(), face.right(), face.bottom()))
+            if unchanged:
+                # Rules still advance with the timestamp of this frame
+                return dict(self._gated_features) if self._gated_features is not None else None
+
+        features = self._extract(frame, timestamp)
+        if self.gate is not None:
+            self._gated_features = dict(features) if features is not None else None
+        return features
+
+    def _extract(self, frame, timestamp):
+        """Runs the detector and both monitors on a frame, see extract()"""
+        self.detector.refresh(frame, timestamp)
+        if self.detector.mouth is None:
+            return None
+
+        try:
+            with timings.stage("action_monitor.extract"):
+                features = self.action_monitor.extract()
+            with timings.stage("condition_monitor.extract"):
+                features.update(self.condition_monitor.extract())
+        except:
+            return None
+
+        return features
+
+    def counters(self):
+        """Returns how long (seconds) each rule condition has been holding"""
+        return self.rules.counter_values()
+
+    def step(self, features, timestamp):
+        """
+        Evaluates alert rules on frame features.
+
+        Arguments:
+            features (dict): Features returned by extract(), None if there was no face
+            timestamp (float): Time of the frame in seconds since the epoch
+
+        Returns:
+            List of events emitted for this frame
+        """
+        self.timestamp = timestamp
+        with timings.stage("history"):
+            self.history.push(timestamp, features)
+            if features is not None:
+                features.update(self.history.metrics())
+
+        with timings.stage("rules"):
+            alerts = self.rules.update(features, timestamp)
+
+        events = []
+        for alert in alerts:
+            event = self._record(alert)
+            events.append(event)
+            if self.verbose:
+                if alert.duration is not None:
+                    print(f"{event['datetime']} {alert.type} for {round(alert.duration, 2)} seconds")
+                else:
+                    print(f"{event['datetime']} {alert.type}!")
+            if self.on_event is not None:
+                self.on_event(event)
+
+        return events
+
+    def annotate(self):
+        """
+        Collects detected features, monitor state and active alerts of
+        the last analyzed frame as draw commands.
+
+        Returns:
+            The Overlay of the frame
+        """
+        overlay = Overlay()
+        try:
+            self.detector.annotate(overlay)
+            self.action_monitor.annotate(overlay)
+            self.condition_monitor.annotate(overlay)
+
+            for i, rule in enumerate(rule for rule in self.rules.rules if rule.alert_text):
+                if self.rules.is_active(rule.name):
+                    overlay.text(rule.alert_text, (50, 200 + 50 * i), (50, 25, 150))
+        except:
+            pass
+
+        return overlay
+
+    def render(self, result):
+        """
+        Draws an overlay onto a copy of its frame, once per displayed frame.
+
+        Arguments:
+            result (tuple): (frame, overlay) returned by process()
+
+        Returns:
+            The annotated frame
+        """
+        frame, overlay = result
+        with timings.stage("annotation"):
+            out = self.pool.next("annotated", frame.shape, frame.dtype)
+            np.copyto(out, frame)
+            return overlay.render(out)
+
+    def process(self, frame, timestamp=None):
+        """
+        Analyzes a frame, updates flags and emits events.
+
+        Arguments:
+            frame (numpy.ndarray): Frame from camera / video
+            timestamp (float): Time the frame was captured in seconds since
+                the epoch, the current time if None
+
+        Returns:
+            (frame, overlay) to pass to render(), None in headless mode.
+            Frames the scheduler skips aren't analyzed, they are returned
+            with the overlay of the last analyzed frame.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        if self.scheduler is not None and not self.scheduler.should_process(timestamp):
+            return None if self.headless else (frame, self._overlay)
+
+        features = self.extract(frame, timestamp)
+        if self.recorder is not None:
+            self.recorder.append(timestamp, frame_record(self.detector, self.action_monitor)
+                                 if features is not None else None)
+        self.step(features, timestamp)
+        if self.scheduler is not None:
+            self.scheduler.update(features, self.counters(), timestamp)
+
+        if self.headless:
+            return None
+        self._overlay = self.annotate()
+        return frame, self._overlay
+
@@ -0,0 +1,139 @@
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VARIABLE = "DMS_SENSOR_TOKEN"
+
+
+def load_sensor_token(config_path=None):
+    """
+    Returns the sensor token, from the DMS_SENSOR_TOKEN environment
+    variable, else the "sensor_token" of a JSON configuration file, else
+    asked on the terminal if there is one.
+
+    Arguments:
+        config_path (str): JSON configuration file, None to skip
+
+    Raises:
+        RuntimeError if no token is configured and there is no terminal
+    """
+    token = os.environ.get(TOKEN_VARIABLE)
+    if token:
+        return token
+
+    if config_path is not None and os.path.exists(config_path):
+        with open(config_path, encoding="utf-8") as config_file:
+            token = json.load(config_file).get("sensor_token")
+        if token:
+            return token
+
+    if not sys.stdin or not sys.stdin.isatty():
+        raise RuntimeError(f"No sensor token, set {TOKEN_VARIABLE} or sensor_token in {config_path}")
+    token = input("Enter sensor token: ")
+    print(f"Your sensor token is {token}")
+    return token
+
+
+def start_phase(executor, report, name, func, *args):
+    """
+    Runs a startup step in the background, timed as a phase of the
+    startup report, so it overlaps with the other steps
+
+    Arguments:
+        executor (concurrent.futures.Executor): Executor running the step
+        report (StartupReport): Report the phase is recorded in
+        name (str): Phase name
+        func: Step, called with `args`
+
+    Returns:
+        Future of the result of the step
+    """
+    def run():
+        with report.phase(name):
+            return func(*args)
+
+    return executor.submit(run)
+
+
+def _standby_main(activate, target):
+    """Standby worker: waits until it is activated, then runs the target"""
+    # Interrupts meant for the active worker shouldn't kill the standby one
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    activate.wait()
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    try:
+        target()
+    except KeyboardInterrupt:
+        pass
+
+
+class WarmWorker(object):
+    """
+    This class runs a target in a worker process forked from this warm
+    process, after imports and model loading, and respawns the worker
+    when it crashes. A standby worker is forked in advance and only
+    waits to be activated, so a respawn skips imports, model loading
+    and even the fork. Needs the fork start method (Linux), and no
+    other threads should run in this process.
+    """
+
+    def __init__(self, target, restart_delay=1.0, max_restarts=None):
+        """
+        Arguments:
+            target: Callable run by the worker, a clean exit (return or
+                KeyboardInterrupt) stops, any other exit respawns
+            restart_delay (float): Seconds between respawns, against crash loops
+            max_restarts (int): Maximum number of respawns, None for no limit
+        """
+        self.target = target
+        self.restart_delay = restart_delay
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self._context = multiprocessing.get_context("fork")
+
+    def _fork(self):
+        """Returns a standby worker and its activation event"""
+        activate = self._context.Event()
+        process = self._context.Process(target=_standby_main, args=(activate, self.target),
+                                        name="warm-worker", daemon=True)
+        process.start()
+        return process, activate
+
+    def run(self):
+        """
+        Runs the target until it exits cleanly or KeyboardInterrupt
+
+        Returns:
+            Exit code of the last worker
+        """
+        standby = self._fork()
+        active = None
+        try:
+            while True:
+                active, activate = standby
+                activate.set()
+                logger.info("Worker %d activated", active.pid)
+                standby = self._fork()
+                active.join()
+                if active.exitcode == 0:
+                    break
+
+                self.restarts += 1
+                logger.warning("Worker %d exited with code %d", active.pid, active.exitcode)
+                if self.max_restarts is not None and self.restarts > self.max_restarts:
+                    break
+                time.sleep(self.restart_delay)
+        except KeyboardInterrupt:
+            # The worker got the interrupt too and shuts down on its own
+            if active is not None:
+                active.join()
+        finally:
+            standby[0].terminate()
+            standby[0].join()
+        return active.exitcode if active is not None else 0
@@ -0,0 +1,3 @@
+from .server import IngestService
+from .client import IngestClient
+from .protocol import ProtocolError, encode_frame, decode_frame
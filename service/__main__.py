@@ -0,0 +1,46 @@
+import sys
+import asyncio
+import logging
+import argparse
+
+from .server import IngestService
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Local driver state analysis service")
+    parser.add_argument("--unix", default=None, metavar="PATH", help="Unix socket to listen on")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP host, if no Unix socket is given")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port, if no Unix socket is given")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker threads, each loads its own ~100 MB face model "
+                             f"(number of CPUs up to {IngestService.MAX_DEFAULT_WORKERS} by default)")
+    parser.add_argument("--max-batch", type=int, default=8, help="maximum number of frames in a batch")
+    parser.add_argument("--batch-window", type=float, default=0.002,
+                        help="seconds a batch waits for more frames")
+    parser.add_argument("--max-pending", type=int, default=32,
+                        help="frames queued before clients are slowed down")
+    return parser.parse_args()
+
+
+async def serve(args):
+    service = IngestService(args.workers, args.max_batch, args.batch_window, args.max_pending)
+    await service.start(args.unix, args.host, args.port)
+    logging.getLogger(__name__).info("Listening on %s", service.address())
+    try:
+        await service.serve_forever()
+    finally:
+        await service.close()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import asyncio
+from collections import deque
+
+from .protocol import ProtocolError, read_message, write_message, encode_frame
+
+
+class IngestClient(object):
+    """
+    This class is a client of IngestService. Requests are pipelined:
+    submit() sends a frame and returns a future of its response, so
+    several frames can be in flight on one connection. submit() waits
+    while the service applies backpressure.
+    """
+
+    def __init__(self, reader, writer):
+        """
+        Arguments:
+            reader (asyncio.StreamReader): Connection to the service
+            writer (asyncio.StreamWriter): Connection to the service
+        """
+        self._reader = reader
+        self._writer = writer
+        self._waiting = deque()
+        self._next_id = 0
+        self._receiver = asyncio.get_running_loop().create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, path=None, host="127.0.0.1", port=None):
+        """
+        Connects to a service on a Unix socket or a TCP port
+
+        Arguments:
+            path (str): Unix socket path
+            host (str): TCP host
+            port (int): TCP port, used if path is None
+        """
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _receive(self):
+        """Resolves futures with responses, which arrive in request order"""
+        error = ConnectionError("Connection closed by the service")
+        try:
+            while True:
+                message = await read_message(self._reader)
+                if message is None:
+                    break
+                self._waiting.popleft().set_result(message[0])
+        except (ProtocolError, ConnectionError) as exception:
+            error = exception
+        finally:
+            while self._waiting:
+                future = self._waiting.popleft()
+                if not future.done():
+                    future.set_exception(error)
+
+    async def submit(self, frame, stream="default", timestamp=None, encoding="raw"):
+        """
+        Sends a frame to analyze
+
+        Arguments:
+            frame (numpy.ndarray): BGR frame
+            stream (str): Stream of the frame, streams keep separate monitor state
+            timestamp (float): Capture time in seconds since the epoch,
+                the time of the analysis if None
+            encoding (str): "raw" or "jpeg"
+
+        Returns:
+            Future of the response (see IngestService)
+        """
+        if self._receiver.done():
+            raise ConnectionError("Connection closed by the service")
+        header, payload = encode_frame(frame, encoding)
+        header.update({"id": self._next_id, "stream": stream, "timestamp": timestamp})
+        self._next_id += 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append(future)
+        write_message(self._writer, header, payload)
+        await self._writer.drain()
+        return future
+
+    async def analyze(self, frame, stream="default", timestamp=None, encoding="raw"):
+        """Sends a frame and returns its response, see submit()"""
+        return await (await self.submit(frame, stream, timestamp, encoding))
+
+    async def close(self):
+        """Closes the connection once all responses are received"""
+        if self._waiting:
+            await asyncio.gather(*self._waiting, return_exceptions=True)
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        self._receiver.cancel()
+        try:
+            await self._receiver
+        except asyncio.CancelledError:
+            pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
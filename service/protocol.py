@@ -0,0 +1,115 @@
+import json
+import struct
+import asyncio
+
+import numpy as np
+import cv2
+
+# Message prefix: lengths of the JSON header and of the binary payload
+PREFIX = struct.Struct("!II")
+MAX_HEADER = 1 << 16
+MAX_PAYLOAD = 64 << 20
+
+
+class ProtocolError(Exception):
+    """Raised on malformed messages, the connection can't be used anymore"""
+
+
+def _jsonable(value):
+    """Converts numpy values of features to JSON types"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} isn't JSON serializable")
+
+
+def write_message(writer, header, payload=b""):
+    """
+    Writes a message to a stream: prefix, JSON header and payload.
+    Await writer.drain() afterwards to respect flow control.
+
+    Arguments:
+        writer (asyncio.StreamWriter): Stream to write to
+        header (dict): Message header
+        payload (bytes): Binary payload, e.g. an encoded frame
+    """
+    header = json.dumps(header, ensure_ascii=False, default=_jsonable).encode("utf-8")
+    writer.write(PREFIX.pack(len(header), len(payload)) + header)
+    if len(payload):
+        writer.write(payload)
+
+
+async def read_message(reader):
+    """
+    Reads a message from a stream
+
+    Arguments:
+        reader (asyncio.StreamReader): Stream to read from
+
+    Returns:
+        (header, payload), None if the stream ended between messages
+    """
+    try:
+        prefix = await reader.readexactly(PREFIX.size)
+    except asyncio.IncompleteReadError as error:
+        if error.partial:
+            raise ProtocolError("Truncated message") from error
+        return None
+
+    header_size, payload_size = PREFIX.unpack(prefix)
+    if header_size > MAX_HEADER or payload_size > MAX_PAYLOAD:
+        raise ProtocolError(f"Message too large ({header_size} + {payload_size} bytes)")
+    try:
+        header = json.loads(await reader.readexactly(header_size))
+        payload = await reader.readexactly(payload_size)
+    except asyncio.IncompleteReadError as error:
+        raise ProtocolError("Truncated message") from error
+    except ValueError as error:
+        raise ProtocolError(f"Invalid header: {error}") from error
+    if not isinstance(header, dict):
+        raise ProtocolError("Header isn't a JSON object")
+    return header, payload
+
+
+def encode_frame(frame, encoding="raw", quality=90):
+    """
+    Returns the header fields and payload of a frame
+
+    Arguments:
+        frame (numpy.ndarray): BGR frame
+        encoding (str): "raw" (uncompressed pixels) or "jpeg"
+        quality (int): JPEG quality
+    """
+    if encoding == "jpeg":
+        ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("Frame couldn't be encoded")
+        return {"encoding": "jpeg"}, data.tobytes()
+    if encoding == "raw":
+        frame = np.ascontiguousarray(frame, np.uint8)
+        return {"encoding": "raw", "shape": list(frame.shape)}, frame.data.cast("B")
+    raise ValueError(f"Unknown encoding {encoding!r}")
+
+
+def decode_frame(header, payload):
+    """
+    Returns the frame of a request
+
+    Arguments:
+        header (dict): Request header with the encoding (and shape if raw)
+        payload (bytes): Encoded frame
+    """
+    encoding = header.get("encoding", "raw")
+    if encoding == "jpeg":
+        frame = cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("Invalid JPEG frame")
+        return frame
+    if encoding == "raw":
+        shape = tuple(header.get("shape") or ())
+        if len(shape) not in (2, 3) or int(np.prod(shape)) != len(payload):
+            raise ValueError(f"Frame of {len(payload)} bytes doesn't have shape {list(shape)}")
+        frame = np.frombuffer(payload, np.uint8).reshape(shape)
+        return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR) if frame.ndim == 2 else frame
+    raise ValueError(f"Unknown encoding {encoding!r}")
@@ -0,0 +1,251 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from face_features_detector import load_models
+from runtime.multistream import default_detector, default_session
+from .protocol import ProtocolError, read_message, write_message, decode_frame
+
+logger = logging.getLogger(__name__)
+
+
+class IngestService(object):
+    """
+    This class serves driver state analysis to other local processes.
+    Clients push frames (raw or JPEG) over a Unix socket or TCP and get
+    the frame features and the events it raised back:
+    - Requests are queued in a bounded queue, connections stop being
+      read while it is full, so busy workers slow clients down
+      (backpressure) instead of queuing frames without limit
+    - Requests waiting together are micro-batched, each worker thread
+      gets the frames of its streams in one call
+    - Each stream (named by clients) has its own detector and monitors,
+      streams are sharded over worker threads so the frames of a stream
+      are analyzed in order. By default each worker thread loads its own
+      copy of the DLib models, DLib models aren't documented as thread
+      safe (about 100 MB per worker)
+    Responses of a connection are sent in request order.
+
+    Request header: {"id", "stream", "timestamp" (seconds since the epoch,
+    optional), "encoding" ("raw" or "jpeg"), "shape" (raw frames)},
+    the payload is the encoded frame.
+    Response header: {"id", "stream", "features", "events", "latency"
+    (seconds from queuing to the end of the analysis)}, or {"id",
+    "error"} if the request couldn't be analyzed.
+    """
+
+    # Default number of worker threads at most, each loads its own models
+    MAX_DEFAULT_WORKERS = 4
+
+    def __init__(self, workers=None, max_batch=8, batch_window=0.002, max_pending=32,
+                 detector_factory=None, session_factory=None, models=None):
+        """
+        Arguments:
+            workers (int): Number of worker threads, the number of CPUs up to
+                MAX_DEFAULT_WORKERS by default
+            max_batch (int): Maximum number of requests in a batch
+            batch_window (float): Seconds a batch waits for more requests
+            max_pending (int): Requests queued before connections are paused
+            detector_factory: Callable returning the detector of a stream, called
+                in the worker thread, a FaceFeaturesDetector using the models of
+                the worker thread by default
+            session_factory: Callable taking a detector and an event callback and
+                returning the stream's session, a headless MonitoringSession by default
+            models (tuple): Face detector and face landmark detector the default
+                detectors of all workers use instead of a copy per worker thread
+                (see load_models), e.g. thread safe or fake models
+        """
+        self.workers = workers or min(os.cpu_count() or 1, self.MAX_DEFAULT_WORKERS)
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.max_pending = max_pending
+        self.detector_factory = detector_factory or self._worker_detector
+        self.session_factory = session_factory or default_session
+        self.models = models
+        self._worker_models = detector_factory is None and models is None
+        self._local = threading.local()
+        self.stats = {"requests": 0, "errors": 0, "batches": 0, "streams": 0, "max_depth": 0}
+
+        self._sessions = {}
+        self._shards = {}
+        self._executors = []
+        self._pending = None
+        self._slots = None
+        self._server = None
+        self._path = None
+        self._batcher = None
+
+    async def start(self, path=None, host="127.0.0.1", port=None):
+        """
+        Starts serving on a Unix socket or a TCP port
+
+        Arguments:
+            path (str): Unix socket path
+            host (str): TCP host, local only by default
+            port (int): TCP port, used if path is None (0 picks a free port)
+        """
+        loop = asyncio.get_running_loop()
+        self._executors = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"ingest-{worker}")
+                           for worker in range(self.workers)]
+        if self._worker_models:
+            await asyncio.gather(*(loop.run_in_executor(executor, self._load_models)
+                                   for executor in self._executors))
+
+        self._pending = asyncio.Queue(self.max_pending)
+        self._slots = asyncio.Semaphore(2 * self.workers)
+        self._batcher = loop.create_task(self._batches())
+        if path is not None:
+            if os.path.exists(path):
+                os.unlink(path)
+            self._path = path
+            self._server = await asyncio.start_unix_server(self._serve, path)
+        else:
+            self._server = await asyncio.start_server(self._serve, host, port or 0)
+        return self._server
+
+    def address(self):
+        """Returns the socket path or (host, port) the service listens on"""
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        """Serves until cancelled"""
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stops serving, analyses in progress are finished"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            if self._path is not None and os.path.exists(self._path):
+                os.unlink(self._path)
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+        for executor in self._executors:
+            executor.shutdown(wait=True)
+
+    async def _serve(self, reader, writer):
+        """Reads requests of a connection and hands them to the batcher"""
+        loop = asyncio.get_running_loop()
+        responses = asyncio.Queue()
+        sender = loop.create_task(self._send(writer, responses))
+        try:
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                future = loop.create_future()
+                await responses.put(future)
+                # Waits while the queue is full, this connection isn't read meanwhile
+                await self._pending.put((message, future, time.perf_counter()))
+                self.stats["max_depth"] = max(self.stats["max_depth"], self._pending.qsize())
+        except ProtocolError as error:
+            logger.warning("Closing connection: %s", error)
+        except ConnectionError:
+            pass
+        finally:
+            await responses.put(None)
+            try:
+                await sender
+            except ConnectionError:
+                pass
+            writer.close()
+
+    @staticmethod
+    async def _send(writer, responses):
+        """Writes the responses of a connection in request order"""
+        while True:
+            future = await responses.get()
+            if future is None:
+                break
+            write_message(writer, await future)
+            await writer.drain()
+
+    async def _batches(self):
+        """Collects queued requests into batches and dispatches them"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._pending.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                if not self._pending.empty():
+                    batch.append(self._pending.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                await asyncio.sleep(remaining)
+
+            self.stats["batches"] += 1
+            self.stats["requests"] += len(batch)
+            shards = {}
+            for request in batch:
+                stream = str(request[0][0].get("stream", "default"))
+                if stream not in self._shards:
+                    self._shards[stream] = len(self._shards) % self.workers
+                    self.stats["streams"] += 1
+                shards.setdefault(self._shards[stream], []).append((stream, request))
+
+            for worker, requests in shards.items():
+                await self._slots.acquire()
+                task = loop.run_in_executor(self._executors[worker], self._analyze, requests)
+                task.add_done_callback(lambda task, requests=requests: self._finish(task, requests))
+
+    def _finish(self, task, requests):
+        """Resolves the futures of a worker's part of a batch"""
+        self._slots.release()
+        if task.exception() is not None:
+            responses = [{"error": f"{task.exception()}"} for _ in requests]
+        else:
+            responses = task.result()
+        for (stream, ((header, _), future, _)), response in zip(requests, responses):
+            response["id"] = header.get("id")
+            if "error" in response:
+                self.stats["errors"] += 1
+            if not future.done():
+                future.set_result(response)
+
+    def _load_models(self):
+        """Worker thread: loads the models of this worker"""
+        self._local.models = load_models(shared=False)
+
+    def _worker_detector(self):
+        """Worker thread: returns a detector using the models of this worker"""
+        return default_detector(self.models if self.models is not None else self._local.models)
+
+    def _session(self, stream):
+        """Returns the session of a stream, created on its first frame"""
+        session = self._sessions.get(stream)
+        if session is None:
+            session = self._sessions[stream] = self.session_factory(self.detector_factory(), None)
+        return session
+
+    def _analyze(self, requests):
+        """
+        Worker thread: analyzes requests of streams of this worker, in order
+
+        Returns:
+            Response header of each request
+        """
+        responses = []
+        for stream, ((header, payload), _, queued) in requests:
+            try:
+                frame = decode_frame(header, payload)
+                timestamp = header.get("timestamp")
+                timestamp = time.time() if timestamp is None else float(timestamp)
+                session = self._session(stream)
+                features = session.extract(frame, timestamp)
+                events = session.step(features, timestamp)
+            except Exception as error:
+                responses.append({"stream": stream, "error": f"{error}"})
+                continue
+            responses.append({"stream": stream, "features": features, "events": events,
+                              "latency": time.perf_counter() - queued})
+        return responses
@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetryUploader(object):
+    """
+    This class uploads monitoring events (records) to the server
+    in the background, so the frame loop never waits on the network:
+    - Events are put on a bounded queue
+    - Queued events are sent in batches as a single JSON list
+    - One pooled HTTP session is reused for all requests
+    - Failed requests are retried with exponential backoff
+    - Events that can't be sent are spooled to disk and resent later
+    """
+
+    # Client errors that are worth retrying, other 4xx are rejected for good
+    RETRY_STATUSES = (408, 429)
+
+    def __init__(self, url, token, max_queue=1000, batch_size=50, flush_interval=1.0,
+                 max_retries=3, backoff=0.5, max_backoff=30.0, timeout=5.0, spool_path=None):
+        """
+        Arguments:
+            url (str): Records endpoint accepting a JSON list of events
+            token (str): Sensor token sent as a bearer token
+            max_queue (int): Maximum number of events waiting to be sent
+            batch_size (int): Maximum number of events sent in one request
+            flush_interval (float): Seconds to wait for more events before sending a batch
+            max_retries (int): Number of retries of a failed request
+            backoff (float): Delay before the first retry, doubled on each retry
+            max_backoff (float): Upper bound of the retry delay
+            timeout (float): Timeout of a single request
+            spool_path (str): JSON lines file for events that can't be sent,
+                None to drop them instead
+        """
+        self.url = url
+        self.token = token
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.spool_path = spool_path
+        self.stats = {
+            "submitted": 0,
+            "sent": 0,
+            "spooled": 0,
+            "rejected": 0,
+            "dropped": 0,
+        }
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop_event = threading.Event()
+        self._spool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._session = None
+        self._errors = ()
+        self._thread = None
+
+    def _create_session(self):
+        """Returns HTTP session with a connection pool and the auth header"""
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"Authorization": f"Bearer {self.token}"})
+        return session
+
+    def start(self):
+        """Starts the background upload thread"""
+        if self._thread is not None:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry-uploader", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """
+        Stops the background thread. Events that are still queued
+        get one more upload attempt and are spooled if it fails.
+
+        Arguments:
+            timeout (float): Seconds to wait for the thread to finish
+        """
+        if self._thread is None:
+            return
+
+        self._stop_event.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # The thread closes its session itself when it's done
+            logger.warning("Telemetry uploader still running after %.1f s", timeout)
+        self._thread = None
+
+    def submit(self, event):
+        """
+        Queues an event for upload, never blocks. If the queue is
+        full the event goes straight to the spool file.
+
+        Arguments:
+            event (dict): JSON serializable event
+        """
+        self._count("submitted", 1)
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._spool([event])
+
+    def pending(self):
+        """Returns number of queued events"""
+        return self._queue.qsize()
+
+    def _count(self, name, count):
+        """Adds to a statistic, submit() and the upload thread both update them"""
+        with self._stats_lock:
+            self.stats[name] += count
+
+    def _next_batch(self):
+        """Waits for queued events and returns up to `batch_size` of them"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop_event.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _drain_queue(self):
+        """Returns all queued events without waiting"""
+        events = []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _post(self, batch, retries=None):
+        """
+        Sends a batch of events, retrying with exponential backoff.
+
+        Arguments:
+            batch (list): Events to send
+            retries (int): Number of retries, `max_retries` by default
+
+        Returns:
+            True if the batch was delivered or rejected by the server,
+            False if it should be kept for later
+        """
+        if retries is None:
+            retries = self.max_retries
+
+        for attempt in range(retries + 1):
+            if attempt:
+                delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+                if self._stop_event.wait(delay):
+                    return False
+
+            try:
+                response = self._session.post(self.url, json=batch, timeout=self.timeout)
+            except self._errors as error:
+                logger.debug("Upload of %d events failed: %s", len(batch), error)
+                continue
+
+            if response.status_code < 400:
+                self._count("sent", len(batch))
+                return True
+            if response.status_code < 500 and response.status_code not in self.RETRY_STATUSES:
+                logger.warning("Server rejected %d events with status %d", len(batch), response.status_code)
+                self._count("rejected", len(batch))
+                return True
+
+        return False
+
+    def _spool(self, events):
+        """
+        Appends events to the spool file
+
+        Arguments:
+            events (list): Events that couldn't be sent
+        """
+        if self.spool_path is None:
+            self._count("dropped", len(events))
+            return
+
+        with self._spool_lock:
+            with open(self.spool_path, "a", encoding="utf-8") as spool:
+                for event in events:
+                    spool.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._count("spooled", len(events))
+
+    def _resend_spool(self):
+        """Sends spooled events, keeps the ones that still can't be sent"""
+        if self.spool_path is None:
+            return
+
+        with self._spool_lock:
+            if not os.path.exists(self.spool_path):
+                return
+            with open(self.spool_path, encoding="utf-8") as spool:
+                events = [json.loads(line) for line in spool if line.strip()]
+            os.remove(self.spool_path)
+        self._count("spooled", -len(events))
+
+        for i in range(0, len(events), self.batch_size):
+            batch = events[i:i + self.batch_size]
+            if not self._post(batch, retries=0):
+                self._spool(events[i:])
+                return
+
+    def _run(self):
+        """Upload loop of the background thread"""
+        # Imported here rather than at startup, requests is slow to import
+        import requests
+        self._errors = requests.RequestException
+        self._session = self._create_session()
+        try:
+            # Events left over from a previous run
+            self._resend_spool()
+
+            while not self._stop_event.is_set():
+                batch = self._next_batch()
+                if not batch:
+                    continue
+
+                if self._post(batch):
+                    self._resend_spool()
+                else:
+                    self._spool(batch)
+
+            # Last attempt for whatever is still queued
+            events = self._drain_queue()
+            for i in range(0, len(events), self.batch_size):
+                batch = events[i:i + self.batch_size]
+                if not self._post(batch, retries=0):
+                    self._spool(events[i:])
+                    break
+        finally:
+            self._session.close()
+            self._session = None
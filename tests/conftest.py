@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from benchmarks.corpus import face_template
+
+
+class FakeRectangle(object):
+    """Face box with the dlib.rectangle methods the detector uses"""
+
+    def __init__(self, left, top, right, bottom):
+        self._box = (int(left), int(top), int(right), int(bottom))
+
+    def left(self):
+        return self._box[0]
+
+    def top(self):
+        return self._box[1]
+
+    def right(self):
+        return self._box[2]
+
+    def bottom(self):
+        return self._box[3]
+
+    def width(self):
+        return self._box[2] - self._box[0]
+
+    def height(self):
+        return self._box[3] - self._box[1]
+
+    def area(self):
+        return self.width() * self.height()
+
+
+class FakePoint(object):
+    def __init__(self, x, y):
+        self.x = int(x)
+        self.y = int(y)
+
+
+class FakeShape(object):
+    def __init__(self, landmarks):
+        self._landmarks = landmarks
+
+    def parts(self):
+        return [FakePoint(x, y) for x, y in self._landmarks]
+
+
+def fake_face_detector(image, upsample=0):
+    """Finds the face of benchmarks.corpus.synthetic_frame(), nothing on a uniform image"""
+    if image.min() == image.max():
+        return []
+    height, width = image.shape[:2]
+    size = int(min(width, height) * 0.6)
+    left, top = (width - size) // 2, (height - size) // 2
+    return [FakeRectangle(left, top, left + size, top + size)]
+
+
+def fake_shape_predictor(image, rect):
+    """Returns the landmarks synthetic_frame() draws in the face box"""
+    landmarks = np.round(np.array([rect.left(), rect.top()]) + face_template() * rect.width())
+    return FakeShape(landmarks)
+
+
+@pytest.fixture
+def fake_models():
+    """Stand-ins for load_models(), so tests don't need DLib nor its model"""
+    return fake_face_detector, fake_shape_predictor
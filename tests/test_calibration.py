@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from action_monitor.calibration import Calibration
+from action_monitor.pupil import Pupil
+from benchmarks.pupils import eye_crops
+
+
+def looped_best_threshold(eye_frame, thresholds=range(5, 100, 5)):
+    """Previous find_best_threshold: filters and binarizes the frame per threshold"""
+    trials = {}
+    for threshold in thresholds:
+        iris_frame = Pupil.image_processing(eye_frame, threshold)
+        trials[threshold] = Calibration.iris_size(iris_frame)
+
+    best_threshold, iris_size = min(trials.items(), key=(lambda p: abs(p[1] - Calibration.AVERAGE_IRIS_SIZE)))
+    return best_threshold, trials
+
+
+def random_eye_frame(rng):
+    """Returns a masked eye crop: bright sclera around a dark iris, random size, contrast and noise"""
+    height, width = rng.integers(14, 40), rng.integers(24, 70)
+    frame = np.full((height, width), rng.integers(120, 255), np.float64)
+    y, x = np.mgrid[:height, :width]
+    center = rng.uniform((0.2 * width, 0.2 * height), (0.8 * width, 0.8 * height))
+    radius = rng.uniform(0.15, 0.45) * height
+    frame[np.hypot(x - center[0], y - center[1]) < radius] = rng.integers(0, 110)
+    frame += rng.normal(0.0, rng.uniform(0.0, 25.0), frame.shape)
+    frame[:rng.integers(0, 4)] = 255
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def assert_same(eye_frame, thresholds=range(5, 100, 5)):
+    expected, trials = looped_best_threshold(eye_frame, thresholds)
+    iris_sizes = Calibration.iris_sizes(eye_frame, np.asarray(thresholds))
+    assert iris_sizes == pytest.approx([trials[threshold] for threshold in thresholds])
+    assert Calibration.find_best_threshold(eye_frame, thresholds) == expected
+
+
+def test_random_eye_frames_match_threshold_loop():
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        assert_same(random_eye_frame(rng))
+
+
+def test_synthetic_eye_crops_match_threshold_loop():
+    for eye_frame, _, _ in eye_crops((640, 480), count=21):
+        assert_same(eye_frame)
+        assert_same(eye_frame, range(1, 256, 3))
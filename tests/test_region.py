@@ -0,0 +1,64 @@
+import numpy as np
+import cv2
+import pytest
+
+from face_features_detector.buffers import BufferPool
+from face_features_detector.region import isolate_region
+
+
+def full_frame_isolation(frame, region, margin=5):
+    """Previous Eye / Mouth isolation: full frame mask, then crop"""
+    height, width = frame.shape[:2]
+    black_frame = np.zeros((height, width), np.uint8)
+    mask = np.full((height, width), 255, np.uint8)
+    cv2.fillPoly(mask, [region], (0, 0, 0))
+    isolated = cv2.bitwise_not(black_frame, frame.copy(), mask=mask)
+
+    min_x = np.min(region[:, 0]) - margin
+    max_x = np.max(region[:, 0]) + margin
+    min_y = np.min(region[:, 1]) - margin
+    max_y = np.max(region[:, 1]) + margin
+    return isolated[min_y:max_y, min_x:max_x], (min_x, min_y)
+
+
+def random_polygon(rng, width, height, spread):
+    """Returns a 6 point polygon around a random center, possibly across the frame border"""
+    center = rng.uniform((-spread, -spread), (width + spread, height + spread))
+    return (center + rng.normal(0.0, spread / 2, (6, 2))).astype(np.int32)
+
+
+def assert_same(frame, region, margin=5, pool=None):
+    expected, expected_origin = full_frame_isolation(frame, region, margin)
+    isolated, origin = isolate_region(frame, region, margin, pool)
+    assert origin == expected_origin
+    assert isolated.shape == expected.shape
+    assert np.array_equal(isolated, expected)
+
+
+@pytest.mark.parametrize("use_pool", [False, True])
+def test_random_polygons_match_full_frame_mask(use_pool):
+    rng = np.random.default_rng(0)
+    pool = BufferPool() if use_pool else None
+    for _ in range(3000):
+        width, height = rng.integers(40, 200, 2)
+        frame = rng.integers(0, 256, (height, width), np.uint8)
+        spread = rng.uniform(2, 40)
+        assert_same(frame, random_polygon(rng, width, height, spread), int(rng.integers(0, 8)), pool)
+
+
+@pytest.mark.parametrize("region", [
+    # Crossing the left / top border
+    [[-3, 10], [8, 2], [15, 4], [20, 12], [9, 18], [1, 15]],
+    [[10, -4], [20, -1], [28, 5], [22, 12], [12, 10], [6, 3]],
+    # Crossing the right / bottom border
+    [[60, 30], [70, 28], [84, 35], [78, 45], [66, 47], [58, 40]],
+    # Inside the frame, margin clipped by the border
+    [[2, 2], [10, 1], [18, 3], [17, 8], [9, 9], [3, 7]],
+    [[70, 40], [75, 39], [78, 42], [77, 45], [73, 46], [69, 44]],
+    # Outside the frame
+    [[100, 100], [110, 100], [110, 110], [100, 110], [95, 105], [105, 95]],
+])
+def test_border_polygons_match_full_frame_mask(region):
+    rng = np.random.default_rng(1)
+    frame = rng.integers(0, 256, (48, 80), np.uint8)
+    assert_same(frame, np.array(region, np.int32))
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from rules import RuleEngine, DEFAULT_RULES
+
+
+class LegacyFlags(object):
+    """
+    Flag state machines of the monitors and the session before the rule
+    engine (ActionMonitor / ConditionMonitor update() and
+    MonitoringSession.step()), reduced to the events they emitted
+    """
+
+    def __init__(self):
+        self.timestamp = None
+        self.session_timestamp = None
+        self.counters = {"IsDistracted": 0.0, "Yawns": 0.0, "EyesClosed": 0.0, "NoBlinking": 0.0}
+        self.flags = dict.fromkeys(self.counters, 0)
+        self.session_flags = dict.fromkeys(self.counters, 0)
+        self.IsSleeping = 0
+        self.IsUnconscious = 0
+
+    def _advance(self, timestamp):
+        elapsed = 0.0
+        if self.timestamp is not None and timestamp > self.timestamp:
+            elapsed = timestamp - self.timestamp
+        self.timestamp = timestamp
+        return elapsed
+
+    def _flag(self, name, holds, elapsed, duration):
+        """Monitor flag update, returns the counter of a state that ended"""
+        if holds:
+            self.counters[name] += elapsed
+            if self.counters[name] > duration:
+                self.flags[name] = 1
+            return 0
+        counter = self.counters[name]
+        self.counters[name] = 0
+        self.flags[name] = 0
+        return counter
+
+    def step(self, features, timestamp):
+        previous = self.session_timestamp if self.session_timestamp is not None else timestamp
+        self.session_timestamp = timestamp
+        elapsed = self._advance(timestamp)
+        if features is None:
+            return []
+
+        ended = {
+            "IsDistracted": self._flag("IsDistracted", not features["gaze_center"], elapsed, 2.0),
+            "Yawns": self._flag("Yawns", features["mouth_aspect_ratio"] < 2, elapsed, 2.0),
+        }
+        closed = features["eye_aspect_ratio"] > 5
+        ended["EyesClosed"] = self._flag("EyesClosed", closed, elapsed, 2.0)
+        ended["NoBlinking"] = self._flag("NoBlinking", not closed, elapsed, 20.0)
+
+        events = []
+        for name, escalation, escalation_duration in (("IsDistracted", None, None), ("Yawns", None, None),
+                                                      ("EyesClosed", "IsSleeping", 5.0),
+                                                      ("NoBlinking", "IsUnconscious", 40.0)):
+            if self.flags[name]:
+                self.session_flags[name] = 1
+                if escalation is not None and self.counters[name] > escalation_duration \
+                        and not getattr(self, escalation):
+                    setattr(self, escalation, 1)
+                    events.append((escalation, None, timestamp - self.counters[name], None))
+            elif self.session_flags[name] == 1:
+                events.append((name, ended[name], previous - ended[name], previous))
+                self.session_flags[name] = 0
+                if escalation is not None:
+                    setattr(self, escalation, 0)
+        return events
+
+
+def feature_trace(seed, seconds=600.0):
+    """
+    Returns (timestamp, features) of a random drive: piecewise states of
+    gaze, mouth and eyes lasting from a frame to a minute, jittered
+    frame times and frames without a face
+    """
+    rng = np.random.default_rng(seed)
+    trace = []
+    timestamp = 1.7e9
+    end = timestamp + seconds
+    while timestamp < end:
+        state_end = timestamp + rng.choice([rng.uniform(0.03, 3.0), rng.uniform(3.0, 60.0)])
+        gaze_center = bool(rng.random() < 0.7)
+        mouth = rng.choice([1.5, 2.0, 3.0])
+        eyes = rng.choice([3.0, 5.0, 6.0], p=[0.6, 0.1, 0.3])
+        no_face = rng.random() < 0.05
+        while timestamp < state_end:
+            timestamp += rng.uniform(0.02, 0.05)
+            if no_face or rng.random() < 0.01:
+                trace.append((timestamp, None))
+                continue
+            trace.append((timestamp, {"gaze_center": gaze_center, "mouth_aspect_ratio": mouth,
+                                      "eye_aspect_ratio": eyes}))
+    return trace
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_default_rules_match_legacy_flags(seed):
+    legacy = LegacyFlags()
+    engine = RuleEngine(DEFAULT_RULES)
+    names = set()
+    for timestamp, features in feature_trace(seed):
+        expected = legacy.step(features, timestamp)
+        alerts = [(alert.type, alert.duration, alert.start, alert.end)
+                  for alert in engine.update(features, timestamp)]
+        assert sorted(alerts, key=repr) == pytest.approx(sorted(expected, key=repr))
+        names.update(event[0] for event in expected)
+
+    # The trace exercises every flag and escalation
+    assert names == {"IsDistracted", "Yawns", "EyesClosed", "IsSleeping", "NoBlinking", "IsUnconscious"}
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from benchmarks.corpus import synthetic_frame
+from service import IngestService, IngestClient
+from service.protocol import (ProtocolError, PREFIX, MAX_HEADER, read_message, write_message,
+                              encode_frame, decode_frame)
+
+
+class BufferWriter(object):
+    """asyncio.StreamWriter stand-in collecting written bytes"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+
+
+async def read_messages(data, count):
+    """Reads count messages from a stream holding data"""
+    reader = asyncio.StreamReader()
+    reader.feed_data(bytes(data))
+    reader.feed_eof()
+    return [await read_message(reader) for _ in range(count)]
+
+
+async def loopback(tmp_path, service):
+    """Starts a service on a Unix socket and returns a connected client"""
+    await service.start(str(tmp_path / "ingest.sock"))
+    return await IngestClient.connect(path=str(tmp_path / "ingest.sock"))
+
+
+def test_messages_round_trip():
+    writer = BufferWriter()
+    write_message(writer, {"id": 1, "stream": "cab", "value": np.float32(0.5)}, b"payload")
+    write_message(writer, {"id": 2})
+
+    first, second, end = asyncio.run(read_messages(writer.data, 3))
+    assert first == ({"id": 1, "stream": "cab", "value": 0.5}, b"payload")
+    assert second == ({"id": 2}, b"")
+    assert end is None
+
+
+@pytest.mark.parametrize("data", [
+    # Truncated prefix, header and payload
+    PREFIX.pack(10, 0)[:5],
+    PREFIX.pack(10, 0) + b'{"id"',
+    PREFIX.pack(2, 10) + b"{}" + b"short",
+    # Oversized, invalid and non object headers
+    PREFIX.pack(MAX_HEADER + 1, 0),
+    PREFIX.pack(3, 0) + b"{x}",
+    PREFIX.pack(2, 0) + b"[]",
+])
+def test_malformed_messages_raise(data):
+    with pytest.raises(ProtocolError):
+        asyncio.run(read_messages(data, 1))
+
+
+@pytest.mark.parametrize("encoding", ["raw", "jpeg"])
+def test_frames_round_trip(encoding):
+    frame, _ = synthetic_frame((160, 120))
+    header, payload = encode_frame(frame, encoding)
+    decoded = decode_frame(header, payload)
+    assert decoded.shape == frame.shape
+    if encoding == "raw":
+        assert np.array_equal(decoded, frame)
+    else:
+        assert np.abs(decoded.astype(int) - frame).mean() < 10
+
+
+def test_loopback_analysis_keeps_request_order(tmp_path, fake_models):
+    frame, _ = synthetic_frame((320, 240))
+    no_face = np.zeros_like(frame)
+
+    async def scenario():
+        service = IngestService(workers=2, models=fake_models)
+        client = await loopback(tmp_path, service)
+        try:
+            async with client:
+                futures = [await client.submit(frame if index % 3 else no_face, f"stream-{index % 2}",
+                                               1000.0 + index / 30.0)
+                           for index in range(12)]
+                responses = await asyncio.gather(*futures)
+        finally:
+            await service.close()
+        return service, responses
+
+    service, responses = asyncio.run(scenario())
+    assert [response["id"] for response in responses] == list(range(12))
+    assert all("error" not in response for response in responses)
+    assert [response["stream"] for response in responses] == [f"stream-{index % 2}" for index in range(12)]
+    for index, response in enumerate(responses):
+        if index % 3:
+            assert {"eye_aspect_ratio", "mouth_aspect_ratio", "gaze_center"} <= set(response["features"])
+        else:
+            assert response["features"] is None
+    assert service.stats["streams"] == 2
+
+
+def test_requests_waiting_together_are_batched(tmp_path, fake_models):
+    frame, _ = synthetic_frame((160, 120))
+
+    async def scenario():
+        service = IngestService(workers=1, max_batch=8, batch_window=0.2, models=fake_models)
+        client = await loopback(tmp_path, service)
+        try:
+            async with client:
+                futures = [await client.submit(frame, "cab", 1000.0 + index / 30.0) for index in range(8)]
+                await asyncio.gather(*futures)
+        finally:
+            await service.close()
+        return service
+
+    service = asyncio.run(scenario())
+    assert service.stats["requests"] == 8
+    assert service.stats["batches"] < 8
+
+
+class BlockingSession(object):
+    """Session whose analysis waits until it is released"""
+
+    def __init__(self, release):
+        self.release = release
+
+    def extract(self, frame, timestamp):
+        self.release.wait(10)
+        return {}
+
+    def step(self, features, timestamp):
+        return []
+
+
+def test_full_queue_stops_reading_connections(tmp_path, fake_models):
+    frame, _ = synthetic_frame((64, 48))
+    release = threading.Event()
+    count = 40
+
+    async def scenario():
+        service = IngestService(workers=1, max_batch=1, batch_window=0.0, max_pending=4, models=fake_models,
+                                session_factory=lambda detector, on_event: BlockingSession(release))
+        client = await loopback(tmp_path, service)
+        try:
+            async with client:
+                futures = [await client.submit(frame, "cab") for _ in range(count)]
+                await asyncio.sleep(0.3)
+                # Workers are blocked: the queue is full and the rest isn't read
+                depth = service._pending.qsize()
+                dispatched = service.stats["requests"]
+                done = sum(future.done() for future in futures)
+                release.set()
+                responses = await asyncio.gather(*futures)
+        finally:
+            release.set()
+            await service.close()
+        return service, depth, dispatched, done, responses
+
+    service, depth, dispatched, done, responses = asyncio.run(scenario())
+    assert depth == 4
+    assert service.stats["max_depth"] <= 4
+    # Two batches in flight per worker, a full queue and one request waiting to be queued
+    assert dispatched + depth + 1 < count
+    assert done == 0
+    assert len(responses) == count and all("error" not in response for response in responses)
@@ -0,0 +1,62 @@
+import threading
+
+from telemetry import TelemetryUploader
+
+
+class Response(object):
+    status_code = 200
+
+
+class SlowSession(object):
+    """HTTP session stand-in whose requests wait until they are released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.posting = threading.Event()
+        self.closed = False
+        self.events = []
+
+    def post(self, url, json, timeout):
+        self.posting.set()
+        self.release.wait(10)
+        assert not self.closed
+        self.events.extend(json)
+        return Response()
+
+    def close(self):
+        self.closed = True
+
+
+def test_stop_leaves_session_to_a_busy_thread():
+    session = SlowSession()
+    uploader = TelemetryUploader("http://localhost/records", "token", flush_interval=0.01)
+    uploader._create_session = lambda: session
+    uploader.start()
+    thread = uploader._thread
+    uploader.submit({"type": "Yawns"})
+    assert session.posting.wait(5)
+
+    uploader.stop(timeout=0.05)
+    assert thread.is_alive() and not session.closed
+
+    session.release.set()
+    thread.join(5)
+    assert session.closed
+    assert session.events == [{"type": "Yawns"}]
+    assert uploader.stats["sent"] == 1
+
+
+def test_stats_count_submits_from_many_threads():
+    uploader = TelemetryUploader("http://localhost/records", "token", max_queue=10)
+
+    def submit():
+        for index in range(2000):
+            uploader.submit({"index": index})
+
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert uploader.stats["submitted"] == 16000
+    assert uploader.stats["dropped"] == 16000 - uploader.pending()
@@ -0,0 +1,2 @@
+from .sweep import threshold_conditions, gaze_conditions, evaluate, summarize
+from .tuner import parse_grid, load_incidents, sweep_recording, sweep_recordings, f1_score, rank
@@ -0,0 +1,64 @@
+import sys
+import json
+import argparse
+
+import numpy as np
+
+from rules import DEFAULT_RULES, load_rules
+from .tuner import parse_grid, load_incidents, sweep_recordings, rank
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sweep alert rule thresholds over recorded sessions")
+    parser.add_argument("recordings", nargs="+", help="recording directories")
+    parser.add_argument("--rule", required=True, help="name of the rule to tune")
+    parser.add_argument("--rules", default=None, help="JSON file with additional alert rules")
+    parser.add_argument("--labels", default=None,
+                        help="JSON lines file of labeled incidents (recording, type, start, end)")
+    parser.add_argument("--incident-type", default=None,
+                        help="type of the incidents the rule should detect, the rule name by default")
+    parser.add_argument("--thresholds", default=None,
+                        help="thresholds as start:stop:step or a comma separated list, "
+                             "0.5 to 1.5 times the rule threshold by default")
+    parser.add_argument("--durations", default=None,
+                        help="minimum durations (seconds) as start:stop:step or a comma separated list, "
+                             "0.25 to 2 times the rule duration by default")
+    parser.add_argument("--gaze-right", default="0.3:0.5:0.02", help="right gaze ratios, for gaze rules")
+    parser.add_argument("--gaze-left", default="0.55:0.75:0.02", help="left gaze ratios, for gaze rules")
+    parser.add_argument("--slack", type=float, default=1.0, help="tolerance (seconds) around incidents")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--top", type=int, default=20, help="number of best combinations printed")
+    parser.add_argument("--output", default=None, help="JSON file all results are written to")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    rules = DEFAULT_RULES + load_rules(args.rules) if args.rules else DEFAULT_RULES
+    rule = next((rule for rule in rules if rule.name == args.rule), None)
+    if rule is None:
+        print(f"Unknown rule {args.rule}", file=sys.stderr)
+        return 2
+
+    thresholds = parse_grid(args.thresholds) if args.thresholds else \
+        np.linspace(0.5 * rule.threshold, 1.5 * rule.threshold, 21)
+    durations = parse_grid(args.durations) if args.durations else \
+        np.linspace(0.25 * rule.min_duration, 2.0 * rule.min_duration, 8)
+    incidents = load_incidents(args.labels) if args.labels else None
+
+    results = sweep_recordings(args.recordings, args.incident_type or rule.name, rule.feature, rule.op,
+                               thresholds, durations, incidents, args.slack,
+                               parse_grid(args.gaze_right), parse_grid(args.gaze_left), args.workers)
+    results.sort(key=rank)
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump({"rule": rule.to_dict(), "results": results}, output_file, indent=2, ensure_ascii=False)
+
+    for result in results[:args.top]:
+        print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
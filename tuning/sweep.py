@@ -0,0 +1,143 @@
+import numpy as np
+
+from rules.rule import Rule
+
+COUNTS = ("alerts", "true_alerts", "detected", "latency_sum")
+
+
+def threshold_conditions(values, op, thresholds):
+    """
+    Returns whether `value <op> threshold` holds, for every threshold
+    (rows) and frame (columns)
+
+    Arguments:
+        values (numpy.ndarray): Per frame feature values
+        op (str): Comparison operator, one of Rule.OPERATORS
+        thresholds (numpy.ndarray): Thresholds to evaluate
+    """
+    if op not in Rule.OPERATORS:
+        raise ValueError(f"Unknown operator {op!r}")
+
+    diff = np.asarray(values, np.float64)[np.newaxis, :] - np.asarray(thresholds, np.float64)[:, np.newaxis]
+    with np.errstate(invalid="ignore"):
+        return {"<": diff < 0, "<=": diff <= 0, ">": diff > 0, ">=": diff >= 0,
+                "==": diff == 0, "!=": diff != 0}[op]
+
+
+def gaze_conditions(horizontal, located, right_thresholds, left_thresholds):
+    """
+    Returns whether the gaze is off center (the IsDistracted condition),
+    for every (right, left) threshold pair (rows) and frame (columns).
+    Same as `not ActionMonitor.is_center()` with other thresholds.
+
+    Arguments:
+        horizontal (numpy.ndarray): Per frame horizontal gaze ratio
+        located (numpy.ndarray): Whether pupils were located
+        right_thresholds (numpy.ndarray): Ratios at or below which the driver looks right
+        left_thresholds (numpy.ndarray): Ratios at or above which the driver looks left
+
+    Returns:
+        Conditions and the (right, left) pair of each row
+    """
+    right, left = (grid.ravel() for grid in np.meshgrid(right_thresholds, left_thresholds, indexing="ij"))
+    horizontal = np.asarray(horizontal, np.float64)[np.newaxis, :]
+    with np.errstate(invalid="ignore"):
+        center = (horizontal > right[:, np.newaxis]) & (horizontal < left[:, np.newaxis])
+    return ~(center & np.asarray(located, bool)), np.stack([right, left], axis=1)
+
+
+def _runs(holds):
+    """Returns row, first and last frame of each run of holding frames"""
+    padded = np.zeros((holds.shape[0], holds.shape[1] + 2), np.int8)
+    padded[:, 1:-1] = holds
+    steps = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(steps == 1)
+    _, ends = np.nonzero(steps == -1)
+    return rows, starts, ends - 1
+
+
+def evaluate(conditions, timestamps, valid, durations, incidents, slack=1.0, block_rows=64):
+    """
+    Evaluates a rule for every condition row and minimum duration at once,
+    like RuleEngine would over the frames, against labeled incidents.
+
+    A rule fires when its condition has held for more than the minimum
+    duration. Frames without features (`valid` false) keep the state
+    and only advance the clock, as in RuleEngine.update(). An alert is
+    true if it fires within `slack` seconds of an incident, an incident
+    is detected by the first true alert and its latency is the time from
+    the incident start to that alert.
+
+    Arguments:
+        conditions (numpy.ndarray): (K, T) whether the rule condition holds
+        timestamps (numpy.ndarray): (T,) frame times in seconds
+        valid (numpy.ndarray): (T,) whether the frame has features
+        durations (numpy.ndarray): (M,) minimum durations in seconds
+        incidents (numpy.ndarray): (I, 2) labeled (start, end) times
+        slack (float): Tolerance in seconds around incidents
+        block_rows (int): Condition rows evaluated together, bounds memory
+
+    Returns:
+        Dictionary of (K, M) count arrays (see COUNTS) and "incidents"
+    """
+    valid = np.asarray(valid, bool)
+    timestamps = np.asarray(timestamps, np.float64)
+    durations = np.asarray(durations, np.float64)
+    incidents = np.asarray(incidents, np.float64).reshape(-1, 2)
+    incidents = incidents[np.argsort(incidents[:, 0], kind="stable")]
+
+    # Time is added on the frame that follows it, also across invalid frames
+    elapsed = np.maximum(np.diff(timestamps, prepend=timestamps[:1]), 0.0)[valid]
+    times = timestamps[valid]
+    clock = np.cumsum(elapsed)
+
+    nb_rows, nb_durations, nb_incidents = len(conditions), len(durations), len(incidents)
+    counts = {name: np.zeros((nb_rows, nb_durations)) for name in COUNTS}
+
+    for first_row in range(0, nb_rows, block_rows):
+        block = np.asarray(conditions[first_row:first_row + block_rows])[:, valid]
+        rows, starts, ends = _runs(block)
+        if len(rows) == 0:
+            continue
+        block_counts = {name: counts[name][first_row:first_row + len(block)] for name in COUNTS}
+
+        # Counter of a run at frame i is clock[i] - base, the rule fires on
+        # the first frame where it exceeds the duration
+        base = clock[starts] - elapsed[starts]
+        firing = np.searchsorted(clock, base[:, np.newaxis] + durations, side="right")
+        fired = firing <= ends[:, np.newaxis]
+        activation = np.where(fired, times[np.minimum(firing, len(times) - 1)], np.nan)
+        np.add.at(block_counts["alerts"], rows, fired)
+
+        if nb_incidents == 0:
+            continue
+        index = np.searchsorted(incidents[:, 0] - slack, activation, side="right") - 1
+        with np.errstate(invalid="ignore"):
+            matched = fired & (index >= 0) & (activation <= incidents[np.maximum(index, 0), 1] + slack)
+        np.add.at(block_counts["true_alerts"], rows, matched)
+
+        first = np.full((len(block), nb_durations, nb_incidents), np.inf)
+        run, duration = np.nonzero(matched)
+        np.minimum.at(first, (rows[run], duration, index[run, duration]), activation[run, duration])
+        detected = np.isfinite(first)
+        block_counts["detected"] += detected.sum(axis=2)
+        block_counts["latency_sum"] += np.where(detected, first - incidents[:, 0], 0.0).sum(axis=2)
+
+    counts["incidents"] = nb_incidents
+    return counts
+
+
+def summarize(counts):
+    """
+    Returns precision, recall and mean alert latency (seconds) of
+    summed counts, NaN where undefined
+
+    Arguments:
+        counts (dict): Counts returned by evaluate(), possibly summed over sessions
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = counts["true_alerts"] / counts["alerts"]
+        recall = counts["detected"] / counts["incidents"] if counts["incidents"] else \
+            np.full(counts["detected"].shape, np.nan)
+        latency = counts["latency_sum"] / counts["detected"]
+    return {"precision": precision, "recall": recall, "latency": latency, "alerts": counts["alerts"]}
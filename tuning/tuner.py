@@ -0,0 +1,163 @@
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from recording import Recording, recorded_features
+from .sweep import COUNTS, threshold_conditions, gaze_conditions, evaluate, summarize
+
+
+def parse_grid(text):
+    """
+    Returns the values of a grid given as "start:stop:step" (stop
+    included) or as comma separated values
+
+    Arguments:
+        text (str): Grid description
+    """
+    if ":" in text:
+        start, stop, step = (float(value) for value in text.split(":"))
+        return np.round(np.arange(start, stop + step / 2, step), 10)
+    return np.array([float(value) for value in text.split(",")])
+
+
+def load_incidents(path):
+    """
+    Loads labeled incidents from a JSON lines file with one incident per
+    line: {"recording": ..., "type": ..., "start": ..., "end": ...}, times
+    in seconds since the epoch like event records
+
+    Arguments:
+        path (str): JSON lines file
+
+    Returns:
+        Dictionary of recording name to dictionary of type to (start, end) list
+    """
+    incidents = {}
+    with open(path, encoding="utf-8") as incidents_file:
+        for line in incidents_file:
+            if not line.strip():
+                continue
+            incident = json.loads(line)
+            name = os.path.basename(os.path.normpath(incident["recording"]))
+            incidents.setdefault(name, {}).setdefault(incident["type"], []).append(
+                (incident["start"], incident["end"]))
+    return incidents
+
+
+def rule_conditions(features, feature, op, thresholds, gaze_right=None, gaze_left=None):
+    """
+    Returns the condition rows of a rule over recorded features, in the
+    order of parameters()
+
+    Arguments:
+        features (dict): Features returned by recorded_features()
+        feature (str): Feature of the rule, "gaze_center" sweeps the gaze ratios
+        op (str): Operator of the rule
+        thresholds (numpy.ndarray): Thresholds to evaluate
+        gaze_right (numpy.ndarray): Right gaze ratios, for "gaze_center"
+        gaze_left (numpy.ndarray): Left gaze ratios, for "gaze_center"
+    """
+    if feature == "gaze_center":
+        return gaze_conditions(features["horizontal_ratio"], features["located"], gaze_right, gaze_left)[0]
+    if feature not in features:
+        raise ValueError(f"Feature {feature!r} isn't recorded")
+    return threshold_conditions(features[feature], op, thresholds)
+
+
+def parameters(feature, thresholds, gaze_right=None, gaze_left=None):
+    """Returns parameter names and values of each condition row of rule_conditions()"""
+    if feature == "gaze_center":
+        return ("gaze_right", "gaze_left"), gaze_conditions(np.zeros(0), np.zeros(0, bool), gaze_right, gaze_left)[1]
+    return ("threshold",), np.asarray(thresholds, np.float64)[:, np.newaxis]
+
+
+def sweep_recording(path, incident_type, feature, op, thresholds, durations, incidents=None, slack=1.0,
+                    gaze_right=None, gaze_left=None):
+    """
+    Evaluates all parameter combinations of a rule on one recording
+
+    Arguments:
+        path (str): Recording directory
+        incident_type (str): Type of the labeled incidents the rule should detect
+        incidents (dict): Incidents returned by load_incidents(), None if unlabeled
+        Other arguments: see rule_conditions() and evaluate()
+
+    Returns:
+        Counts returned by evaluate()
+    """
+    recording = Recording(path)
+    features = recorded_features(recording)
+    conditions = rule_conditions(features, feature, op, thresholds, gaze_right, gaze_left)
+
+    labeled = (incidents or {}).get(os.path.basename(os.path.normpath(path)), {})
+    return evaluate(conditions, recording.timestamp, features["valid"], durations,
+                    labeled.get(incident_type, []), slack)
+
+
+def _sweep_recording(args):
+    """sweep_recording() taking a single tuple of arguments for Executor.map"""
+    return sweep_recording(*args)
+
+
+def sweep_recordings(paths, incident_type, feature, op, thresholds, durations, incidents=None, slack=1.0,
+                     gaze_right=None, gaze_left=None, workers=None):
+    """
+    Evaluates all parameter combinations of a rule over a fleet of
+    recordings, one recording per worker process, and summarizes them.
+
+    Arguments:
+        paths (list): Recording directories
+        workers (int): Number of worker processes, number of CPUs by default
+        Other arguments: see sweep_recording()
+
+    Returns:
+        List of dictionaries with the parameters, precision, recall, mean
+        alert latency (seconds) and number of alerts of each combination
+    """
+    if not paths:
+        raise ValueError("No recordings to sweep")
+
+    thresholds = np.asarray(thresholds, np.float64)
+    durations = np.asarray(durations, np.float64)
+    tasks = [(path, incident_type, feature, op, thresholds, durations, incidents, slack, gaze_right, gaze_left)
+             for path in paths]
+
+    total = None
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for counts in executor.map(_sweep_recording, tasks):
+            if total is None:
+                total = counts
+            else:
+                for name in COUNTS:
+                    total[name] += counts[name]
+                total["incidents"] += counts["incidents"]
+
+    names, rows = parameters(feature, thresholds, gaze_right, gaze_left)
+    summary = summarize(total)
+    results = []
+    for row, values in enumerate(rows):
+        for column, duration in enumerate(durations):
+            result = dict(zip(names, (float(value) for value in values)))
+            result["min_duration"] = float(duration)
+            for name in ("precision", "recall", "latency"):
+                value = summary[name][row, column]
+                result[name] = None if np.isnan(value) else float(value)
+            result["alerts"] = int(summary["alerts"][row, column])
+            results.append(result)
+    return results
+
+
+def f1_score(result):
+    """Returns the F1 score of a sweep result, 0.0 if undefined"""
+    precision, recall = result["precision"], result["recall"]
+    if not precision or not recall:
+        return 0.0
+    return 2 * precision * recall / (precision + recall)
+
+
+def rank(result):
+    """Sort key of sweep results, best F1 score first and faster alerts on ties"""
+    latency = result["latency"] if result["latency"] is not None else np.inf
+    return -f1_score(result), latency